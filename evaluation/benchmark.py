@@ -0,0 +1,235 @@
+import argparse
+import itertools
+import logging
+import os
+import shutil
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+
+SCRIPTDIR = os.path.dirname(os.path.realpath(__file__))
+
+# Paths to the executables of both implementations (one author per repository)
+STATE_GOC_EXECUTABLES_PATH = os.path.join(SCRIPTDIR, "../git-goc-state")
+DELTA_GOC_EXECUTABLES_PATH = os.path.join(SCRIPTDIR, "../git-goc-delta")
+IMPLEMENTATIONS = {"state": STATE_GOC_EXECUTABLES_PATH, "delta": DELTA_GOC_EXECUTABLES_PATH}
+
+INITIAL_SUPPLY = 10**9 # tokens created by every author, so that no transfer of the benchmark runs out of tokens
+
+# setup logger
+logger = logging.getLogger("benchmark")
+
+logging.basicConfig(
+    format='%(asctime)s %(levelname)-8s %(message)s',
+    level=logging.INFO,
+    datefmt='%H:%M:%S %d-%m-%Y',
+    handlers=[
+        logging.StreamHandler()
+    ])
+
+
+# parse args
+parser = argparse.ArgumentParser(description="Measures the latency of the ledger operations of the state-based and the delta-based implementation on synthetic ledgers")
+parser.add_argument("--implementations", type=str, nargs="+", choices=list(IMPLEMENTATIONS), default=list(IMPLEMENTATIONS), required=False)
+parser.add_argument("--log_lengths", type=int, nargs="+", default=[25], required=False) # number of giveTo operations in the log of the measured account
+parser.add_argument("--counterparties", type=int, nargs="+", default=[4], required=False) # number of authors the measured account interacts with
+parser.add_argument("--map_encodings", type=str, nargs="+", choices=["tree", "compact", "sharded"], default=["tree"], required=False) # goc.mapEncoding of the delta-based ledger
+parser.add_argument("--tokens", type=int, nargs="+", default=[1], required=False) # number of token types of the ledger
+parser.add_argument("--repetitions", type=int, default=10, required=False) # number of measurements per operation and ledger shape
+parser.add_argument("--accounts_path", type=str, default="./benchmark-accounts", required=False)
+parser.add_argument("--results_path", type=str, default="./results/benchmark", required=False)
+args = parser.parse_args()
+
+
+# Helper class for building a synthetic ledger and timing the ledger operations of one implementation
+class Ledger():
+
+    def __init__(self, implementation, accounts_dir, map_encoding="tree"):
+        self.implementation = implementation
+        self.map_encoding = map_encoding # encoding of the giveTo/ackFrom maps (delta-based only)
+        self.path = IMPLEMENTATIONS[implementation] # path to GOC code
+        self.accounts_dir = accounts_dir # every author has its own repository in this directory
+        self.trace_file = os.path.join(accounts_dir, "trace2.events")
+        self.author_ids = {} # {alias: author-id}
+        self.tokens = [] # token types
+
+    def run(self, script, *arguments, check=True):
+        """Executes the script and returns (stdout, seconds, number of started git processes, whether the script failed)"""
+        if os.path.exists(self.trace_file):
+            os.remove(self.trace_file)
+        env = dict(os.environ, GIT_TRACE2_EVENT=self.trace_file) # every git process appends its events, including nested git processes
+        start = time.perf_counter()
+        process = subprocess.run([os.path.join(self.path, script), *map(str, arguments)], stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        seconds = time.perf_counter() - start
+        if check and process.returncode != 0:
+            raise RuntimeError(f"{script} {' '.join(map(str, arguments))} failed ({process.returncode}): {process.stderr.decode().strip()}")
+
+        git_processes = 0
+        if os.path.exists(self.trace_file):
+            with open(self.trace_file, errors="replace") as f:
+                git_processes = sum(1 for line in f if '"event":"start"' in line)
+        return process.stdout.decode(), seconds, git_processes, process.returncode != 0
+
+    def repo(self, alias):
+        return os.path.join(self.accounts_dir, alias)
+
+    def git(self, alias, *arguments):
+        return subprocess.check_output(["git", *arguments], cwd=self.repo(alias)).decode().strip()
+
+    def author_init(self, alias):
+        self.run("author-initialize", self.repo(alias), alias)
+        self.author_ids[alias] = self.git(alias, "config", "goc.author.id")
+        self.git(alias, "config", "goc.receive.autoMergeUpdate", "false") # received updates are merged by the (measured) repo-merge
+        if self.map_encoding != "tree":
+            self.git(alias, "config", "goc.mapEncoding", self.map_encoding)
+
+    def connect(self, alias, remote_alias):
+        self.git(alias, "remote", "add", remote_alias, f"../{remote_alias}")
+
+    def sync(self, sender, recipient):
+        # pushes the frontier of the sender and merges it at the recipient
+        self.run("repo-push", self.repo(sender), recipient)
+        return self.merge(recipient, sender)
+
+    def merge(self, alias, sender):
+        stdout, seconds, git_processes, failed = self.run("repo-merge", self.repo(alias), self.author_ids[sender], check=self.implementation != "state")
+        if failed:
+            # the state-based repo-merge also fails if the sender pushed outdated copies of local references, which are rejected by its
+            # final fetch after the frontier of the sender was fast-forwarded, therefore only a sample that did not merge the sender failed
+            failed = not self.merged(alias, sender)
+        return stdout, seconds, git_processes, failed
+
+    def merged(self, alias, sender):
+        """Whether every local frontier of the sender points to the commit of the remote frontier of the sender"""
+        sender_id = self.author_ids[sender]
+        local = dict(line.split() for line in self.git(alias, "for-each-ref", "--format=%(refname) %(objectname)", "refs/heads/frontier/").splitlines())
+        for line in self.git(alias, "for-each-ref", "--format=%(refname) %(objectname)", f"refs/remotes/{sender_id}/frontier/").splitlines():
+            ref, commit = line.split()
+            if ref.endswith(f"/{sender_id}") and local.get(ref.replace(f"refs/remotes/{sender_id}/", "refs/heads/", 1)) != commit:
+                return False
+        return True
+
+    def token_init(self, alias, token_alias):
+        self.run("token-initialize", self.repo(alias), token_alias)
+        self.tokens.append(self.git(alias, "rev-parse", f"refs/local/token_alias/{token_alias}"))
+
+    def create(self, alias, token, amount):
+        return self.run("token-create", self.repo(alias), token, amount)
+
+    def burn(self, alias, token, amount):
+        return self.run("token-burn", self.repo(alias), token, amount)
+
+    def give_to(self, alias, token, recipient, amount):
+        return self.run("token-giveTo", self.repo(alias), token, self.author_ids[recipient], amount)
+
+    def ack_from(self, alias, token, sender):
+        return self.run("token-ackFrom", self.repo(alias), token, self.author_ids[sender])
+
+    def balance(self, alias, token):
+        return self.run("account-balance", self.repo(alias), token, self.author_ids[alias])
+
+    def checkpoint(self, alias, token, cold):
+        if cold: # the checkpoint is recomputed from the entire log of the account
+            self.git(alias, "update-ref", "-d", f"refs/local/checkpoint/{token}/{self.author_ids[alias]}")
+        return self.run("account-checkpoint", self.repo(alias), token, self.author_ids[alias])
+
+
+def build_ledger(ledger, log_length, num_counterparties, num_tokens):
+    """Creates the measured author 'hub', its counterparties and tokens, and a log of `log_length` giveTo operations per token"""
+    counterparties = [f"c{i}" for i in range(num_counterparties)]
+    ledger.author_init("hub")
+    for alias in counterparties:
+        ledger.author_init(alias)
+        ledger.connect("hub", alias)
+        ledger.connect(alias, "hub")
+        ledger.sync(alias, "hub") # publish the alias
+
+    for i in range(num_tokens):
+        ledger.token_init("hub", f"token{i}")
+    for token in ledger.tokens:
+        ledger.create("hub", token, INITIAL_SUPPLY)
+        for j in range(log_length):
+            ledger.give_to("hub", token, counterparties[j % num_counterparties], 1)
+
+    # the counterparties acknowledge the received tokens and own tokens they can transfer to the hub during the measurements
+    for alias in counterparties:
+        ledger.sync("hub", alias)
+        for token in ledger.tokens:
+            if log_length >= 1:
+                ledger.ack_from(alias, token, "hub")
+            ledger.create(alias, token, INITIAL_SUPPLY)
+        ledger.sync(alias, "hub")
+    return counterparties
+
+
+def measure(ledger, counterparties, repetitions):
+    """Executes every operation `repetitions` times on the account of the hub, yields (operation, seconds, git processes, failed)"""
+    token = ledger.tokens[0]
+    for repetition in range(repetitions):
+        counterparty = counterparties[repetition % len(counterparties)]
+        yield ("token-create", *ledger.create("hub", token, 1)[1:])
+        yield ("token-burn", *ledger.burn("hub", token, 1)[1:])
+        yield ("token-giveTo", *ledger.give_to("hub", token, counterparty, 1)[1:])
+
+        # the counterparty transfers a token to the hub, which the hub merges and acknowledges
+        ledger.give_to(counterparty, token, "hub", 1)
+        ledger.run("repo-push", ledger.repo(counterparty), "hub")
+        yield ("repo-merge", *ledger.merge("hub", counterparty)[1:])
+        yield ("token-ackFrom", *ledger.ack_from("hub", token, counterparty)[1:])
+
+        if ledger.implementation == "delta": # the state-based ledger stores the full account state in every commit
+            yield ("account-checkpoint (cold)", *ledger.checkpoint("hub", token, cold=True)[1:])
+            ledger.give_to("hub", token, counterparty, 1) # the warm checkpoint applies a new delta instead of only finding the checkpoint up to date
+            yield ("account-checkpoint (warm)", *ledger.checkpoint("hub", token, cold=False)[1:])
+        yield ("account-balance", *ledger.balance("hub", token)[1:])
+
+
+def summarize(measurements):
+    # failed samples (only tolerated for the state-based repo-merge) are counted, but not included in the latencies
+    columns = ["implementation", "map_encoding", "operation", "log_length", "counterparties", "tokens"]
+    rows = []
+    for key, group in measurements.groupby(columns, sort=False):
+        succeeded = group[~group["failed"]]
+        if succeeded.empty:
+            rows.append([*key, 0, len(group), np.nan, np.nan, np.nan, np.nan])
+            continue
+        seconds = succeeded["seconds"].to_numpy()
+        rows.append([*key, len(succeeded), len(group) - len(succeeded), np.percentile(seconds, 50), np.percentile(seconds, 95), seconds.mean(), succeeded["git_processes"].median()])
+    return pd.DataFrame(rows, columns=[*columns, "samples", "failed_samples", "p50_seconds", "p95_seconds", "mean_seconds", "git_processes"])
+
+
+os.makedirs(args.results_path, exist_ok=True)
+measurements_file = os.path.join(args.results_path, "benchmark_measurements.csv")
+summary_file = os.path.join(args.results_path, "benchmark_summary.csv")
+
+# the map encodings only apply to the delta-based ledger
+shapes = [(implementation, map_encoding, *shape) for implementation, *shape in itertools.product(args.implementations, args.log_lengths, args.counterparties, args.tokens)
+          for map_encoding in (args.map_encodings if implementation == "delta" else ["tree"])]
+
+measurements = []
+for implementation, map_encoding, log_length, num_counterparties, num_tokens in shapes:
+    shape = f"{implementation}-{map_encoding}-{log_length}-{num_counterparties}-{num_tokens}"
+    accounts_dir = os.path.abspath(os.path.join(args.accounts_path, shape))
+    shutil.rmtree(accounts_dir, ignore_errors=True)
+    os.makedirs(accounts_dir)
+
+    ledger = Ledger(implementation, accounts_dir, map_encoding)
+    start = time.perf_counter()
+    counterparties = build_ledger(ledger, log_length, num_counterparties, num_tokens)
+    logger.info("built ledger %s in %.1fs", shape, time.perf_counter() - start)
+
+    for operation, seconds, git_processes, failed in measure(ledger, counterparties, args.repetitions):
+        if failed:
+            logger.warning("%s failed on ledger %s", operation, shape)
+        measurements.append([implementation, map_encoding, operation, log_length, num_counterparties, num_tokens, seconds, git_processes, failed])
+    shutil.rmtree(accounts_dir, ignore_errors=True)
+
+    # the results are written after every ledger shape, so that an interrupted benchmark keeps its measurements
+    measurements_csv = pd.DataFrame(measurements, columns=["implementation", "map_encoding", "operation", "log_length", "counterparties", "tokens", "seconds", "git_processes", "failed"])
+    measurements_csv.to_csv(measurements_file, index=False)
+    summary = summarize(measurements_csv)
+    summary.to_csv(summary_file, index=False)
+    shape_summary = summary[(summary["implementation"] == implementation) & (summary["map_encoding"] == map_encoding) & (summary["log_length"] == log_length)
+                            & (summary["counterparties"] == num_counterparties) & (summary["tokens"] == num_tokens)]
+    logger.info("measured %s:\n%s", shape, shape_summary.to_string(index=False))
@@ -1,69 +1,107 @@
 import git
 import os
-import subprocess
 import shutil
 import pandas as pd
 
 bundle_path = "./results/single-repo-git-goc-delta/bundles" # change these paths for calculating the state-based naive sizes
-csv_path ="/results/single-repo-git-goc-delta/naive_sizes.csv"
+delta_bundle_path = "./results/single-repo-git-goc-delta/delta_bundles" # bundles of the new objects, written instead of bundle_path with --incremental_measurements
+csv_path ="./results/single-repo-git-goc-delta/naive_sizes.csv"
 
 tmp_path = "./tmp"
 
 
-sizes = []
+def read_bundle_refs(path):
+    # returns the references {refname: commit} listed in the header of a bundle file, without reading the packfile
+    refs = {}
+    with open(path, "rb") as f:
+        f.readline() # "# v2 git bundle"
+        for line in f:
+            line = line.decode().strip()
+            if not line:
+                break # end of header
+            if line.startswith("-"):
+                continue # prerequisite
+            sha, name = line.split(" ", 1)
+            refs[name] = sha
+    return refs
+
+
+def naive_tree_sizes(tree, cache):
+    # naive (not deduplicated) blob and tree count/size of a commit tree and its subtrees, trees are immutable and therefore measured only once
+    sizes = cache.get(tree.hexsha)
+    if sizes is None:
+        blob_count = len(tree.blobs)
+        blob_size = sum(b.size for b in tree.blobs)
+        tree_count = 1
+        tree_size = tree.size
+        for t in tree.trees:
+            tree_size += t.size
+            tree_count += 1
+            blob_count += len(t.blobs)
+            blob_size += sum(b.size for b in t.blobs)
+        sizes = (blob_count, blob_size, tree_count, tree_size)
+        cache[tree.hexsha] = sizes
+    return sizes
+
+
+def list_bundles(path):
+    if not os.path.isdir(path):
+        return []
+    return sorted([b for b in os.listdir(path) if b.endswith(".bundle")], key=lambda x: int(x.split(".")[0]))
+
 
-progress = 0
-max = len(os.listdir(bundle_path))
 shutil.rmtree(tmp_path, ignore_errors=True)
 os.mkdir(tmp_path)
 
+bundles = list_bundles(bundle_path)
+if bundles:
+    # the last bundle contains all objects, therefore only this bundle is cloned; the other bundles are only used to determine
+    # the measurement interval in which each commit appeared first (their headers list the branches at the time of the measurement)
+    repo = git.Repo.clone_from(os.path.join(bundle_path, bundles[-1]), os.path.join(tmp_path, "final"))
+else:
+    # incremental measurements: every bundle only contains the objects added since the previous measurement and its header only lists
+    # the branches that changed, therefore the final repository is rebuilt by fetching all bundles in order
+    bundle_path = delta_bundle_path
+    bundles = list_bundles(bundle_path)
+    if not bundles:
+        raise SystemExit(f"No bundles found in '{bundle_path}' or '{delta_bundle_path}'")
+    repo = git.Repo.init(os.path.join(tmp_path, "final"), bare=True)
+    for bundle in bundles:
+        repo.git.fetch(os.path.abspath(os.path.join(bundle_path, bundle)), "+refs/heads/*:refs/heads/*")
 
-bundle_lst = os.listdir(bundle_path)
+sizes = []
+traversed_commits = set()
+tree_cache = {} # {tree: (blob count, blob size, tree count, tree size)}
+naive_blob_size = 0
+naive_tree_size = 0
+naive_blob_count = 0
+naive_tree_count = 0
 
-for bundle in sorted(os.listdir(bundle_path), key=lambda x: int(x.split(".")[0])):
-    naive_blob_size = 0
-    naive_tree_size = 0
-    naive_blob_count = 0
-    naive_tree_count = 0
-    print(f"{progress}/{max}: {bundle}")
+previous_refs = {}
 
+for progress, bundle in enumerate(bundles):
+    print(f"{progress}/{len(bundles)}: {bundle}")
     name = bundle.split(".")[0]
-    path = os.path.join(bundle_path, bundle)
-    tmp_bundle_path = os.path.join(tmp_path, bundle)
-    #shutil.copy(path, tmp_bundle_path)
-    #subprocess.call(["git", "clone", bundle], cwd=tmp_path)
-
-    repo_path = os.path.join(tmp_path, name)
-    repo = git.Repo.clone_from(path, repo_path)
-    origin = repo.remotes[0]
 
-
-    traversed_commits = []
-
-    for ref in origin.refs:
-        for commit in repo.iter_commits(ref, first_parent=True):
+    # add the first-parent commits that were not part of a previous measurement, the sizes are cumulative
+    refs = read_bundle_refs(os.path.join(bundle_path, bundle))
+    for ref, tip in refs.items():
+        rev = tip if ref not in previous_refs else f"{previous_refs[ref]}..{tip}" # only the commits added since the previous measurement
+        for commit in repo.iter_commits(rev, first_parent=True):
             if commit.hexsha in traversed_commits:
                 continue
-            traversed_commits.append(commit.hexsha)
-
-            tree = commit.tree
-            naive_tree_size += tree.size
-            naive_tree_count += 1
-
-            for b in tree.blobs:
-                naive_blob_size += b.size
-                naive_blob_count += 1
-
-            for t in tree.trees:
-                naive_tree_size += t.size
-                naive_tree_count += 1
-                for b in t.blobs:
-                    naive_blob_size+= b.size
-                    naive_blob_count += 1
-    repo.close()
-    shutil.rmtree(repo_path)
+            traversed_commits.add(commit.hexsha)
+
+            blob_count, blob_size, tree_count, tree_size = naive_tree_sizes(commit.tree, tree_cache)
+            naive_blob_count += blob_count
+            naive_blob_size += blob_size
+            naive_tree_count += tree_count
+            naive_tree_size += tree_size
     sizes.append([name, naive_blob_count, naive_blob_size, naive_tree_count, naive_tree_size])
-    progress += 1
+    previous_refs = {**previous_refs, **refs} # the header of a delta bundle only lists the changed branches
+
+repo.close()
+shutil.rmtree(tmp_path)
 
 csv = pd.DataFrame(sizes, columns=["num_of_operations", "naive_blob_count", "naive_blob_size", "naive_tree_count", "naive_tree_size"])
-csv.to_csv(csv_path, index=False)
\ No newline at end of file
+csv.to_csv(csv_path, index=False)
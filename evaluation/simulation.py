@@ -1,5 +1,6 @@
 import argparse
 import os
+import numpy as np
 import pandas as pd
 import gzip
 import subprocess
@@ -9,8 +10,10 @@ import shutil
 import sys
 from logging.handlers import RotatingFileHandler
 import re
+import zlib
 from git import Repo
 import json
+import pickle
 from git import Repo
 
 SCRIPTDIR = os.path.dirname(os.path.realpath(__file__))
@@ -23,6 +26,15 @@ DELTA_GOC_SINGLE_REPO_EXECUTABLES_PATH="./single-repo-git-goc-delta"
 GOC_REPO_DIR= os.path.join(SCRIPTDIR, "./accounts")
 DELTA_GOC_REPO_DIR=os.path.join(SCRIPTDIR, "./delta-accounts")
 
+ZERO_ADDRESS = "0000000000000000000000000000000000000000" # sender of create and recipient of burn transactions
+
+# in-process ledger engine of the delta-based implementation (git-goc-delta/goc)
+sys.path.insert(0, os.path.join(SCRIPTDIR, DELTA_GOC_EXECUTABLES_PATH))
+from goc import Ledger, ObjectReader, Repository
+from goc.aliases import AliasTable
+from goc.daemon import DaemonClient
+from goc.pool import checkpoint_all
+
 # setup logger
 logger = logging.getLogger("simulator")
 
@@ -42,35 +54,55 @@ parser.add_argument("db_path", type=str)
 parser.add_argument("--tmp_path", type=str, default="./tmp", required=False)
 parser.add_argument("--results_path", type=str, default="./results", required=False)
 parser.add_argument("--delta", action='store_true', required=False)
+parser.add_argument("--chunksize", type=int, default=100000, required=False) # number of rows of a day that are read at once
+parser.add_argument("--checkpoint_jobs", type=int, default=os.cpu_count(), required=False) # number of worker processes used to compute the checkpoints of all accounts
+parser.add_argument("--incremental_measurements", action='store_true', required=False) # only measure the objects added since the previous measurement
+parser.add_argument("--resume", action='store_true', required=False) # continue an interrupted simulation at the last progress marker of the replay log
+parser.add_argument("--progress_interval", type=int, default=100, required=False) # number of operations between two progress markers
+parser.add_argument("--daemon", action='store_true', required=False) # send the token operations to a ledger daemon instead of executing a script per operation (delta-based only)
+parser.add_argument("--trace", action='store_true', required=False) # record the span events of the operations (GOC_TRACE) and write the time per phase and operation type to time_breakdown.csv
+parser.add_argument("--compact_maps", action='store_true', required=False) # write the giveTo/ackFrom maps as compact map blobs (goc.mapEncoding), requires --daemon
 args = parser.parse_args()
-try:
-    shutil.rmtree(args.tmp_path, ignore_errors=True)
-    shutil.rmtree(args.results_path, ignore_errors=True)
-except FileNotFoundError:
-    pass
+if args.compact_maps and not args.daemon:
+    parser.error("--compact_maps requires --daemon, the single-repo scripts only read and write giveTo/ackFrom trees")
+if not args.resume:
+    try:
+        shutil.rmtree(args.tmp_path, ignore_errors=True)
+        shutil.rmtree(args.results_path, ignore_errors=True)
+    except FileNotFoundError:
+        pass
 
 # create tmp and results folder
-os.mkdir(args.tmp_path)
-os.mkdir(args.results_path)
+os.makedirs(args.tmp_path, exist_ok=args.resume)
+os.makedirs(args.results_path, exist_ok=args.resume)
 
 # Helper class for executing the GOC ledger operations and performing measurements
 class GOC():
 
-    def __init__(self, single_repo_exec_path, account_dir, full_exec_path=None):
+    def __init__(self, single_repo_exec_path, account_dir, full_exec_path=None, use_ledger_engine=False, use_daemon=False, compact_maps=False):
         self.path = single_repo_exec_path # path to GOC code
         self.account_dir = account_dir # path to GOC account dir
         self.full_exec_path = full_exec_path
+        self.use_ledger_engine = use_ledger_engine # compute balances in-process instead of calling account-balance (delta-based only)
+        self.ledger = None
+        self.use_daemon = use_daemon # send the token operations to a long-lived ledger daemon (delta-based only)
+        self.daemon = None # client connected to the ledger daemon
+        self.daemon_process = None
+        self.daemon_refresh = False # whether the references were changed by a script since the last daemon request
+        self.compact_maps = compact_maps # the ledger writes the giveTo/ackFrom maps as compact map blobs (delta-based only)
         self.tmp_path = os.path.join(args.tmp_path, self.path.split("/")[-1]) # path to tmp dir
-        os.mkdir(self.tmp_path)
+        os.makedirs(self.tmp_path, exist_ok=args.resume)
         self.results_path = os.path.join(args.results_path, self.path.split("/")[-1]) # path to results dir
-        os.mkdir(self.results_path)
+        os.makedirs(self.results_path, exist_ok=args.resume)
         self.size_measure_file = os.path.join(self.results_path, "size_measurements.csv")
         self.git_sizer_measurements_file = os.path.join(self.results_path, "git_sizer_measurements.csv")
         self.phases_file =  os.path.join(self.results_path, "simulation_phases.csv")
+        self.time_breakdown_file = os.path.join(self.results_path, "time_breakdown.csv")
+        self.trace_file = os.path.abspath(os.path.join(self.tmp_path, "trace.events")) if args.trace else None # span events of the current operation
         self.bundle_dir= os.path.join(self.results_path, "bundles")
         self.delta_old_refs= None
         self.delta_bundle_dir= os.path.join(self.results_path, "delta_bundles")
-        os.mkdir(self.bundle_dir)
+        os.makedirs(self.bundle_dir, exist_ok=args.resume)
         self.accounts = []
         self.merge_needed = []
         self.num_of_token_operations = 0
@@ -85,32 +117,127 @@ class GOC():
         self.simulation_overview = []
         self.simulation_phases = []
         self.git_sizer_measurements = []
-        shutil.rmtree(self.account_dir, ignore_errors=True)
+        self.time_breakdown = {} # {"<operation>\t<script>\t<depth>\t<phase>": [spans, seconds, git, python3, objects]}, string keys are stored in the progress markers
+        # totals of the incremental measurements (--incremental_measurements)
+        self.incremental_totals = {name: 0 for name in ["size_bundle_file", "num_objects", "num_deltas", "size_pack_file", "size_loose_objects", "uniqueBlobCount", "uniqueBlobSize",
+                                                        "uniqueTreeCount", "uniqueTreeEntries", "uniqueTreeSize", "uniqueCommitCount", "uniqueCommitSize", "naiveTreeSize"]}
+        self.naive_tree_sizes = {} # {tree: naive size of the tree and its subtrees}
+        self.objects = None # object reader of the ledger repository, used by the incremental measurements
+        self.measured_objects = None # {object id} of all objects counted by the incremental measurements
+        if not args.resume: # the ledger repository is reset to the last progress marker by restore()
+            shutil.rmtree(self.account_dir, ignore_errors=True)
 
         # if a path to the full goc executables (one author per repo) exists
         if full_exec_path:
             self.time_measurements_file=os.path.join(self.results_path, "time_measurements.csv")
             self.time_measurements=[]
+            self.checkpoint_measurements_file=os.path.join(self.results_path, "checkpoint_measurements.csv") # per-account checkpoint time
+            self.checkpoint_measurements=[]
             subprocess.call([os.path.join(full_exec_path, "author-initialize"), os.path.join(self.tmp_path, "sync_repo") ,"sync"])
             self.sync_repo=os.path.join(self.tmp_path, "sync_repo")
 
 
 
 
+    # requests of the ledger daemon replacing the token operation scripts, built from the script arguments after the repository path
+    DAEMON_REQUESTS = {
+        "token-create": lambda token, author, amount: {"op": "create", "token_alias": token, "author_alias": author, "amount": amount},
+        "token-burn": lambda token, author, amount: {"op": "burn", "token_alias": token, "author_alias": author, "amount": amount},
+        "token-giveTo": lambda token, author, recipient, amount: {"op": "giveTo", "token_alias": token, "author_alias": author, "recipient_alias": recipient, "amount": amount},
+        "token-ackFrom": lambda token, author, sender: {"op": "ackFrom", "token_alias": token, "author_alias": author, "sender_alias": sender},
+    }
+
     def executeCommand(self, cmd):
         cmd = [str(i) for i in cmd] # make sure that every part of the command is a string
-        cmd[0] = os.path.join(self.path, cmd[0])
-        logger.debug("executing: %s", cmd) 
-        exec = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE) # , stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        out, err = exec.communicate()
+        operation = cmd[0]
+        env = None
+        if self.trace_file:
+            if os.path.exists(self.trace_file):
+                os.remove(self.trace_file)
+            env = dict(os.environ, GOC_TRACE=self.trace_file)
+        if self.use_daemon and cmd[0] in GOC.DAEMON_REQUESTS:
+            returncode, out, err = self.executeRequest(GOC.DAEMON_REQUESTS[cmd[0]](*cmd[2:]))
+        else:
+            cmd[0] = os.path.join(self.path, cmd[0])
+            logger.debug("executing: %s", cmd) 
+            exec = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env) # , stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            out, err = exec.communicate()
+            out, err, returncode = out.decode(), err.decode(), exec.returncode
+            self.daemon_refresh = True
         self.num_of_exec += 1
-        logger.debug(out.decode())
+        logger.debug(out)
+        if self.trace_file:
+            self.collectTrace(operation)
         if self.num_of_token_operations % 200 == 0:
             self.measureRepoSize()
-        if exec.returncode != 0:
-            logger.fatal(f"Error executing command: {err.decode()}")
+        if returncode != 0:
+            logger.fatal(f"Error executing command: {err}")
             #os._exit(1)
 
+    def executeRequest(self, request):
+        # sends the request to the ledger daemon, which is started on the first request; returns (exit code, output, error) like a script
+        if self.daemon is None:
+            socket_path = os.path.join(self.tmp_path, "goc.sock")
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            env = dict(os.environ, PYTHONPATH=os.path.join(SCRIPTDIR, DELTA_GOC_EXECUTABLES_PATH))
+            if self.trace_file:
+                env["GOC_TRACE"] = self.trace_file # the daemon appends the span events of every request
+            self.daemon_process = subprocess.Popen([sys.executable, "-m", "goc", "serve", "--socket", socket_path, self.account_dir], env=env)
+            while not os.path.exists(socket_path):
+                if self.daemon_process.poll() is not None:
+                    logger.fatal("The ledger daemon could not be started")
+                    os._exit(1)
+                time.sleep(0.01)
+            self.daemon = DaemonClient(socket_path)
+            self.daemon_refresh = False # the daemon reads the references at startup
+
+        logger.debug("request: %s", request)
+        response = self.daemon.request(**request, refresh=self.daemon_refresh)
+        self.daemon_refresh = False
+        if response["ok"]:
+            return 0, response["message"], ""
+        return response["code"], "", response["error"]
+
+    def collectTrace(self, operation):
+        # adds the span events of the last operation to the time breakdown of its operation type
+        if not os.path.exists(self.trace_file):
+            return
+        with open(self.trace_file) as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue # incomplete event of a killed process
+                key = "\t".join([operation, event["script"], str(event["depth"]), event["phase"]])
+                totals = self.time_breakdown.setdefault(key, [0, 0.0, 0, 0, 0])
+                totals[0] += 1
+                totals[1] += event["seconds"]
+                totals[2] += event["git"]
+                totals[3] += event["python3"]
+                totals[4] += event["objects"]
+
+    def writeTimeBreakdown(self):
+        # the share relates the time of a span to the total time of the operation type (the "total" spans of the outermost process)
+        breakdown = sorted((*key.split("\t"), totals) for key, totals in self.time_breakdown.items())
+        operation_totals = {}
+        for operation, script, depth, phase, totals in breakdown:
+            if depth == "0" and phase == "total":
+                operation_totals[operation] = operation_totals.get(operation, 0) + totals[1]
+        rows = []
+        for operation, script, depth, phase, (spans, seconds, git, python3, objects) in breakdown:
+            share = seconds / operation_totals[operation] if operation_totals.get(operation) else None
+            rows.append([operation, script, int(depth), phase, spans, seconds, seconds / spans, share, git / spans, python3 / spans, objects / spans])
+        csv = pd.DataFrame(rows, columns=["operation", "script", "depth", "phase", "spans", "seconds", "mean_seconds", "share", "mean_git", "mean_python3", "mean_objects"])
+        csv.to_csv(self.time_breakdown_file, index=False)
+
+    def stopDaemon(self):
+        if self.daemon is not None:
+            self.daemon.close()
+            self.daemon_process.terminate()
+            self.daemon_process.wait()
+            self.daemon = None
+
     def author_init(self, author_alias):
         cmd = ["initialize-author", self.account_dir, author_alias]
         self.executeCommand(cmd)
@@ -119,6 +246,8 @@ class GOC():
         # setup git remote
         if len(self.accounts) == 1 and self.full_exec_path:
             subprocess.call(["git", "remote", "add", "sync", os.path.join(SCRIPTDIR, self.sync_repo)], cwd=self.account_dir)
+        if len(self.accounts) == 1 and self.compact_maps:
+            subprocess.call(["git", "config", "goc.mapEncoding", "compact"], cwd=self.account_dir)
 
 
     def token_init(self, author_alias, token_alias):
@@ -153,8 +282,12 @@ class GOC():
     
     def check_balance(self, simulated_balance):
         is_balance_correct=True
+        if self.use_ledger_engine:
+            balances = self.getBalances(simulated_balance.keys()) # single batched query for all accounts
+        else:
+            balances = {acc: self.getBalance(*acc) for acc in simulated_balance}
         for (id, tokenID), expected_balance in simulated_balance.items():
-            balance = self.getBalance(id, tokenID)
+            balance = balances[(id, tokenID)]
             if (balance != expected_balance):
                 is_balance_correct=False
                 logger.warning("Balance missmatch for account '%s'/'%s', expected: %s, actual: %s "
@@ -163,6 +296,8 @@ class GOC():
 
 
     def getBalance(self, account, tokenID):
+        if self.use_ledger_engine:
+            return self.getBalances([(account, tokenID)])[(account, tokenID)]
         cmd = [os.path.join(self.path, "account-balance"), self.account_dir, str(tokenID), str(account)]
         process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         output, err = process.communicate()
@@ -170,7 +305,83 @@ class GOC():
         if not balance:
             return 0
         return int(balance)
+
+    def getBalances(self, accounts):
+        # computes the balances of the given (account alias, token alias) pairs in-process, sharing one object reader
+        if self.ledger is None:
+            self.ledger = Ledger(self.account_dir)
+            self.aliases = AliasTable(self.ledger.repo.git_dir)
+        self.ledger.repo.refresh() # the scripts updated the references since the last query
+
+        balances = {}
+        resolved = {} # {(tokenID, authorID): (account alias, token alias)}
+        for account, tokenID in accounts:
+            balances[(account, tokenID)] = 0 # unknown aliases have a balance of 0
+            author_id = self.aliases.author_id(str(account))
+            token = self.aliases.token_id(str(tokenID)) or self.ledger.repo.ref(f"refs/local/token_alias/{tokenID}")
+            if author_id is None:
+                alias_file = os.path.join(self.account_dir, ".git", "alias_lookup", str(account))
+                if os.path.isfile(alias_file):
+                    with open(alias_file) as f:
+                        author_id = f.read().strip()
+            if author_id is None or token is None:
+                continue
+            resolved[(token, author_id)] = (account, tokenID)
+
+        for token, author_id, balance, error in self.ledger.balances(resolved.keys()):
+            if error is not None:
+                logger.warning("Error while creating checkpoint: %s", error)
+                continue
+            balances[resolved[(token, author_id)]] = balance
+        return balances
  
+    # attributes that are stored in the progress markers of the replay log
+    RESUMABLE_ATTRIBUTES = ["accounts", "merge_needed", "num_of_token_operations", "num_of_exec", "num_of_token_init", "num_of_token_create",
+                            "num_of_token_burn", "num_of_token_giveTo", "num_of_token_ackFrom", "size_measurements", "simulation_overview",
+                            "simulation_phases", "git_sizer_measurements", "time_measurements", "checkpoint_measurements", "incremental_totals",
+                            "time_breakdown"]
+
+    def snapshot(self):
+        # returns the state of the simulation and of the ledger repository, objects are append-only, therefore the references are sufficient
+        snapshot = {"attributes": {name: getattr(self, name) for name in GOC.RESUMABLE_ATTRIBUTES if hasattr(self, name)}, "refs": {}, "allowed_signers_size": 0}
+        if os.path.isdir(self.account_dir):
+            output = subprocess.check_output(["git", "for-each-ref", "--format=%(objectname) %(refname)"], cwd=self.account_dir).decode()
+            snapshot["refs"] = {name: sha for sha, name in (line.split(" ", 1) for line in output.splitlines())}
+            snapshot["allowed_signers_size"] = os.path.getsize(os.path.join(self.account_dir, ".git", "allowed_signers"))
+        return snapshot
+
+    def restore(self, snapshot):
+        # resets the simulation and the ledger repository to the given snapshot, i.e. undoes all operations executed after the snapshot was taken
+        for name, value in snapshot["attributes"].items():
+            setattr(self, name, value)
+        if not os.path.isdir(self.account_dir):
+            return
+
+        # reset the references, which also removes tokens and accounts created after the snapshot
+        output = subprocess.check_output(["git", "for-each-ref", "--format=%(refname)"], cwd=self.account_dir).decode()
+        stdin = "".join(f"delete {name}\n" for name in output.split() if name not in snapshot["refs"])
+        stdin += "".join(f"update {name} {sha}\n" for name, sha in snapshot["refs"].items())
+        subprocess.run(["git", "update-ref", "--stdin"], input=stdin.encode(), cwd=self.account_dir, check=True)
+
+        # remove the aliases and keys of authors initialized after the snapshot
+        git_dir = os.path.join(self.account_dir, ".git")
+        for alias in os.listdir(os.path.join(git_dir, "alias_lookup")):
+            if alias not in self.accounts:
+                for path in [os.path.join(git_dir, "alias_lookup", alias), os.path.join(git_dir, "keys", alias), os.path.join(git_dir, "keys", f"{alias}.pub")]:
+                    if os.path.exists(path):
+                        os.remove(path)
+        with open(os.path.join(git_dir, "allowed_signers"), "r+") as f:
+            f.truncate(snapshot["allowed_signers_size"])
+        if self.ledger is not None:
+            self.ledger.repo.refresh()
+        if os.path.exists(os.path.join(git_dir, "alias_table")): # drop the aliases of the removed authors and tokens
+            repo = Repository(self.account_dir)
+            try:
+                AliasTable(git_dir).rebuild(repo)
+            finally:
+                repo.close()
+        self.daemon_refresh = True
+
     def create_overview(self, f_name, num_init_account, num_init_token, num_create, num_transactions):
         self.simulation_overview.append([f_name, num_init_account, num_init_token, num_create, num_transactions])
         csv = pd.DataFrame(self.simulation_overview, columns=["f_name", "num_init_account", "num_init_token", "num_create", "num_transactions"])
@@ -184,6 +395,63 @@ class GOC():
     def measureRepoSize(self):
         # git-sizer -j --json-version=2 --branches 2> /dev/null
         logger.info("start measurements (%s ops)", self.num_of_token_operations)
+        if args.incremental_measurements:
+            size_values, git_sizer_values = self.measureNewObjects()
+        else:
+            size_values, git_sizer_values = self.measureFullRepo()
+
+        #save git_sizer measurements
+        self.git_sizer_measurements.append([self.num_of_token_operations, *git_sizer_values])
+        git_sizer_csv= pd.DataFrame(self.git_sizer_measurements, columns=['num_of_operations', 'uniqueBlobCount', 'uniqueBlobSize', 'uniqueTreeCount', 'uniqueTreeEntries', 'uniqueTreeSize', 'uniqueCommitCount', 'uniqueCommitSize', 'naiveTreeSize'])
+        git_sizer_csv.to_csv(self.git_sizer_measurements_file, index=False)
+
+        # measure time required to update other replica
+        if self.full_exec_path and len(self.accounts) > 0:
+            logger.debug("measure push time")
+            #measure push
+            push_start_time=time.time()
+            subprocess.call([os.path.join(self.path, "repo-push"), self.account_dir, self.accounts[0], "sync"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            push_finish_time=time.time()
+            push_time=push_finish_time - push_start_time
+
+            logger.debug("measure merge time")
+            # measure merge frontier
+            merge_start_time=time.time()
+            subprocess.call([os.path.join(self.full_exec_path, "repo-merge"), os.path.join(SCRIPTDIR, self.sync_repo)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            merge_finish_time=time.time()
+            merge_time=merge_finish_time-merge_start_time
+
+            logger.debug("measure checkpoint time")
+            # compute the checkpoints of all existing accounts with a pool of workers
+            checkpoint_start_time=time.time()
+            timings = checkpoint_all(self.sync_repo, jobs=args.checkpoint_jobs)
+            checkpoint_finish_time=time.time()
+            checkpoint_time=checkpoint_finish_time-checkpoint_start_time
+            for timing in timings:
+                if timing.error is not None:
+                    logger.warning("Error while creating checkpoint: %s", timing.error)
+                self.checkpoint_measurements.append([self.num_of_token_operations, timing.token_type, timing.author_id, timing.seconds])
+            checkpoint_csv = pd.DataFrame(self.checkpoint_measurements, columns=["num_of_operations", "token", "author", "checkpoint_time"])
+            checkpoint_csv.to_csv(self.checkpoint_measurements_file, index=False)
+
+            self.time_measurements.append([self.num_of_token_operations, push_time, merge_time, checkpoint_time])
+            csv = pd.DataFrame(self.time_measurements, columns=["num_of_operations", "push_time", "merge_time", "checkpoint_time"])
+            csv.to_csv(self.time_measurements_file, index=False)
+
+        # save measurements
+        logger.debug("save csv")
+        size_bundle_file, num_objects, num_deltas, pack_size, repo_size, delta_bundle_size = size_values
+        self.size_measurements.append([self.num_of_token_operations, size_bundle_file, num_objects, num_deltas, pack_size, repo_size, self.num_of_token_init, self.num_of_token_create, self.num_of_token_burn, self.num_of_token_giveTo, self.num_of_token_ackFrom, delta_bundle_size])
+        # the incremental measurements only measure the loose objects, not the unpacked repository (.git directory including hooks, config, ...)
+        repo_size_column = "size_loose_objects" if args.incremental_measurements else "size_unpacked_repo"
+        csv = pd.DataFrame(self.size_measurements, columns=["num_of_operations", "size_bundle_file", "num_objects", "num_deltas", "size_pack_file", repo_size_column, "#init", "#create", "#burn", "#giveTo", "#ackFrom", "delta_bundle_size"])
+        csv.to_csv(self.size_measure_file, index=False)
+        if self.trace_file:
+            self.writeTimeBreakdown()
+        logger.debug("measurement finished")
+
+    def measureFullRepo(self):
+        # measures the entire repository by creating a full bundle, cloning and unpacking it
 
         # create full bundle, measure num of objects and deltas
         logger.debug("create bundle")
@@ -261,103 +529,243 @@ class GOC():
                     naive_tree_size += tree.size
 
         measurements_json=json.loads(output.decode())
-        
-        #save git_sizer measurements
-        self.git_sizer_measurements.append([self.num_of_token_operations, measurements_json['uniqueBlobCount']['value'], measurements_json['uniqueBlobSize']['value'], measurements_json['uniqueTreeCount']['value'],
-                                             measurements_json['uniqueTreeEntries']['value'], measurements_json['uniqueTreeSize']['value'], measurements_json['uniqueCommitCount']['value'], measurements_json['uniqueCommitSize']['value'], naive_tree_size ])
-        git_sizer_csv= pd.DataFrame(self.git_sizer_measurements, columns=['num_of_operations', 'uniqueBlobCount', 'uniqueBlobSize', 'uniqueTreeCount', 'uniqueTreeEntries', 'uniqueTreeSize', 'uniqueCommitCount', 'uniqueCommitSize', 'naiveTreeSize'])
-        git_sizer_csv.to_csv(self.git_sizer_measurements_file, index=False)
-
-        # measure time required to update other replica
-        if self.full_exec_path and len(self.accounts) > 0:
-            logger.debug("measure push time")
-            #measure push
-            push_start_time=time.time()
-            subprocess.call([os.path.join(self.path, "repo-push"), self.account_dir, self.accounts[0], "sync"], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            push_finish_time=time.time()
-            push_time=push_finish_time - push_start_time
-
-            logger.debug("measure merge time")
-            # measure merge frontier
-            merge_start_time=time.time()
-            subprocess.call([os.path.join(self.full_exec_path, "repo-merge"), os.path.join(SCRIPTDIR, self.sync_repo)], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            merge_finish_time=time.time()
-            merge_time=merge_finish_time-merge_start_time
-
-            logger.debug("measure checkpoint time")
-            #get all existing accounts
-            get_refs_p=subprocess.Popen('git for-each-ref --format="%(refname)" "refs/heads/frontier/*/*"', shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.sync_repo)
-            out, err = get_refs_p.communicate()
-            refs = out.decode().split("\n")[:-1]
-            accounts= []
-            for ref in refs:
-                split = ref.split("/")
-                authorID = split[-1]
-                tokenID = split[-2]
-                accounts.append((tokenID, authorID))
-
-            #measure checkpoint computation
-            checkpoint_start_time=time.time()
-            for acc in accounts:
-                tokenID, authorID = acc
-                subprocess.call([os.path.join(self.full_exec_path, "account-checkpoint"), self.sync_repo, tokenID, authorID])
-            checkpoint_finish_time=time.time()
-            checkpoint_time=checkpoint_finish_time-checkpoint_start_time
-
-            self.time_measurements.append([self.num_of_token_operations, push_time, merge_time, checkpoint_time])
-            csv = pd.DataFrame(self.time_measurements, columns=["num_of_operations", "push_time", "merge_time", "checkpoint_time"])
-            csv.to_csv(self.time_measurements_file, index=False)
-
-
-        # save measurements
-        logger.debug("save csv")
-        self.size_measurements.append([self.num_of_token_operations, len(bundle_file_bytes), int(num_objects), int(num_deltas), pack_size, repo_size, self.num_of_token_init, self.num_of_token_create, self.num_of_token_burn, self.num_of_token_giveTo, self.num_of_token_ackFrom, delta_bundle_size])
-        csv = pd.DataFrame(self.size_measurements, columns=["num_of_operations", "size_bundle_file", "num_objects", "num_deltas", "size_pack_file", "size_unpacked_repo", "#init", "#create", "#burn", "#giveTo", "#ackFrom", "delta_bundle_size"])
-        csv.to_csv(self.size_measure_file, index=False)
+        git_sizer_values = [measurements_json['uniqueBlobCount']['value'], measurements_json['uniqueBlobSize']['value'], measurements_json['uniqueTreeCount']['value'],
+                            measurements_json['uniqueTreeEntries']['value'], measurements_json['uniqueTreeSize']['value'], measurements_json['uniqueCommitCount']['value'], measurements_json['uniqueCommitSize']['value'], naive_tree_size]
 
         logger.debug("wiping repo")
         os.remove(tmp_bundle)
         shutil.rmtree(tmp_repo)
-        logger.debug("measurement finished")
+        return (len(bundle_file_bytes), int(num_objects), int(num_deltas), pack_size, repo_size, delta_bundle_size), git_sizer_values
+
+    def measureNewObjects(self):
+        # measures only the objects added since the previous measurement (i.e. all objects that are not reachable from refs/measurement/*)
+        # and adds them to the totals of the previous measurement; bundle and pack file size are the sums of the bundles of the new objects
+        totals = self.incremental_totals
+        if self.objects is None:
+            self.objects = ObjectReader(self.account_dir)
+
+        # create bundle containing the new objects, measure num of deltas
+        logger.debug("create delta bundle")
+        delta_bundle_p= subprocess.Popen('git bundle create --progress - --branches --not --glob="refs/measurement/*"', shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.account_dir)
+        output, err = delta_bundle_p.communicate()
+        counts = re.findall(r'Total (\d+) \(delta (\d+)\)', err.decode())
+        delta_bundle_size = 0 # git refuses to create an empty bundle, if there are no new objects
+        if delta_bundle_p.returncode == 0 and counts:
+            delta_bundle_size = len(output)
+            totals["size_bundle_file"] += delta_bundle_size
+            totals["size_pack_file"] += delta_bundle_size - (output.index(b"\n\n") + 2) # the bundle header ends with an empty line
+            totals["num_deltas"] += int(counts[0][1])
+            os.makedirs(self.delta_bundle_dir, exist_ok=True)
+            with open(os.path.join(self.delta_bundle_dir, f"{self.num_of_token_operations}.bundle"), "wb") as f:
+                f.write(output)
+
+        # measure the new objects; the size of an object as loose object is computed from its content (zlib level 1, core.looseCompression),
+        # since the ledger repository may store it in a pack (`%(objectsize:disk)` would be its packed, possibly delta-compressed size)
+        logger.debug("measure new objects")
+        if self.measured_objects is None: # all objects of the previous measurements, rev-list only excludes the objects of the boundary commits
+            rev_list_p = subprocess.run('git rev-list --objects --glob="refs/measurement/*"', shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.account_dir)
+            self.measured_objects = {line.split(" ", 1)[0] for line in rev_list_p.stdout.decode().splitlines()}
+        rev_list_p = subprocess.run('git rev-list --objects --branches --not --glob="refs/measurement/*"', shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.account_dir)
+        new_objects = ""
+        for line in rev_list_p.stdout.decode().splitlines():
+            sha = line.split(" ", 1)[0]
+            if sha not in self.measured_objects:
+                self.measured_objects.add(sha)
+                new_objects += sha + "\n"
+        check_p = subprocess.run(["git", "cat-file", "--batch-check=%(objectname) %(objecttype) %(objectsize)"], input=new_objects.encode(),
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.account_dir)
+        for line in check_p.stdout.decode().splitlines():
+            sha, obj_type, size = line.split()
+            totals[f"unique{obj_type.capitalize()}Count"] += 1
+            totals[f"unique{obj_type.capitalize()}Size"] += int(size)
+            if obj_type == "tree":
+                totals["uniqueTreeEntries"] += len(self.objects.tree(sha))
+            totals["num_objects"] += 1
+            content = self.objects.read(sha)[1]
+            totals["size_loose_objects"] += len(zlib.compress(f"{obj_type} {size}\0".encode() + content, 1))
+
+        # naive tree size of the new first-parent commits of every branch (like the full measurement, shared commits are counted once per branch)
+        output = subprocess.check_output(["git", "for-each-ref", "--format=%(objectname) %(refname)", "refs/heads/", "refs/measurement/"], cwd=self.account_dir).decode()
+        refs = {name: sha for sha, name in (line.split(" ", 1) for line in output.splitlines())}
+        for name, commit in refs.items():
+            if not name.startswith("refs/heads/"):
+                continue
+            measured_commit = refs.get("refs/measurement/" + name[len("refs/heads/"):])
+            while commit is not None and commit != measured_commit:
+                totals["naiveTreeSize"] += self.naiveTreeSize(self.objects.commit(commit).tree)
+                parents = self.objects.commit(commit).parents
+                commit = parents[0] if parents else None
+
+        # fetch all frontier refs into separate refs, to exclude them in the next measurement
+        fetch_p = subprocess.Popen('git fetch --no-auto-maintenance --no-auto-gc . "refs/heads/*:refs/measurement/*"', shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self.account_dir)
+        _ , _ = fetch_p.communicate()
+
+        size_values = (totals["size_bundle_file"], totals["num_objects"], totals["num_deltas"], totals["size_pack_file"], totals["size_loose_objects"], delta_bundle_size)
+        git_sizer_values = [totals[name] for name in ["uniqueBlobCount", "uniqueBlobSize", "uniqueTreeCount", "uniqueTreeEntries", "uniqueTreeSize", "uniqueCommitCount", "uniqueCommitSize", "naiveTreeSize"]]
+        return size_values, git_sizer_values
+
+    def naiveTreeSize(self, tree):
+        # size of the tree of a commit and its subtrees, trees are immutable and therefore measured only once
+        size = self.naive_tree_sizes.get(tree)
+        if size is None:
+            size = len(self.objects.read(tree)[1])
+            for name, entry in self.objects.tree(tree).items():
+                if entry.type == "tree" or name in ("giveTo", "ackFrom"): # compact maps are blobs (--compact_maps)
+                    size += len(self.objects.read(entry.sha)[1])
+            self.naive_tree_sizes[tree] = size
+        return size
+
+
+class ReplayLog():
+    """Prepared operation streams and progress markers of a simulation, used to resume an interrupted simulation (--resume).
+
+    The auxiliary data of every day is written once (pickled and compressed) together with the simulated balances after the day,
+    so a resumed simulation neither has to read nor to preprocess the .tsv.gz files of these days again.
+    A progress marker stores the position in the operation stream of the current day and a snapshot of the GOC helper and its ledger repository.
+    """
+
+    def __init__(self, replay_path):
+        self.replay_path = replay_path
+        self.progress_file = os.path.join(replay_path, "progress.json")
+        os.makedirs(replay_path, exist_ok=True)
+
+    def _day_file(self, day):
+        return os.path.join(self.replay_path, f"{day}.pickle.gz")
+
+    def has_day(self, day):
+        return os.path.isfile(self._day_file(day))
+
+    def write_day(self, day, prepared, state):
+        tmp_file = self._day_file(day) + ".tmp"
+        with gzip.open(tmp_file, "wb") as f:
+            pickle.dump((prepared, state), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self._day_file(day))
+
+    def read_day(self, day):
+        # returns (prepared, state): the auxiliary data of the day and the simulated state after preprocessing the day
+        with gzip.open(self._day_file(day), "rb") as f:
+            return pickle.load(f)
+
+    def read_progress(self):
+        try:
+            with open(self.progress_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write_progress(self, day, num_operations, day_done, num_of_transactions, exec: GOC):
+        progress = {"day": day, "num_operations": num_operations, "day_done": day_done, "num_of_transactions": num_of_transactions, "goc": exec.snapshot()}
+        tmp_file = self.progress_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(progress, f)
+        os.replace(tmp_file, self.progress_file) # atomic, a crash while writing keeps the previous marker
 
 
 # performs the simulations with the already computed simulation data
-def simulate(exec: GOC, f_name, need_init_account, need_init_token, need_create, transactions):
+def operations(f_name, need_init_account, need_init_token, need_create, transactions):
+    # generates the operation stream of a single day as (name of the GOC method, arguments)
 
     # 1. author init phase
-    exec.create_overview(f_name, len(need_init_account), len(need_init_token), len(need_create), len(transactions))
-    exec.log_phase(f_name, "author_init")
+    yield "create_overview", (f_name, len(need_init_account), len(need_init_token), len(need_create), len(transactions))
+    yield "log_phase", (f_name, "author_init")
     for accID in need_init_account:
-        exec.author_init(accID)
-    
+        yield "author_init", (accID,)
+
     # 2. token init phase
-    exec.log_phase(f_name, "token_init")
+    yield "log_phase", (f_name, "token_init")
     for (accID, tokenID) in need_init_token:
-        exec.token_init(accID, tokenID)
-    
+        yield "token_init", (accID, tokenID)
+
     # 3. token create phase
-    exec.log_phase(f_name, "token_create")
+    yield "log_phase", (f_name, "token_create")
     for acc, amount in need_create.items():
         accID, tokenID = acc
-        exec.token_create(accID, tokenID, amount)
-    
+        yield "token_create", (accID, tokenID, amount)
+
     # 4. transaction phase
-    exec.log_phase(f_name, "transactions_start")
+    yield "log_phase", (f_name, "transactions_start")
     for sender, recipient, token_address, value in transactions:
 
         #create
         if sender == "0000000000000000000000000000000000000000":
-            exec.token_create(recipient, token_address, value)
+            yield "token_create", (recipient, token_address, value)
             continue
         #burn
         if recipient == "0000000000000000000000000000000000000000":
-            exec.token_burn(sender, token_address, value)
+            yield "token_burn", (sender, token_address, value)
             continue
-        exec.token_giveTo(sender, token_address, recipient, value)
-        exec.token_ackFrom(recipient, token_address, sender)
-    exec.log_phase(f_name, "transactions_end")
+        yield "token_giveTo", (sender, token_address, recipient, value)
+        yield "token_ackFrom", (recipient, token_address, sender)
+    yield "log_phase", (f_name, "transactions_end")
 
 
+def simulate(exec: GOC, f_name, need_init_account, need_init_token, need_create, transactions, start=0, on_progress=None):
+    # executes the operation stream of a single day, skipping the first `start` operations (already executed before the simulation was interrupted)
+    for i, (method, arguments) in enumerate(operations(f_name, need_init_account, need_init_token, need_create, transactions)):
+        if i < start:
+            continue
+        getattr(exec, method)(*arguments)
+        if on_progress is not None:
+            on_progress(i + 1)
+
+
+
+
+
+def preprocess(f, simulated_balance, existing_token, existing_accounts, chunksize):
+    """Simulates the transactions of a single day in python, reading the .tsv.gz file in chunks of `chunksize` rows.
+    Updates simulated_balance, existing_token and existing_accounts and returns the auxiliary data (need_init_account, need_init_token,
+    need_create, transactions) later used for simulating the transactions with the GOC-Ledger, as well as the number of rows of the day.
+    """
+    need_init_token = [] # [(accId, tokenID)]
+    need_init_account = [] # [accountID]
+    need_create = {} # {(accId, tokenID): value}
+    transactions = [] # [(sender, receiver, tokentype, value)]
+    num_of_rows = 0
+
+    # block_id, transaction_hash, time, token_address, token_name, token_symbol, token_decimals, sender, recipient, value
+    chunks = pd.read_csv(f, sep='\t', usecols=["token_address", "sender", "recipient", "value"], converters={'value': int},
+                         dtype={"token_address": str, "sender": str, "recipient": str}, chunksize=chunksize)
+    for data in chunks:
+        num_of_rows += len(data.index)
+
+        # skip transactions that don't transfer any tokens
+        data = data[(data.value != 0) & ((data.sender != ZERO_ADDRESS) | (data.recipient != ZERO_ADDRESS))]
+        senders = data.sender.to_numpy()
+        recipients = data.recipient.to_numpy()
+        tokens = data.token_address.to_numpy()
+        values = data.value.to_numpy(dtype=object) # python ints, token values may exceed 64 bit
+
+        # accounts in order of their first appearance (sender before recipient of the same transaction)
+        for acc in pd.unique(np.column_stack((senders, recipients)).ravel()):
+            if acc != ZERO_ADDRESS and acc not in existing_accounts:
+                need_init_account.append(acc)
+                existing_accounts.add(acc)
+
+        # token types are initialized by the recipient of their first create or the sender of their first transfer (burns don't initialize a token)
+        is_create = senders == ZERO_ADDRESS
+        not_burn = recipients != ZERO_ADDRESS
+        first_use = pd.DataFrame({"token": tokens[not_burn], "acc": np.where(is_create, recipients, senders)[not_burn]}).drop_duplicates("token")
+        for token, acc in zip(first_use.token.to_numpy(), first_use.acc.to_numpy()):
+            if token not in existing_token:
+                need_init_token.append((acc, token))
+                existing_token.add(token)
+
+        # the balances depend on the order of the transactions, therefore they are updated in a single pass over the columns
+        for sender, recipient, token, value in zip(senders, recipients, tokens, values):
+            if sender != ZERO_ADDRESS: # transfer or burn
+                key = (sender, token)
+                balance = simulated_balance.get(key, 0) - value
+                if balance < 0: # the sender needs additional tokens, which are created before the transactions
+                    need_create[key] = need_create.get(key, 0) - balance
+                    balance = 0
+                simulated_balance[key] = balance
+            if recipient != ZERO_ADDRESS: # transfer or create; read after the update of the sender, because the sender and receiver could be equal
+                key = (recipient, token)
+                simulated_balance[key] = simulated_balance.get(key, 0) + value
+        transactions.extend(zip(senders, recipients, tokens, values))
+
+    return need_init_account, need_init_token, need_create, transactions, num_of_rows
 
 
 
@@ -366,14 +774,26 @@ num_of_transactions = 0
 
 
 if args.delta:
-    goc = GOC(DELTA_GOC_SINGLE_REPO_EXECUTABLES_PATH, DELTA_GOC_REPO_DIR)
+    goc = GOC(DELTA_GOC_SINGLE_REPO_EXECUTABLES_PATH, DELTA_GOC_REPO_DIR, use_ledger_engine=True, use_daemon=args.daemon, compact_maps=args.compact_maps)
 else:
     goc = GOC(GOC_SINGLE_REPO_EXECUTABLES_PATH, GOC_REPO_DIR)
 
 # cached information needed to simulate the transactions
 simulated_balance = {} # {(accID, tokenID): balance)}
-existing_token = [] # [tokenID]
-existing_accounts = [] # [accountID]
+existing_token = set() # {tokenID}
+existing_accounts = set() # {accountID}
+
+replay_log = ReplayLog(os.path.join(args.tmp_path, "replay"))
+progress = None
+if args.resume:
+    progress = replay_log.read_progress()
+    if progress is None:
+        logger.warning("No progress marker found, starting a new simulation")
+    else:
+        logger.info("Resuming %s after %s operations", progress["day"], progress["num_operations"])
+        goc.restore(progress["goc"])
+        num_of_transactions = progress["num_of_transactions"]
+        _, (simulated_balance, existing_token, existing_accounts) = replay_log.read_day(progress["day"])
 
 start_time = time.time()
 logger.info("Start: %s", start_time)
@@ -385,96 +805,36 @@ for path in sorted(os.listdir(args.db_path)):
         logger.error("File %s is not valid", path)
         continue
 
-    logger.info("Opening %s", path)
-
-    # simulate transactions in python and generate auxiliary data later used for simulating transaction with the GOC-Ledger
-    with gzip.open(os.path.join(args.db_path, path), "r") as f:
-        data = pd.read_csv (f, sep = '\t', converters={'value': int}) # block_id, transaction_hash, time, token_address, token_name, token_symbol, token_decimals, sender, recipient, value
-        
-        need_init_token = [] # [(accId, tokenID)]
-        need_init_account = [] # [accountID]
-        need_create = {} # {(accId, tokenID): value}
-        transactions = [] # [[sender, receiver, tokentype, value]]
-        
-
-        for idx, transaction in data.iterrows():
-
-            if transaction.value == 0:
-                continue
-
-            if transaction.sender == "0000000000000000000000000000000000000000" and transaction.recipient == "0000000000000000000000000000000000000000":
-                continue
-
-            if transaction.sender not in existing_accounts and transaction.sender != "0000000000000000000000000000000000000000":
-                need_init_account.append(transaction.sender)
-                existing_accounts.append(transaction.sender)
-            
-            if transaction.recipient not in existing_accounts and transaction.recipient != "0000000000000000000000000000000000000000":
-                need_init_account.append(transaction.recipient)
-                existing_accounts.append(transaction.recipient)
-
-
-            # represents create op
-            if transaction.sender == "0000000000000000000000000000000000000000":
-                curr_balance = simulated_balance.get((transaction.recipient, transaction.token_address), 0)
-
-                new_balance = curr_balance + transaction.value
-
-                if transaction.token_address not in existing_token:
-                    need_init_token.append((transaction.recipient, transaction.token_address))
-                    existing_token.append(transaction.token_address)
-
-                
-
-                transactions.append([transaction.sender, transaction.recipient, transaction.token_address, transaction.value])
-                simulated_balance[(transaction.recipient, transaction.token_address)] = new_balance
-                continue
-            
-
-            # represents burn op
-            if transaction.recipient == "0000000000000000000000000000000000000000":
-                curr_balance = simulated_balance.get((transaction.sender, transaction.token_address), 0)
-                new_balance = curr_balance - transaction.value
-                if new_balance < 0:
-                    already_needed = need_create.get((transaction.sender, transaction.token_address), 0)
-                    need_create[(transaction.sender, transaction.token_address)] = already_needed + abs(new_balance)
-                    new_balance = 0
-                transactions.append([transaction.sender, transaction.recipient, transaction.token_address, transaction.value])
-                simulated_balance[(transaction.sender, transaction.token_address)] = new_balance
-                continue
-            
-
-            #perform transaction
-            sender_balance = simulated_balance.get((transaction.sender, transaction.token_address), 0)
-            receiver_balance = simulated_balance.get((transaction.recipient, transaction.token_address), 0)
-
-            diff = sender_balance - transaction.value
+    # skip days that were already simulated before the simulation was interrupted
+    start = 0
+    if progress is not None and (path < progress["day"] or (path == progress["day"] and progress["day_done"])):
+        continue
+    if progress is not None and path == progress["day"]:
+        start = progress["num_operations"]
 
-            if diff < 0:
-                already_needed = need_create.get((transaction.sender, transaction.token_address), 0)
-                need_create[(transaction.sender, transaction.token_address)] = already_needed + abs(diff)
-                sender_balance = 0
-            else:
-                sender_balance -= transaction.value
+    if replay_log.has_day(path):
+        logger.info("Reading %s from replay log", path)
+        (f_name, need_init_account, need_init_token, need_create, transactions, num_of_rows), (simulated_balance, existing_token, existing_accounts) = replay_log.read_day(path)
+    else:
+        logger.info("Opening %s", path)
 
-            if transaction.token_address not in existing_token:
-                need_init_token.append((transaction.sender, transaction.token_address))
-                existing_token.append(transaction.token_address)
-            
-            # update simulated balance
-            simulated_balance[(transaction.sender, transaction.token_address)] = sender_balance
-            receiver_balance = simulated_balance.get((transaction.recipient, transaction.token_address), 0) # get updated balance, because the sender and receiver could be equal
-            receiver_balance += transaction.value
+        # simulate transactions in python and generate auxiliary data later used for simulating transaction with the GOC-Ledger
+        with gzip.open(os.path.join(args.db_path, path), "r") as f:
+            need_init_account, need_init_token, need_create, transactions, num_of_rows = preprocess(f, simulated_balance, existing_token, existing_accounts, args.chunksize)
 
-            transactions.append([transaction.sender, transaction.recipient, transaction.token_address, transaction.value])
-            simulated_balance[(transaction.recipient, transaction.token_address)] = receiver_balance
+            logger.debug("simulated_balance: %s", simulated_balance)
+            logger.debug("need_init_token: %s", need_init_token)
+            logger.debug("need_create %s", need_create)
+        f_name = f.name
+        replay_log.write_day(path, (f_name, need_init_account, need_init_token, need_create, transactions, num_of_rows), (simulated_balance, existing_token, existing_accounts))
+    if start == 0:
+        num_of_transactions += num_of_rows
 
-        logger.debug("simulated_balance: %s", simulated_balance)
-        logger.debug("need_init_token: %s", need_init_token)
-        logger.debug("need_create %s", need_create)
-    num_of_transactions += len(data.index)
+    def on_progress(num_operations):
+        if num_operations % args.progress_interval == 0:
+            replay_log.write_progress(path, num_operations, False, num_of_transactions, goc)
 
-    simulate(goc, f.name, need_init_account, need_init_token, need_create, transactions)
+    simulate(goc, f_name, need_init_account, need_init_token, need_create, transactions, start, on_progress)
 
 
     # at the end of each simulated day, we check if the expected balance value matches with the simulated balance of the GOC-Ledger.
@@ -482,11 +842,15 @@ for path in sorted(os.listdir(args.db_path)):
     if not goc.check_balance(simulated_balance):
         logger.fatal("Error missmatch between simulated balance and actual balance")
         os._exit(1)
+    replay_log.write_progress(path, 0, True, num_of_transactions, goc)
         
     logger.info("Num op (goc): %s", goc.num_of_token_operations)
     logger.info("Num transactions: %s", num_of_transactions)
 
 
+goc.stopDaemon()
+if args.trace:
+    goc.writeTimeBreakdown()
 end_time=time.time()
 logger.info("End: %s", end_time)
 delta_time=end_time - start_time
@@ -8,6 +8,7 @@ from sklearn.linear_model import LinearRegression
 
 STATE_RESULTS_DIR="./results/single-repo-git-goc"
 DELTA_RESULTS_DIR="./results/single-repo-git-goc-delta"
+BENCHMARK_RESULTS_DIR="./results/benchmark"
 FIGURES_DIR="./figures"
 
 shutil.rmtree(FIGURES_DIR, ignore_errors=True)
@@ -145,34 +146,41 @@ plt.savefig(os.path.join(FIGURES_DIR, "delta_bundle_ratio.png"), bbox_inches='ti
 
 
 # Fig. 6.6 (Uncompressed repository size)
-repo_data = state_GOC_size_data[['num_of_operations']]
-repo_data = repo_data.assign(state_repo=state_GOC_size_data['size_unpacked_repo'].div(1000).round(2))
-repo_data = repo_data.assign(delta_repo=delta_GOC_size_data['size_unpacked_repo'].div(1000).round(2))
-
-repo_data.plot.line(x="num_of_operations", y=["state_repo","delta_repo"])
-
-plt.axvspan(0, start_create, color='red', alpha=0.2) # account + token init
-plt.axvspan(start_create + 1, start_transactions, color='blue', alpha=0.2) # token create
-plt.xlim([0, xMax])
-plt.legend(["state", "delta"])
-plt.xlabel("Number of token operations", fontsize=12)
-plt.ylabel("Size of repository (excluding local data) in KB", fontsize=12)
-plt.savefig(os.path.join(FIGURES_DIR,"repo.png"), bbox_inches='tight')
-
-
-# Fig. 6.7 (Compression factor)
-repo_data = repo_data.assign(state_ratio=(repo_data['state_repo'] / bundle_data['state_bundle']  * 100 ))
-repo_data = repo_data.assign(delta_ratio=(repo_data['delta_repo'] / bundle_data['delta_bundle']  * 100 ))
-
-
-repo_data.iloc[1: , :].plot.line(x="num_of_operations", y=["state_ratio","delta_ratio"]) # we skipped the first measurement, because it is an extreme outlier (this is documented in the evaluation chapter)
-plt.axvspan(0, start_create, color='red', alpha=0.2) # account + token init
-plt.axvspan(start_create + 1, start_transactions, color='blue', alpha=0.2) # token create
-plt.xlim([0, xMax])
-plt.legend(["state", "delta"])
-plt.xlabel("Number of token operations", fontsize=12)
-plt.ylabel("Compression factor in %", fontsize=12)
-plt.savefig(os.path.join(FIGURES_DIR,"bundle_repo_compression_ratio.png"), bbox_inches='tight')
+# simulations with --incremental_measurements only measure the loose objects (size_loose_objects), not the unpacked repository
+repo_size_columns = [column for column in ["size_unpacked_repo", "size_loose_objects"]
+                     if column in state_GOC_size_data.columns and column in delta_GOC_size_data.columns]
+if not repo_size_columns:
+    print("Skipping Fig. 6.6 and 6.7: the state-based and delta-based simulations were measured in different modes (--incremental_measurements)")
+else:
+    repo_size_column = repo_size_columns[0]
+    repo_data = state_GOC_size_data[['num_of_operations']]
+    repo_data = repo_data.assign(state_repo=state_GOC_size_data[repo_size_column].div(1000).round(2))
+    repo_data = repo_data.assign(delta_repo=delta_GOC_size_data[repo_size_column].div(1000).round(2))
+
+    repo_data.plot.line(x="num_of_operations", y=["state_repo","delta_repo"])
+
+    plt.axvspan(0, start_create, color='red', alpha=0.2) # account + token init
+    plt.axvspan(start_create + 1, start_transactions, color='blue', alpha=0.2) # token create
+    plt.xlim([0, xMax])
+    plt.legend(["state", "delta"])
+    plt.xlabel("Number of token operations", fontsize=12)
+    plt.ylabel("Size of repository (excluding local data) in KB" if repo_size_column == "size_unpacked_repo" else "Size of loose objects in KB", fontsize=12)
+    plt.savefig(os.path.join(FIGURES_DIR,"repo.png"), bbox_inches='tight')
+
+
+    # Fig. 6.7 (Compression factor)
+    repo_data = repo_data.assign(state_ratio=(repo_data['state_repo'] / bundle_data['state_bundle']  * 100 ))
+    repo_data = repo_data.assign(delta_ratio=(repo_data['delta_repo'] / bundle_data['delta_bundle']  * 100 ))
+
+
+    repo_data.iloc[1: , :].plot.line(x="num_of_operations", y=["state_ratio","delta_ratio"]) # we skipped the first measurement, because it is an extreme outlier (this is documented in the evaluation chapter)
+    plt.axvspan(0, start_create, color='red', alpha=0.2) # account + token init
+    plt.axvspan(start_create + 1, start_transactions, color='blue', alpha=0.2) # token create
+    plt.xlim([0, xMax])
+    plt.legend(["state", "delta"])
+    plt.xlabel("Number of token operations", fontsize=12)
+    plt.ylabel("Compression factor in %", fontsize=12)
+    plt.savefig(os.path.join(FIGURES_DIR,"bundle_repo_compression_ratio.png"), bbox_inches='tight')
 
 
 # Fig. 6.8 a) (Tree objects size)
@@ -222,3 +230,33 @@ blob_size_data = blob_size_data.assign(total_size_state_naive=blob_size_data['st
 blob_size_data = blob_size_data.assign(size_reduction=(blob_size_data['total_size_state_naive'] - blob_size_data['total_size_state']) / blob_size_data['total_size_state_naive'] * 100 )
 
 print("Avg state-based size reduction compared to the naive approach:", blob_size_data['size_reduction'].mean())
+
+
+# Operation latencies (benchmark.py), p50 and p95 latency of every operation depending on the log length of the account
+benchmark_file = os.path.join(BENCHMARK_RESULTS_DIR, "benchmark_summary.csv")
+if os.path.exists(benchmark_file):
+    benchmark_data = pd.read_csv(benchmark_file)
+    # one figure for the smallest number of counterparties and tokens and the first measured map encoding
+    if 'map_encoding' in benchmark_data.columns:
+        benchmark_data = benchmark_data[benchmark_data['map_encoding'] == benchmark_data['map_encoding'].iloc[0]]
+    benchmark_data = benchmark_data[(benchmark_data['counterparties'] == benchmark_data['counterparties'].min()) & (benchmark_data['tokens'] == benchmark_data['tokens'].min())]
+    operations = list(dict.fromkeys(benchmark_data['operation']))
+
+    num_columns = 3
+    fig, axes = plt.subplots(math.ceil(len(operations) / num_columns), num_columns, figsize=(12, 3 * math.ceil(len(operations) / num_columns)), squeeze=False)
+    for ax, operation in zip(axes.flat, operations):
+        for implementation, color in [("state", "tab:blue"), ("delta", "tab:orange")]:
+            data = benchmark_data[(benchmark_data['operation'] == operation) & (benchmark_data['implementation'] == implementation)].sort_values('log_length')
+            if data.empty:
+                continue
+            ax.plot(data['log_length'], data['p50_seconds'] * 1000, marker='o', color=color, label=f"{implementation} p50")
+            ax.plot(data['log_length'], data['p95_seconds'] * 1000, marker='o', linestyle='--', color=color, label=f"{implementation} p95")
+        ax.set_title(operation, fontsize=10)
+        ax.set_ylim(bottom=0)
+        ax.set_xlabel("Log length")
+        ax.set_ylabel("Latency in ms")
+    for ax in axes.flat[len(operations):]:
+        ax.set_visible(False)
+    axes.flat[0].legend(fontsize=8)
+    fig.tight_layout()
+    fig.savefig(os.path.join(FIGURES_DIR, "benchmark_latency.png"), bbox_inches='tight')
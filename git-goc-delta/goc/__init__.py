@@ -0,0 +1,6 @@
+# In-process implementation of the performance critical Delta-GOC-Ledger operations, used by the Bash scripts in this directory
+
+from .checkpoint import AccountState, CheckpointError, CheckpointResult, Ledger
+from .objects import EMPTY_TREE, ObjectReader, ObjectWriter
+from .operations import OperationError, Operations
+from .repo import GitError, Repository
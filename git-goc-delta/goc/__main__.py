@@ -0,0 +1,522 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+from . import trace
+from .aliases import AliasTable
+from .broadcast import broadcast
+from .checkpoint import CheckpointError, Ledger
+from .compaction import DEFAULT_PRUNE_EXPIRE, CheckpointPolicy, compact, prune_checkpoints
+from .daemon import serve
+from .maintenance import MaintenancePolicy, RepositoryStats, maintain, probe
+from .maps import COMPACT, SHARDED, MapFormatError
+from .merge import MergeError, MergeVerifier
+from .objects import blob_entry, tree_entry, update_counter_map
+from .operations import OperationError, Operations
+from .pool import checkpoint_all
+from .repo import GitError, Repository
+from .signers import KEY_TYPE, AllowedSigners
+
+# Usage: python3 -m goc <command> [arguments]
+#
+# Command line interface of the in-process ledger engine, invoked by the Bash scripts with PYTHONPATH set to the script directory.
+
+
+def cmd_checkpoint(args):
+    ledger = Ledger(args.repo_path)
+    try:
+        result = ledger.checkpoint(args.token_type, args.author_id)
+    except CheckpointError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        ledger.close()
+
+    print(result.commit)
+    if not result.has_interactions:
+        return 2 # signal that the account has no interactions with this token type
+    return 0
+
+
+def cmd_balance(args):
+    ledger = Ledger(args.repo_path)
+    try:
+        balance = ledger.balance(args.token_type, args.author_id)
+    except CheckpointError as e:
+        print(e, file=sys.stderr)
+        print("Error while creating checkpoint.", file=sys.stderr)
+        return 1
+    finally:
+        ledger.close()
+
+    print(balance)
+    return 0
+
+
+def _stdin_accounts(invalid_lines):
+    # "<token type> <author-id>" per line, malformed lines are reported, appended to invalid_lines and skipped
+    for number, line in enumerate(sys.stdin, 1):
+        fields = line.split()
+        if not fields:
+            continue
+        if len(fields) != 2:
+            print(f"Invalid account on line {number}, expected '<token type> <author-id>': '{line.strip()}'", file=sys.stderr)
+            invalid_lines.append(number)
+            continue
+        yield tuple(fields)
+
+
+def cmd_balances(args):
+    ledger = Ledger(args.repo_path)
+    invalid_lines = []
+    if args.stdin:
+        accounts = _stdin_accounts(invalid_lines)
+    else:
+        accounts = ledger.accounts(args.token_type)
+
+    has_errors = False
+    try:
+        for token_type, author_id, balance, error in ledger.balances(accounts):
+            if error is not None:
+                has_errors = True
+                print(error, file=sys.stderr)
+            if args.json:
+                print(json.dumps({"token": token_type, "author": author_id, "balance": balance, "error": error}), flush=True)
+            else:
+                print(f"{token_type}\t{author_id}\t{'' if balance is None else balance}", flush=True)
+    finally:
+        ledger.close()
+    return 1 if has_errors or invalid_lines else 0
+
+
+def cmd_checkpoint_all(args):
+    start = time.perf_counter()
+    timings = checkpoint_all(args.repo_path, token_type=args.token_type, jobs=args.jobs)
+    has_errors = False
+    for timing in timings:
+        if timing.error is not None:
+            has_errors = True
+            print(timing.error, file=sys.stderr)
+        print(f"{timing.token_type}\t{timing.author_id}\t{timing.commit or ''}\t{timing.seconds:.6f}")
+    print(f"Computed {len(timings)} checkpoints in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+    return 1 if has_errors else 0
+
+
+def cmd_compact(args):
+    ledger = Ledger(args.repo_path)
+    policy = CheckpointPolicy.from_config(ledger.repo, args.interval, args.bytes)
+    invalid_lines = []
+    if args.stdin:
+        accounts = list(_stdin_accounts(invalid_lines))
+    else:
+        accounts = ledger.accounts(args.token_type)
+
+    has_errors = bool(invalid_lines)
+    num_checkpoints = 0
+    try:
+        if policy.enabled:
+            for result in compact(ledger, policy, accounts):
+                if result.error is not None:
+                    has_errors = True
+                    print(result.error, file=sys.stderr)
+                elif result.commit is not None:
+                    num_checkpoints += 1
+                    print(f"{result.token_type}\t{result.author_id}\t{result.pending_commits}\t{result.pending_bytes}\t{result.commit}")
+            print(f"Checkpointed {num_checkpoints} of {len(accounts)} accounts", file=sys.stderr)
+        if args.prune:
+            report = prune_checkpoints(ledger.repo, args.expire, args.dry_run)
+            print(f"{'Would prune' if args.dry_run else 'Pruned'} {report.objects} objects of {report.checkpoints} superseded checkpoints, "
+                  f"{report.bytes} bytes reclaimed ({report.kept} objects are younger than {args.expire}s, {report.packed} objects are packed)", file=sys.stderr)
+    finally:
+        ledger.close()
+    return 1 if has_errors else 0
+
+
+def cmd_maintain(args):
+    repo = Repository(args.repo_path)
+    try:
+        before = RepositoryStats.read(repo)
+        if args.auto and not MaintenancePolicy.from_config(repo).due(before):
+            return 0 # no threshold is exceeded (or none is configured)
+        probe_before = probe(repo) if args.probe else {}
+        for step, seconds in maintain(repo):
+            print(f"{step} took {seconds:.3f}s", file=sys.stderr)
+        after = RepositoryStats.read(repo)
+        probe_after = probe(repo) if args.probe else {}
+    except GitError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        repo.close()
+
+    # "<measure>\t<before>\t<after>" per measure
+    for name in ("loose_objects", "loose_refs", "packs", "multi_pack_index", "commit_graph"):
+        print(f"{name}\t{getattr(before, name)}\t{getattr(after, name)}")
+    for name in probe_before:
+        print(f"{name}_seconds\t{probe_before[name]:.6f}\t{probe_after[name]:.6f}")
+    return 0
+
+
+def cmd_give_to_batch(args):
+    ledger = Ledger(args.repo_path)
+    ops = Operations(ledger)
+    try:
+        transfers = []
+        for line in sys.stdin:
+            if not line.strip() or line.startswith("#"):
+                continue
+            recipient, amount = line.split() # "<recipient> <amount>" per line
+            transfers.append((ops.author_id(recipient) if args.aliases else recipient, amount))
+        commit, author_id, total = ops.give_to_many(args.token_type, transfers)
+    except OperationError as e:
+        print(e, file=sys.stderr)
+        return e.code
+    except ValueError:
+        print("Invalid transfer, expected '<recipient> <amount>' per line", file=sys.stderr)
+        return 1
+    finally:
+        ledger.close()
+
+    print(f"Transfered {total} tokens of type '{args.token_type}' from author '{author_id}' to {len(set(r for r, _ in transfers))} recipients ({commit})")
+    return 0
+
+
+def cmd_ack_from_all(args):
+    ledger = Ledger(args.repo_path)
+    ops = Operations(ledger)
+    try:
+        commit, author_id, total, num_senders = ops.ack_from_all(args.token_type)
+    except OperationError as e:
+        print(e, file=sys.stderr)
+        return e.code
+    finally:
+        ledger.close()
+
+    print(f"Acknowledged {total} tokens of type '{args.token_type}' received from {num_senders} senders by author '{author_id}' ({commit})")
+    return 0
+
+
+def cmd_pending(args):
+    ledger = Ledger(args.repo_path)
+    try:
+        recipient_id = args.author or ledger.repo.config("goc.author.id")
+        if not recipient_id:
+            print("The repository misses goc.author.id", file=sys.stderr)
+            return 1
+        aliases = AliasTable(ledger.repo.git_dir)
+        ledger.recipient_index.update()
+        for transfer in ledger.recipient_index.pending(recipient_id, args.token_type):
+            sender = transfer.sender_id
+            if args.aliases:
+                sender = aliases.author_alias(sender) or sender # senders without a known alias are printed by their id
+            if args.json:
+                print(json.dumps({"token": transfer.token_type, "sender": sender, "pending": transfer.pending,
+                                  "giveTo": transfer.give_to, "ackFrom": transfer.ack_from, "commit": transfer.commit}))
+            else:
+                print(f"{transfer.token_type}\t{sender}\t{transfer.pending}\t{transfer.commit}")
+    finally:
+        ledger.close()
+    return 0
+
+
+def cmd_alias_table(args):
+    repo = Repository(args.repo_path)
+    try:
+        num_aliases = AliasTable(repo.git_dir).rebuild(repo)
+    finally:
+        repo.close()
+    print(f"Rebuilt the alias table with {num_aliases} aliases", file=sys.stderr)
+    return 0
+
+
+def cmd_update_recipient_index(args):
+    ledger = Ledger(args.repo_path)
+    try:
+        ledger.recipient_index.update()
+    finally:
+        ledger.close()
+    return 0
+
+
+def _map_entry(repo, obj):
+    # a giveTo/ackFrom map, given as tree (of counter blobs or of shards) or as compact map blob
+    info = repo.reader.read(obj)
+    if info is None or info[0] not in ("tree", "blob"):
+        raise MapFormatError(f"'{obj}' is neither a tree nor a blob")
+    return tree_entry(obj) if info[0] == "tree" else blob_entry(obj)
+
+
+def cmd_map_convert(args):
+    repo = Repository(args.repo_path)
+    try:
+        counters = repo.reader.counter_map(_map_entry(repo, args.object))
+        print(repo.writer.counter_map(counters, args.to).sha)
+    except (MapFormatError, CheckpointError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        repo.close()
+    return 0
+
+
+def cmd_map_update(args):
+    if len(args.counters) % 2 != 0:
+        print("Expected pairs of <id> <counter>", file=sys.stderr)
+        return 1
+    repo = Repository(args.repo_path)
+    try:
+        entry = _map_entry(repo, args.object)
+        counters = {}
+        for name, value in zip(args.counters[::2], args.counters[1::2]):
+            if args.add:
+                current = counters[name] if name in counters else repo.reader.counter(entry, name) or 0
+                counters[name] = current + int(value)
+            else:
+                counters[name] = int(value)
+        print(update_counter_map(repo.reader, repo.writer, entry, counters, args.to).sha)
+    except (MapFormatError, CheckpointError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        repo.close()
+    return 0
+
+
+def cmd_map_show(args):
+    repo = Repository(args.repo_path)
+    try:
+        entry = _map_entry(repo, args.object)
+        counters = {name: repo.reader.counter(entry, name) for name in args.ids} if args.ids else repo.reader.counter_map(entry)
+    except (MapFormatError, CheckpointError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        repo.close()
+    for name in args.ids or sorted(counters):
+        if counters[name] is not None:
+            print(f"{name}\t{counters[name]}")
+    return 0
+
+
+def cmd_invalidate_balances(args):
+    ledger = Ledger(args.repo_path)
+    try:
+        ledger.balance_cache.invalidate(ledger.repo.refs_with_prefix("refs/heads/frontier/"))
+    finally:
+        ledger.close()
+    return 0
+
+
+def cmd_verify_merge(args):
+    start = time.perf_counter()
+    verifier = MergeVerifier(args.repo_path)
+    jobs = args.jobs or verifier.verify_jobs()
+    try:
+        num_commits = verifier.verify_remote(args.remote, jobs)
+    except MergeError as e:
+        print(e)
+        return 1
+    finally:
+        verifier.close()
+
+    if num_commits == 0:
+        return 2 # empty diff, nothing needs to be merged
+    seconds = time.perf_counter() - start
+    print(f"Verified {num_commits} commits in {seconds:.3f}s ({num_commits / seconds:.1f} commits/s, {jobs} jobs)", file=sys.stderr)
+    return 0
+
+
+def cmd_fingerprint(args):
+    signers = AllowedSigners(os.path.join(args.repo_path, ".git"))
+    try:
+        fingerprint = signers.fingerprint(args.pubkey, args.type)
+    finally:
+        signers.close()
+
+    if fingerprint is None:
+        print(f"Error calculating sha256 fingerprint for {args.pubkey}", file=sys.stderr)
+        return 1
+    print(fingerprint[len("SHA256:"):] if args.no_prefix else fingerprint)
+    return 0
+
+
+def cmd_allow_signer(args):
+    signers = AllowedSigners(os.path.join(args.repo_path, ".git"))
+    try:
+        fingerprint = signers.fingerprint(args.pubkey, args.type)
+        signers.add([args.pubkey], args.type)
+    finally:
+        signers.close()
+
+    if args.fingerprint:
+        print(fingerprint or "") # an invalid key has no fingerprint and therefore can't match any signature
+    return 0
+
+
+def cmd_broadcast(args):
+    start = time.perf_counter()
+    results = broadcast(args.repo_path, jobs=args.jobs, timeout=args.timeout, retries=args.retries, delta=args.delta)
+    if not results:
+        print("No remote repository known", file=sys.stderr)
+        return 1
+
+    has_errors = False
+    for result in results:
+        if not result.ok:
+            has_errors = True
+            print(f"Error pushing new messages to '{result.remote}': {result.error}", file=sys.stderr)
+        print(f"{result.remote}\t{'ok' if result.ok else 'failed'}\t{result.attempts}\t{result.seconds:.6f}\t{result.bytes_sent}")
+    print(f"Pushed to {sum(result.ok for result in results)}/{len(results)} remotes in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+    return 1 if has_errors else 0
+
+
+def cmd_serve(args):
+    serve(args.repo_path, args.socket)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="goc")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    checkpoint_parser = subparsers.add_parser("checkpoint")
+    checkpoint_parser.add_argument("repo_path")
+    checkpoint_parser.add_argument("token_type")
+    checkpoint_parser.add_argument("author_id")
+    checkpoint_parser.set_defaults(func=cmd_checkpoint)
+
+    balance_parser = subparsers.add_parser("balance")
+    balance_parser.add_argument("repo_path")
+    balance_parser.add_argument("token_type")
+    balance_parser.add_argument("author_id")
+    balance_parser.set_defaults(func=cmd_balance)
+
+    balances_parser = subparsers.add_parser("balances")
+    balances_parser.add_argument("--json", action="store_true")
+    balances_parser.add_argument("--stdin", action="store_true")
+    balances_parser.add_argument("repo_path")
+    balances_parser.add_argument("token_type", nargs="?")
+    balances_parser.set_defaults(func=cmd_balances)
+
+    checkpoint_all_parser = subparsers.add_parser("checkpoint-all")
+    checkpoint_all_parser.add_argument("--jobs", type=int, default=None)
+    checkpoint_all_parser.add_argument("repo_path")
+    checkpoint_all_parser.add_argument("token_type", nargs="?")
+    checkpoint_all_parser.set_defaults(func=cmd_checkpoint_all)
+
+    maintain_parser = subparsers.add_parser("maintain")
+    maintain_parser.add_argument("--auto", action="store_true") # only if a threshold of the maintenance policy is exceeded
+    maintain_parser.add_argument("--no-probe", dest="probe", action="store_false") # skips the timings of merge and checkpoint
+    maintain_parser.add_argument("repo_path")
+    maintain_parser.set_defaults(func=cmd_maintain)
+
+    compact_parser = subparsers.add_parser("compact")
+    compact_parser.add_argument("--interval", type=int, default=None)
+    compact_parser.add_argument("--bytes", type=int, default=None)
+    compact_parser.add_argument("--stdin", action="store_true")
+    compact_parser.add_argument("--prune", action="store_true")
+    compact_parser.add_argument("--expire", type=int, default=DEFAULT_PRUNE_EXPIRE)
+    compact_parser.add_argument("--dry-run", action="store_true")
+    compact_parser.add_argument("repo_path")
+    compact_parser.add_argument("token_type", nargs="?")
+    compact_parser.set_defaults(func=cmd_compact)
+
+    give_to_batch_parser = subparsers.add_parser("give-to-batch")
+    give_to_batch_parser.add_argument("--aliases", action="store_true")
+    give_to_batch_parser.add_argument("repo_path")
+    give_to_batch_parser.add_argument("token_type")
+    give_to_batch_parser.set_defaults(func=cmd_give_to_batch)
+
+    ack_from_all_parser = subparsers.add_parser("ack-from-all")
+    ack_from_all_parser.add_argument("repo_path")
+    ack_from_all_parser.add_argument("token_type")
+    ack_from_all_parser.set_defaults(func=cmd_ack_from_all)
+
+    pending_parser = subparsers.add_parser("pending")
+    pending_parser.add_argument("--author", default=None)
+    pending_parser.add_argument("--json", action="store_true")
+    pending_parser.add_argument("--aliases", action="store_true")
+    pending_parser.add_argument("repo_path")
+    pending_parser.add_argument("token_type", nargs="?")
+    pending_parser.set_defaults(func=cmd_pending)
+
+    alias_table_parser = subparsers.add_parser("alias-table")
+    alias_table_parser.add_argument("repo_path")
+    alias_table_parser.set_defaults(func=cmd_alias_table)
+
+    update_recipient_index_parser = subparsers.add_parser("update-recipient-index")
+    update_recipient_index_parser.add_argument("repo_path")
+    update_recipient_index_parser.set_defaults(func=cmd_update_recipient_index)
+
+    map_convert_parser = subparsers.add_parser("map-convert")
+    map_convert_parser.add_argument("--to", choices=[COMPACT, SHARDED, "tree"], default=COMPACT)
+    map_convert_parser.add_argument("repo_path")
+    map_convert_parser.add_argument("object")
+    map_convert_parser.set_defaults(func=cmd_map_convert)
+
+    map_update_parser = subparsers.add_parser("map-update")
+    map_update_parser.add_argument("--to", choices=[COMPACT, SHARDED, "tree"], default=COMPACT)
+    map_update_parser.add_argument("--add", action="store_true") # the counters are added to the existing counters instead of replacing them
+    map_update_parser.add_argument("repo_path")
+    map_update_parser.add_argument("object")
+    map_update_parser.add_argument("counters", nargs="*") # <id> <counter> pairs
+    map_update_parser.set_defaults(func=cmd_map_update)
+
+    map_show_parser = subparsers.add_parser("map-show")
+    map_show_parser.add_argument("repo_path")
+    map_show_parser.add_argument("object")
+    map_show_parser.add_argument("ids", nargs="*") # only the counters of these ids are printed
+    map_show_parser.set_defaults(func=cmd_map_show)
+
+    invalidate_parser = subparsers.add_parser("invalidate-balances")
+    invalidate_parser.add_argument("repo_path")
+    invalidate_parser.set_defaults(func=cmd_invalidate_balances)
+
+    verify_merge_parser = subparsers.add_parser("verify-merge")
+    verify_merge_parser.add_argument("--jobs", type=int, default=None)
+    verify_merge_parser.add_argument("repo_path")
+    verify_merge_parser.add_argument("remote")
+    verify_merge_parser.set_defaults(func=cmd_verify_merge)
+
+    broadcast_parser = subparsers.add_parser("broadcast")
+    broadcast_parser.add_argument("--jobs", type=int, default=None)
+    broadcast_parser.add_argument("--timeout", type=float, default=None)
+    broadcast_parser.add_argument("--retries", type=int, default=None)
+    broadcast_parser.add_argument("--delta", action="store_true")
+    broadcast_parser.add_argument("repo_path")
+    broadcast_parser.set_defaults(func=cmd_broadcast)
+
+    fingerprint_parser = subparsers.add_parser("fingerprint")
+    fingerprint_parser.add_argument("--no-prefix", action="store_true")
+    fingerprint_parser.add_argument("repo_path")
+    fingerprint_parser.add_argument("pubkey")
+    fingerprint_parser.add_argument("type", nargs="?", default=KEY_TYPE)
+    fingerprint_parser.set_defaults(func=cmd_fingerprint)
+
+    allow_signer_parser = subparsers.add_parser("allow-signer")
+    allow_signer_parser.add_argument("--fingerprint", action="store_true")
+    allow_signer_parser.add_argument("repo_path")
+    allow_signer_parser.add_argument("pubkey")
+    allow_signer_parser.add_argument("type", nargs="?", default=KEY_TYPE)
+    allow_signer_parser.set_defaults(func=cmd_allow_signer)
+
+    serve_parser = subparsers.add_parser("serve")
+    serve_parser.add_argument("--socket", default=None)
+    serve_parser.add_argument("repo_path")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    args = parser.parse_args()
+    try:
+        if args.func is cmd_serve:
+            return args.func(args) # the daemon traces every request (see LedgerServer.dispatch)
+        with trace.span("total", script=f"goc {args.command}"):
+            return args.func(args)
+    except GitError as e:
+        print(e, file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import os
+import tempfile
+
+ALIAS_TABLE = "alias_table" # relative to the .git directory
+AUTHOR = "author"
+TOKEN = "token"
+
+
+class AliasTable():
+    """Alias table in .git/alias_table, which maps author and token aliases to their IDs and back.
+
+    Every line of the table is "<author|token>\\t<alias>\\t<id>". Later lines override earlier lines of the same alias, therefore the scripts
+    register a new alias by appending a single line (author-initialize, token-initialize, repo-merge) and rebuild() rewrites the table from
+    .git/alias_lookup and refs/local/token_alias. The table is read once per process and only read again if its size or modification time
+    changed. Aliases that are missing in the table (e.g. in repositories created before the table existed) are resolved by the callers
+    from the alias lookup files and references, as before.
+    """
+
+    def __init__(self, git_dir):
+        self.path = os.path.join(git_dir, ALIAS_TABLE)
+        self._version = None
+        self._ids = {AUTHOR: {}, TOKEN: {}} # {kind: {alias: id}}
+        self._aliases = {AUTHOR: {}, TOKEN: {}} # {kind: {id: alias}}
+
+    def _load(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._version = None
+            self._ids = {AUTHOR: {}, TOKEN: {}}
+            self._aliases = {AUTHOR: {}, TOKEN: {}}
+            return
+        version = (stat.st_size, stat.st_mtime_ns)
+        if version == self._version:
+            return
+
+        ids = {AUTHOR: {}, TOKEN: {}}
+        aliases = {AUTHOR: {}, TOKEN: {}}
+        with open(self.path) as f:
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) != 3 or fields[0] not in ids:
+                    continue # incomplete line of a concurrent append
+                kind, alias, id = fields
+                previous_id = ids[kind].get(alias)
+                if previous_id is not None and aliases[kind].get(previous_id) == alias:
+                    del aliases[kind][previous_id]
+                ids[kind][alias] = id
+                aliases[kind][id] = alias
+        self._version = version
+        self._ids = ids
+        self._aliases = aliases
+
+    def author_id(self, alias):
+        self._load()
+        return self._ids[AUTHOR].get(alias)
+
+    def token_id(self, alias):
+        self._load()
+        return self._ids[TOKEN].get(alias)
+
+    def author_alias(self, author_id):
+        self._load()
+        return self._aliases[AUTHOR].get(author_id)
+
+    def token_alias(self, token_type):
+        self._load()
+        return self._aliases[TOKEN].get(token_type)
+
+    def add(self, kind, alias, id):
+        with open(self.path, "a") as f:
+            f.write(f"{kind}\t{alias}\t{id}\n")
+
+    def rebuild(self, repo):
+        """Rewrites the table from the alias lookup files and the token alias references. Returns the number of aliases"""
+        lines = []
+        lookup_dir = os.path.join(repo.git_dir, "alias_lookup")
+        try:
+            # ordered by modification time, so that the latest alias of an author is its alias in the id -> alias direction
+            paths = sorted((os.path.join(lookup_dir, name) for name in os.listdir(lookup_dir)), key=os.path.getmtime)
+        except FileNotFoundError:
+            paths = []
+        for path in paths:
+            with open(path) as f:
+                author_id = f.read().strip()
+            if author_id:
+                lines.append(f"{AUTHOR}\t{os.path.basename(path)}\t{author_id}\n")
+        prefix = "refs/local/token_alias/"
+        for name, token_type in sorted(repo.refs_with_prefix(prefix).items()):
+            lines.append(f"{TOKEN}\t{name[len(prefix):]}\t{token_type}\n")
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix="tmp_alias_table_")
+        with os.fdopen(fd, "w") as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.path) # atomic, concurrent readers see either the old or the new table
+        self._version = None
+        return len(lines)
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+class BalanceCache():
+    """Materialized balances in .git/balance_cache.sqlite, keyed by (token type, author-id, frontier tip).
+
+    The balance of an account only depends on the log referenced by its frontier, therefore a cached balance stays valid as long as the
+    frontier of the account points to the same commit. Balances are stored as text, because token amounts may exceed 64 bit integers.
+    """
+
+    def __init__(self, repo):
+        self.path = os.path.join(repo.git_dir, "balance_cache.sqlite")
+        self._conn = None
+        self._batch = False
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            with self._conn:
+                columns = [row[1] for row in self._conn.execute("PRAGMA table_info(balances)")]
+                if "checkpoint" in columns: # caches of earlier versions also stored the checkpoint commit, they are simply rebuilt
+                    self._conn.execute("DROP TABLE balances")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS balances (token TEXT, author TEXT, tip TEXT, balance TEXT, PRIMARY KEY (token, author))")
+        return self._conn
+
+    def get(self, token_type, author_id, tip):
+        """Returns the cached balance of the account, or None if no balance is cached for this frontier tip"""
+        row = self.conn.execute("SELECT balance FROM balances WHERE token = ? AND author = ? AND tip = ?", (token_type, author_id, tip)).fetchone()
+        return int(row[0]) if row else None
+
+    def put(self, token_type, author_id, tip, balance):
+        self.conn.execute("INSERT OR REPLACE INTO balances (token, author, tip, balance) VALUES (?, ?, ?, ?)", (token_type, author_id, tip, str(balance)))
+        if not self._batch:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """Commits all balances stored within this context in a single transaction"""
+        if self._batch:
+            yield
+            return
+        self._batch = True
+        try:
+            yield
+        finally:
+            self._batch = False
+            self.conn.commit()
+
+    def invalidate(self, frontier_refs):
+        """Removes all balances whose frontier tip differs from the given references {refname: sha}. Returns the number of removed balances"""
+        stale = []
+        for token_type, author_id, tip in self.conn.execute("SELECT token, author, tip FROM balances"):
+            if frontier_refs.get(f"refs/heads/frontier/{token_type}/{author_id}") != tip:
+                stale.append((token_type, author_id))
+        with self.conn:
+            self.conn.executemany("DELETE FROM balances WHERE token = ? AND author = ?", stale)
+        return len(stale)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
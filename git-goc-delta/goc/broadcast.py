@@ -0,0 +1,102 @@
+import os
+import re
+import signal
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SCRIPTDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_JOBS = 8
+DEFAULT_TIMEOUT = 60 # seconds per push attempt
+DEFAULT_RETRIES = 2
+DEFAULT_RETRY_DELAY = 1 # seconds before the first retry, doubled for every further retry
+
+# "Writing objects: 100% (12/12), 1.53 KiB | 1.53 MiB/s, done.", as printed by `git push --progress`
+WRITTEN_BYTES = re.compile(rb"Writing objects: 100% \(\d+/\d+\), ([\d.]+) (bytes|KiB|MiB|GiB)")
+UNITS = {b"bytes": 1, b"KiB": 1 << 10, b"MiB": 1 << 20, b"GiB": 1 << 30}
+
+
+class PushResult():
+
+    def __init__(self, remote, ok, attempts, seconds, bytes_sent, error=None):
+        self.remote = remote
+        self.ok = ok
+        self.attempts = attempts
+        self.seconds = seconds
+        self.bytes_sent = bytes_sent
+        self.error = error
+
+
+def _git_config(repo_path, name, default):
+    process = subprocess.run(["git", "config", name], cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        return type(default)(process.stdout.decode().strip())
+    except ValueError:
+        return default
+
+
+def _bytes_sent(stderr):
+    # the pack size reported by git (rounded by git to two decimal places for KiB and above)
+    match = None
+    for match in WRITTEN_BYTES.finditer(stderr):
+        pass
+    if match is None:
+        return 0 # nothing needed to be sent
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+
+def _push_once(repo_path, remote, timeout, delta):
+    cmd = [os.path.join(SCRIPTDIR, "repo-push"), "--progress"] + (["--delta"] if delta else []) + [repo_path, remote]
+    # the push runs in its own process group, so that a timeout also stops the git processes started by repo-push
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        _, stderr = process.communicate(timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        return False, 0, f"Timeout after {timeout}s"
+    if process.returncode != 0:
+        lines = [line.strip() for line in stderr.decode(errors="replace").splitlines() if line.strip()]
+        errors = [line for line in lines if line.startswith(("fatal:", "error:"))] or lines[-1:]
+        return False, 0, errors[0] if errors else f"repo-push exited with {process.returncode}"
+    return True, _bytes_sent(stderr), None
+
+
+def push(repo_path, remote, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES, retry_delay=DEFAULT_RETRY_DELAY, delta=False):
+    """Pushes the local frontier to the remote with repo-push, retrying failed or timed out attempts with exponential backoff"""
+    start = time.perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        ok, bytes_sent, error = _push_once(repo_path, remote, timeout, delta)
+        if ok or attempts > retries:
+            return PushResult(remote, ok, attempts, time.perf_counter() - start, bytes_sent, error)
+        time.sleep(retry_delay * 2 ** (attempts - 1))
+
+
+def broadcast(repo_path, remotes=None, jobs=None, timeout=None, retries=None, retry_delay=None, delta=False):
+    """Pushes the local frontier to all remotes concurrently, with at most `jobs` pushes at the same time.
+    Returns a PushResult for every remote, in order of completion.
+
+    Unset limits are read from goc.broadcast.jobs, goc.broadcast.timeout, goc.broadcast.retries and goc.broadcast.retryDelay.
+    A slow or unreachable remote only occupies one of the workers, it does not delay the pushes to the other remotes.
+    """
+    if remotes is None:
+        process = subprocess.run(["git", "remote"], cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        remotes = process.stdout.decode().split()
+    if jobs is None:
+        jobs = _git_config(repo_path, "goc.broadcast.jobs", DEFAULT_JOBS)
+    if timeout is None:
+        timeout = _git_config(repo_path, "goc.broadcast.timeout", float(DEFAULT_TIMEOUT))
+    if retries is None:
+        retries = _git_config(repo_path, "goc.broadcast.retries", DEFAULT_RETRIES)
+    if retry_delay is None:
+        retry_delay = _git_config(repo_path, "goc.broadcast.retryDelay", float(DEFAULT_RETRY_DELAY))
+
+    results = []
+    with ThreadPoolExecutor(max(1, min(jobs, len(remotes) or 1))) as pool:
+        futures = [pool.submit(push, repo_path, remote, timeout, retries, retry_delay, delta) for remote in remotes]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
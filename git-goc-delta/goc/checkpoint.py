@@ -0,0 +1,297 @@
+import os
+
+from . import trace
+from .balance_cache import BalanceCache
+from .maps import ENCODING_CONFIG, SHARDED
+from .objects import CheckpointError, blob_entry, update_counter_map
+from .recipient_index import RecipientIndex
+from .repo import ZERO_OID, Repository
+from .sender_index import SenderIndex
+
+STALE_CHECKPOINTS = "stale_checkpoints" # superseded checkpoint commits, relative to the .git directory
+
+
+class AccountState():
+    """Full (or delta) state of an account: the create/burn counters and the giveTo/ackFrom maps"""
+
+    def __init__(self, created=0, burned=0, give_to=None, ack_from=None):
+        self.created = created
+        self.burned = burned
+        self.give_to = give_to if give_to is not None else {}
+        self.ack_from = ack_from if ack_from is not None else {}
+
+    @property
+    def balance(self):
+        return self.created + sum(self.ack_from.values()) - self.burned - sum(self.give_to.values())
+
+
+class CheckpointResult():
+
+    def __init__(self, commit, state, has_interactions):
+        self.commit = commit
+        self.state = state
+        self.has_interactions = has_interactions # False if the account has no log for this token type
+
+
+class Ledger():
+    """In-process implementation of the account-checkpoint and account-balance operations.
+
+    All objects are read through one `git cat-file --batch` stream and all counters are merged as Python ints.
+    The resulting checkpoint commits are identical to the ones created by the original Bash implementation.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo if isinstance(repo, Repository) else Repository(repo)
+        self.sender_index = SenderIndex(self.repo)
+        self.balance_cache = BalanceCache(self.repo)
+        self.recipient_index = RecipientIndex(self)
+        self._sender_logs = {} # {sender_commit: [commits of the first-parent log, oldest first]}
+        self._map_encoding = None
+
+    @property
+    def map_encoding(self):
+        # encoding of new giveTo/ackFrom maps (goc.mapEncoding), maps of all encodings are always read
+        if self._map_encoding is None:
+            self._map_encoding = self.repo.config(ENCODING_CONFIG) or ""
+        return self._map_encoding
+
+    def close(self):
+        self.balance_cache.close()
+        self.recipient_index.close()
+        self.repo.close()
+
+    def read_state(self, commit):
+        """Reads the (delta) state stored in the tree of the given commit"""
+        reader = self.repo.reader
+        tree = reader.tree(reader.commit(commit).tree)
+        state = AccountState()
+
+        if "created" in tree:
+            state.created = reader.blob_int(tree["created"].sha)
+        if "burned" in tree:
+            state.burned = reader.blob_int(tree["burned"].sha)
+        if "giveTo" in tree:
+            state.give_to = reader.counter_map(tree["giveTo"])
+        if "ackFrom" in tree:
+            state.ack_from = reader.counter_map(tree["ackFrom"])
+        return state
+
+    def checkpoint(self, token_type, author_id):
+        """Computes the checkpoint (full state) of the given account by merging all delta states between the last checkpoint and the frontier"""
+        with trace.span("checkpoint"):
+            return self._checkpoint(token_type, author_id)
+
+    def _checkpoint(self, token_type, author_id):
+        repo = self.repo
+        reader = repo.reader
+        checkpoint_ref = f"refs/local/checkpoint/{token_type}/{author_id}"
+        curr_checkpoint = repo.ref(checkpoint_ref)
+        latest_commit = repo.ref(f"refs/heads/frontier/{token_type}/{author_id}")
+
+        # compute the diff between last checkpoint and latest commit of this account
+        diff = []
+        if latest_commit:
+            if curr_checkpoint is None:
+                with trace.span("log"):
+                    diff = self._author_log(latest_commit, author_id) # entire history
+            else:
+                checkpoint_parents = reader.commit(curr_checkpoint).parents
+                if checkpoint_parents == (latest_commit,): # latest checkpoint point to latest commit, i.e. it is still up to date
+                    return CheckpointResult(curr_checkpoint, self.read_state(curr_checkpoint), True)
+                with trace.span("log"):
+                    diff = [curr_checkpoint] + self._author_log(latest_commit, author_id, since=curr_checkpoint) # include the latest checkpoint
+        elif curr_checkpoint is not None:
+            if reader.commit(curr_checkpoint).parents == (token_type,): # the checkpoint is pointing to the inital commit, because this author hasn't interacted with the token yet
+                return CheckpointResult(curr_checkpoint, self.read_state(curr_checkpoint), False)
+
+        with trace.span("merge"):
+            state = self._merge(token_type, author_id, diff, curr_checkpoint)
+        with trace.span("write"):
+            commit = self._commit_checkpoint(token_type, author_id, state, latest_commit or token_type, curr_checkpoint)
+            repo.update_ref(checkpoint_ref, commit, old=curr_checkpoint or ZERO_OID) # a concurrently computed checkpoint is equally valid, so losing the race is fine
+            if curr_checkpoint is not None:
+                self._record_stale_checkpoint(curr_checkpoint)
+        return CheckpointResult(commit, state, latest_commit is not None)
+
+    def balance(self, token_type, author_id):
+        with trace.span("balance"):
+            return self._balance(token_type, author_id)
+
+    def _balance(self, token_type, author_id):
+        tip = self.repo.ref(f"refs/heads/frontier/{token_type}/{author_id}")
+        if tip is not None:
+            balance = self.balance_cache.get(token_type, author_id, tip)
+            if balance is not None:
+                return balance # the frontier did not change since the balance was computed
+
+        # the checkpoint is updated incrementally, starting at refs/local/checkpoint of the account
+        result = self.checkpoint(token_type, author_id)
+        if not result.has_interactions:
+            return 0
+        balance = result.state.balance
+        self.balance_cache.put(token_type, author_id, tip, balance)
+        return balance
+
+    def accounts(self, token_type=None):
+        """Returns all accounts (token type, author-id) with a frontier reference, optionally restricted to a single token type"""
+        prefix = "refs/heads/frontier/" if token_type is None else f"refs/heads/frontier/{token_type}/"
+        accounts = []
+        for ref in sorted(self.repo.refs_with_prefix(prefix)):
+            token, author = ref.split("/")[-2:]
+            accounts.append((token, author))
+        return accounts
+
+    def balances(self, accounts):
+        """Computes the balances of multiple accounts, sharing one object reader and applying all checkpoint and cache updates at once.
+        Yields (token type, author-id, balance, error) for every account.
+        """
+        with self.repo.ref_transaction(), self.balance_cache.batch():
+            for token_type, author_id in accounts:
+                try:
+                    yield token_type, author_id, self.balance(token_type, author_id), None
+                except CheckpointError as e:
+                    yield token_type, author_id, None, str(e)
+
+    def _author_log(self, latest_commit, author_id, since=None):
+        """Equivalent to `git log --format=%H --reverse --first-parent --author=<author_id> [<since>..]<latest_commit>`"""
+        repo = self.repo
+        if since is None:
+            log = repo.first_parent_log(latest_commit)
+        else:
+            stop = repo.reader.commit(since).parents
+            log = repo.first_parent_log(latest_commit, stop=stop[0]) if len(stop) == 1 else None
+            if log is None:
+                # the checkpoint does not point into the first-parent history of the frontier, let git compute the range
+                output = repo.git("log", "--format=%H", "--first-parent", f"{since}..{latest_commit}").stdout.decode()
+                log = output.split()
+
+        return [commit for commit in reversed(log) if author_id in repo.reader.commit(commit).author]
+
+    def _merge(self, token_type, author_id, diff, curr_checkpoint):
+        # create new checkpoint by merging the latest checkpoint (full account) with all new commits (delta states)
+        state = AccountState()
+        balance = 0
+
+        for commit in diff:
+            delta = self.read_state(commit)
+
+            # merge create and burn counter
+            if delta.created > state.created:
+                balance += delta.created - state.created
+                state.created = delta.created
+            if delta.burned > state.burned:
+                balance -= delta.burned - state.burned
+                state.burned = delta.burned
+
+            # merge giveTo dictionary
+            for acc, amount in delta.give_to.items():
+                curr = state.give_to.get(acc)
+                if curr is None or amount > curr:
+                    balance -= amount - (curr or 0)
+                    state.give_to[acc] = amount
+
+            # merge ackFrom dictionary + check if those tokens were sent by the sender's account
+            for acc, amount in delta.ack_from.items():
+                curr = state.ack_from.get(acc)
+                is_new_acknowledgement = curr is None or amount > curr
+                if not is_new_acknowledgement:
+                    continue
+                balance += amount - (curr or 0)
+                state.ack_from[acc] = amount
+
+                # checkpoints are trusted and don't require additional verification
+                if commit != curr_checkpoint:
+                    with trace.span("verify"):
+                        self._verify_acknowledgement(token_type, author_id, acc, amount, commit)
+
+            if balance < 0:
+                raise CheckpointError(f"Error creating checkpoint: the author {author_id} has a balance below zero for token '{token_type}' at commit '{commit}'")
+
+        return state
+
+    def _verify_acknowledgement(self, token_type, author_id, sender_id, amount, commit):
+        # check whether the acknowledged tokens were indeed send by the sender's account
+        repo = self.repo
+        parents = repo.reader.commit(commit).parents
+        if not parents:
+            raise CheckpointError(f"Delta state '{commit}' acknowledges tokens, but has no reference to the sender")
+        # The second parent points to the latest commit of the sender. The GOC Ledger allows transactions where the sender and receiver are the same,
+        # in this case the send and acknowledgement states are in the same log, which is always referenced by the first parent (git commit-tree
+        # drops the duplicate parent, also in an acknowledgement of multiple senders). An acknowledgement of multiple senders (token-ackFrom-all)
+        # references the latest commit of every sender, one of them belongs to this sender.
+        if sender_id == author_id:
+            candidates = [parents[0]]
+        else:
+            candidates = list(parents[1:]) if len(parents) > 1 else [parents[0]]
+
+        sender_frontier = repo.ref(f"refs/heads/frontier/{token_type}/{sender_id}")
+        if sender_frontier is None:
+            raise CheckpointError(f"Delta state '{commit}' acknowledges tokens, but has a reference to a wrong sender")
+
+        sender_log = self.sender_index.get(token_type, sender_id, sender_frontier)
+        in_sender_log = False
+        for parent in candidates:
+            position = sender_log.position(parent)
+            if position is not None and position <= sender_log.position(sender_frontier): # the reference points to a commit of the senders account log
+                in_sender_log = True
+                if sender_log.includes_give_to(author_id, amount, position):
+                    return # the log of the sender includes a giveTo amount larger or equal to the amount of acknowledged token of the recipient
+        if not in_sender_log:
+            # no reference is part of the first-parent log of the sender, fall back to walking the history of the references
+            # only commits of the sender are considered, the logs of other senders are ancestors of the sender's frontier as well (ackFrom commits)
+            parents_of_sender = [parent for parent in candidates
+                                 if repo.reader.commit(parent).author.startswith(f"{sender_id} <") and repo.is_ancestor(parent, sender_frontier)]
+            if not parents_of_sender:
+                raise CheckpointError(f"Delta state '{commit}' acknowledges tokens, but has a reference to a wrong sender")
+            for parent in parents_of_sender:
+                for sender_commit in self._sender_log(parent):
+                    give_to = self._give_to_amount(sender_commit, author_id)
+                    if give_to is not None and give_to >= amount:
+                        return
+
+        raise CheckpointError(f"The log of the sender '{sender_id}' does not include any state that has a giveTo counter larger or equal to the ackFrom counter of the recipient '{author_id}' (ackFrom commit: '{commit}')")
+
+    def _sender_log(self, commit):
+        # memoized `git log --reverse --first-parent --format=%H <commit>`
+        log = self._sender_logs.get(commit)
+        if log is None:
+            log = list(reversed(self.repo.first_parent_log(commit)))
+            self._sender_logs[commit] = log
+        return log
+
+    def _give_to_amount(self, commit, recipient_id):
+        reader = self.repo.reader
+        tree = reader.tree(reader.commit(commit).tree)
+        if "giveTo" not in tree:
+            return None
+        return reader.counter(tree["giveTo"], recipient_id)
+
+    def _checkpoint_map(self, prev_checkpoint, name, counters):
+        # a sharded map is written as update of the map of the previous checkpoint, so that only the shards of changed counters are written
+        reader = self.repo.reader
+        if self.map_encoding == SHARDED and prev_checkpoint is not None:
+            prev_entry = reader.tree(reader.commit(prev_checkpoint).tree).get(name)
+            if prev_entry is not None and reader.is_sharded(prev_entry):
+                prev_counters = reader.counter_map(prev_entry)
+                if prev_counters.keys() <= counters.keys(): # counters are never removed from a checkpoint
+                    changed = {acc: value for acc, value in counters.items() if prev_counters.get(acc) != value}
+                    return update_counter_map(reader, self.repo.writer, prev_entry, changed, SHARDED)
+        return self.repo.writer.counter_map(counters, self.map_encoding)
+
+    def _record_stale_checkpoint(self, commit):
+        # superseded checkpoints are unreachable, they are collected by prune_checkpoints() (single appended lines are atomic, also across worker processes)
+        with open(os.path.join(self.repo.git_dir, STALE_CHECKPOINTS), "a") as f:
+            f.write(f"{commit}\n")
+
+    def _commit_checkpoint(self, token_type, author_id, state, parent, prev_checkpoint=None):
+        # create tree containing the resulting state
+        writer = self.repo.writer
+        tree = writer.tree({
+            "created": blob_entry(writer.blob_int(state.created)),
+            "burned": blob_entry(writer.blob_int(state.burned)),
+            "giveTo": self._checkpoint_map(prev_checkpoint, "giveTo", state.give_to),
+            "ackFrom": self._checkpoint_map(prev_checkpoint, "ackFrom", state.ack_from),
+        })
+
+        # commit checkpoint
+        return writer.commit(tree, [parent], author_id, "checkpoint\n")
@@ -0,0 +1,181 @@
+import os
+import subprocess
+import time
+
+from . import trace
+from .checkpoint import STALE_CHECKPOINTS, CheckpointError
+from .repo import GitError
+
+DEFAULT_PRUNE_EXPIRE = 3600 # seconds, loose objects that were written or reused more recently are never pruned
+
+
+class CheckpointPolicy():
+    """Decides when the checkpoint of an account is updated without a balance request.
+
+    A checkpoint is due once the log of the account contains at least `interval` delta commits, or at least `max_bytes` bytes of delta
+    commits and trees, that are not yet merged into the checkpoint. A value of 0 disables the respective threshold.
+    """
+
+    def __init__(self, interval=0, max_bytes=0):
+        self.interval = interval
+        self.max_bytes = max_bytes
+
+    @classmethod
+    def from_config(cls, repo, interval=None, max_bytes=None):
+        """Reads the thresholds from goc.checkpoint.interval and goc.checkpoint.bytes, unless they are given explicitly"""
+        def config_int(name):
+            try:
+                return max(0, int(repo.config(name)))
+            except ValueError:
+                return 0
+        return cls(config_int("goc.checkpoint.interval") if interval is None else interval,
+                   config_int("goc.checkpoint.bytes") if max_bytes is None else max_bytes)
+
+    @property
+    def enabled(self):
+        return self.interval > 0 or self.max_bytes > 0
+
+    def due(self, pending_commits, pending_bytes):
+        if pending_commits == 0:
+            return False
+        return (self.interval > 0 and pending_commits >= self.interval) or (self.max_bytes > 0 and pending_bytes >= self.max_bytes)
+
+
+class CompactionResult():
+
+    def __init__(self, token_type, author_id, pending_commits, pending_bytes, commit=None, error=None):
+        self.token_type = token_type
+        self.author_id = author_id
+        self.pending_commits = pending_commits
+        self.pending_bytes = pending_bytes
+        self.commit = commit # new checkpoint, None if no checkpoint was due
+        self.error = error
+
+
+class PruneReport():
+
+    def __init__(self):
+        self.checkpoints = 0 # superseded checkpoints whose objects were inspected
+        self.objects = 0 # removed loose objects
+        self.bytes = 0 # size of the removed loose objects
+        self.packed = 0 # unreachable checkpoint objects stored in packs, those are dropped by the next `git repack -a -d`
+        self.kept = 0 # unreachable checkpoint objects younger than the expiry time
+
+
+def pending_log(ledger, token_type, author_id):
+    """Returns (number of delta commits, size of their commits and trees in bytes) of the log that is not merged into the checkpoint"""
+    repo = ledger.repo
+    latest_commit = repo.ref(f"refs/heads/frontier/{token_type}/{author_id}")
+    if latest_commit is None:
+        return 0, 0
+    curr_checkpoint = repo.ref(f"refs/local/checkpoint/{token_type}/{author_id}")
+    if curr_checkpoint is not None and repo.reader.commit(curr_checkpoint).parents == (latest_commit,):
+        return 0, 0 # the checkpoint is up to date
+    log = ledger._author_log(latest_commit, author_id, since=curr_checkpoint)
+
+    pending_bytes = 0
+    for commit in log:
+        pending_bytes += _object_size(repo.reader, commit)
+        tree = repo.reader.commit(commit).tree
+        pending_bytes += _object_size(repo.reader, tree)
+        for name, entry in repo.reader.tree(tree).items():
+            if entry.type == "tree" or name in ("giveTo", "ackFrom"): # maps are trees or compact map blobs
+                pending_bytes += _object_size(repo.reader, entry.sha)
+    return len(log), pending_bytes
+
+
+def _object_size(reader, sha):
+    obj = reader.read(sha)
+    return len(obj[1]) if obj is not None else 0
+
+
+def compact(ledger, policy, accounts=None):
+    """Updates the checkpoints of all accounts for which the policy says a checkpoint is due, yields a CompactionResult for every account"""
+    if accounts is None:
+        accounts = ledger.accounts()
+    with ledger.repo.ref_transaction():
+        for token_type, author_id in accounts:
+            try:
+                pending_commits, pending_bytes = pending_log(ledger, token_type, author_id)
+                commit = None
+                if policy.due(pending_commits, pending_bytes):
+                    commit = ledger.checkpoint(token_type, author_id).commit
+                yield CompactionResult(token_type, author_id, pending_commits, pending_bytes, commit)
+            except (CheckpointError, GitError) as e:
+                yield CompactionResult(token_type, author_id, 0, 0, error=str(e))
+
+
+def prune_checkpoints(repo, expire=DEFAULT_PRUNE_EXPIRE, dry_run=False):
+    """Removes the loose objects of superseded checkpoints, that are not reachable from any reference and older than `expire` seconds.
+
+    Checkpoint trees share blobs and subtrees with delta commits and other checkpoints, therefore every object of a superseded checkpoint
+    is checked against a single `git rev-list --objects --all` walk before it is removed. Returns a PruneReport.
+    """
+    report = PruneReport()
+    stale_path = os.path.join(repo.git_dir, STALE_CHECKPOINTS)
+    processing_path = stale_path + ".prune"
+    if not os.path.exists(processing_path): # otherwise continue an interrupted prune
+        try:
+            os.replace(stale_path, processing_path) # new superseded checkpoints are recorded in a fresh file while pruning
+        except FileNotFoundError:
+            return report
+    with open(processing_path) as f:
+        stale = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+
+    repo.refresh()
+    live = set(repo.refs.values())
+    reader = repo.reader
+    candidates = {} # {object: commit of the superseded checkpoint}
+    retained = []
+    for commit in stale:
+        if commit in live:
+            continue # the checkpoint is referenced again, e.g. because the update of its successor lost a race
+        info = reader.commit(commit)
+        if info is None:
+            continue # already removed
+        report.checkpoints += 1
+        retained.append(commit)
+        candidates[commit] = commit
+        candidates.setdefault(info.tree, commit)
+        for entry in reader.tree(info.tree).values():
+            candidates.setdefault(entry.sha, commit)
+            if entry.type == "tree":
+                for sub_entry in reader.tree(entry.sha).values():
+                    candidates.setdefault(sub_entry.sha, commit)
+
+    if candidates:
+        trace.count("git")
+        process = subprocess.Popen(["git", "rev-list", "--objects", "--no-object-names", "--all", "--reflog"], cwd=repo.path,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        for line in process.stdout:
+            candidates.pop(line.strip().decode(), None)
+        if process.wait() != 0:
+            raise GitError("Could not determine the reachable objects, no checkpoint objects were pruned")
+
+    objects_dir = os.path.join(repo.git_dir, "objects")
+    deadline = time.time() - expire
+    blocked = set() # superseded checkpoints with objects that could not be removed yet
+    for sha, commit in candidates.items():
+        path = os.path.join(objects_dir, sha[:2], sha[2:])
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            report.packed += 1
+            blocked.add(commit)
+            continue
+        if stat.st_mtime > deadline:
+            report.kept += 1
+            blocked.add(commit)
+            continue
+        report.objects += 1
+        report.bytes += stat.st_size
+        if not dry_run:
+            os.unlink(path)
+
+    # superseded checkpoints with remaining objects are inspected again by the next prune
+    remaining = retained if dry_run else [commit for commit in retained if commit in blocked]
+    if remaining:
+        with open(stale_path, "a") as f:
+            f.writelines(f"{commit}\n" for commit in remaining)
+    os.unlink(processing_path)
+    return report
@@ -0,0 +1,138 @@
+import json
+import os
+import signal
+import socket
+import socketserver
+
+from . import trace
+from .checkpoint import Ledger
+from .operations import OperationError, Operations
+from .repo import GitError
+
+DEFAULT_SOCKET = "goc.sock" # relative to the .git directory of the repository
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Handles one client connection, every line is a JSON request and is answered by a single JSON line.
+
+    The references are re-read at the start of every connection (and on requests with "refresh": true),
+    so that updates of other processes (e.g. repo-merge) become visible to the next client.
+    """
+
+    def handle(self):
+        self.server.operations.repo.refresh()
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                response = {"ok": False, "code": 1, "error": f"Invalid request: {e}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class LedgerServer(socketserver.UnixStreamServer):
+    """Ledger daemon of one repository, keeping the object reader, the reference snapshot, the alias maps and the balance cache in memory.
+
+    Requests are handled one after another, therefore operations on the same account never race within the daemon.
+    Frontier updates are conditional on the commit the operation started from, a concurrent update by another process fails the request.
+    """
+
+    def __init__(self, repo_path, socket_path):
+        self.ledger = Ledger(repo_path)
+        self.operations = Operations(self.ledger)
+        super().__init__(socket_path, RequestHandler)
+
+    def dispatch(self, request):
+        with trace.span("total", script="goc serve"):
+            return self._dispatch(request)
+
+    def _dispatch(self, request):
+        ops = self.operations
+        if request.get("refresh"):
+            ops.repo.refresh()
+
+        op = request["op"]
+        if op == "refresh":
+            return {"ok": True}
+        author_alias = request.get("author_alias")
+        try:
+            token_type = request.get("token") or ops.token_id(request["token_alias"])
+            if op == "create":
+                commit, message = ops.create(token_type, request["amount"], author_alias)
+            elif op == "burn":
+                commit, message = ops.burn(token_type, request["amount"], author_alias)
+            elif op == "giveTo":
+                recipient_id = request.get("recipient") or ops.author_id(request["recipient_alias"])
+                commit, message = ops.give_to(token_type, recipient_id, request["amount"], author_alias)
+            elif op == "giveToMany":
+                transfers = [(transfer.get("recipient") or ops.author_id(transfer["recipient_alias"]), transfer["amount"]) for transfer in request["transfers"]]
+                commit, author_id, total = ops.give_to_many(token_type, transfers, author_alias)
+                message = f"Transfered {total} tokens of type '{token_type}' from author '{author_id}' to {len(set(r for r, _ in transfers))} recipients"
+            elif op == "ackFrom":
+                sender_id = request.get("sender") or ops.author_id(request["sender_alias"])
+                commit, message = ops.ack_from(token_type, sender_id, author_alias)
+            elif op == "ackFromAll":
+                commit, author_id, total, num_senders = ops.ack_from_all(token_type, author_alias)
+                message = f"Acknowledged {total} tokens of type '{token_type}' received from {num_senders} senders by author '{author_id}'"
+            elif op == "balance":
+                author_id = request.get("author") # defaults to the author of the request
+                return {"ok": True, "balance": ops.balance(token_type, author_alias, author_id)}
+            else:
+                return {"ok": False, "code": 1, "error": f"Unknown operation '{op}'"}
+        except OperationError as e:
+            return {"ok": False, "code": e.code, "error": str(e)}
+        except GitError as e:
+            ops.repo.refresh()
+            return {"ok": False, "code": 1, "error": str(e)}
+        return {"ok": True, "commit": commit, "message": message}
+
+    def server_close(self):
+        super().server_close()
+        self.ledger.close()
+
+
+def default_socket_path(repo_path):
+    return os.path.join(repo_path, ".git", DEFAULT_SOCKET)
+
+
+def serve(repo_path, socket_path=None):
+    """Serves the ledger operations of the repository on a Unix socket until SIGINT or SIGTERM is received"""
+    socket_path = socket_path or default_socket_path(repo_path)
+    if os.path.exists(socket_path):
+        os.unlink(socket_path) # left over from a daemon that was killed
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, stop)
+
+    server = LedgerServer(repo_path, socket_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+class DaemonClient():
+    """Client of a ledger daemon, sends the requests over a single connection"""
+
+    def __init__(self, socket_path):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile("rwb")
+
+    def request(self, op, **fields):
+        self.file.write(json.dumps(dict(fields, op=op)).encode() + b"\n")
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("The ledger daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
@@ -0,0 +1,123 @@
+import os
+import time
+
+from . import trace
+from .merge import MergeVerifier
+
+PROBE_ACCOUNTS = 50 # number of accounts whose logs are walked by probe()
+
+
+class MaintenancePolicy():
+    """Decides when a repository is maintained after receiving updates.
+
+    Maintenance is due once the repository has at least `loose_objects` loose objects, `loose_refs` loose references or `packs` pack files.
+    A value of 0 disables the respective threshold.
+    """
+
+    def __init__(self, loose_objects=0, loose_refs=0, packs=0):
+        self.loose_objects = loose_objects
+        self.loose_refs = loose_refs
+        self.packs = packs
+
+    @classmethod
+    def from_config(cls, repo, loose_objects=None, loose_refs=None, packs=None):
+        """Reads the thresholds from goc.maintenance.looseObjects, goc.maintenance.looseRefs and goc.maintenance.packs, unless they are given explicitly"""
+        def config_int(name):
+            try:
+                return max(0, int(repo.config(name)))
+            except ValueError:
+                return 0
+        return cls(config_int("goc.maintenance.looseObjects") if loose_objects is None else loose_objects,
+                   config_int("goc.maintenance.looseRefs") if loose_refs is None else loose_refs,
+                   config_int("goc.maintenance.packs") if packs is None else packs)
+
+    @property
+    def enabled(self):
+        return self.loose_objects > 0 or self.loose_refs > 0 or self.packs > 0
+
+    def due(self, stats):
+        return ((self.loose_objects > 0 and stats.loose_objects >= self.loose_objects) or (self.loose_refs > 0 and stats.loose_refs >= self.loose_refs)
+                or (self.packs > 0 and stats.packs >= self.packs))
+
+
+class RepositoryStats():
+    """Loose objects, loose references, packs and commit-graph of a repository, counted from the files of the .git directory"""
+
+    def __init__(self, loose_objects=0, loose_refs=0, packs=0, commit_graph=False, multi_pack_index=False):
+        self.loose_objects = loose_objects
+        self.loose_refs = loose_refs
+        self.packs = packs
+        self.commit_graph = commit_graph
+        self.multi_pack_index = multi_pack_index
+
+    @classmethod
+    def read(cls, repo):
+        stats = cls()
+        objects_dir = os.path.join(repo.git_dir, "objects")
+        for name in os.listdir(objects_dir):
+            if len(name) == 2: # fan-out directories of the loose objects
+                stats.loose_objects += sum(1 for f in os.listdir(os.path.join(objects_dir, name)) if not f.startswith("tmp_"))
+        for _, _, files in os.walk(os.path.join(repo.git_dir, "refs")):
+            stats.loose_refs += sum(1 for f in files if not f.endswith(".lock"))
+        pack_dir = os.path.join(objects_dir, "pack")
+        if os.path.isdir(pack_dir):
+            stats.packs = sum(1 for f in os.listdir(pack_dir) if f.endswith(".pack"))
+            stats.multi_pack_index = os.path.exists(os.path.join(pack_dir, "multi-pack-index"))
+        info_dir = os.path.join(objects_dir, "info")
+        stats.commit_graph = os.path.exists(os.path.join(info_dir, "commit-graph")) or os.path.exists(os.path.join(info_dir, "commit-graphs", "commit-graph-chain"))
+        return stats
+
+
+def maintain(repo):
+    """Maintains the repository, yields (step, seconds) for every step.
+
+    - pack-refs: moves all loose references (frontier, checkpoints, remote frontiers) into packed-refs, so that `git for-each-ref` reads one file
+    - repack: packs the reachable loose objects written by the ledger operations into a new pack and removes them (unreachable objects,
+      e.g. of superseded checkpoints, stay loose until they are pruned, see prune_checkpoints())
+    - multi-pack-index: writes a multi-pack-index over all packs and consolidates the packs into a single one
+    - commit-graph: adds the commits reachable from any reference to the commit-graph (split into layers, with generation numbers), which
+      is used for `git merge-base --is-ancestor`, `git log --first-parent` and the reachability checks of `git fetch`
+    """
+    steps = [
+        ("pack-refs", [["pack-refs", "--all"]]),
+        ("repack", [["repack", "-d", "-q", "--no-write-bitmap-index"]]),
+        ("multi-pack-index", [["multi-pack-index", "write"], ["multi-pack-index", "repack", "--batch-size=0"], ["multi-pack-index", "expire"]]),
+        ("commit-graph", [["commit-graph", "write", "--reachable", "--split", "--no-progress"]]),
+    ]
+    for step, commands in steps:
+        with trace.span(step):
+            start = time.perf_counter()
+            for args in commands:
+                repo.git(*args)
+            yield step, time.perf_counter() - start
+
+
+def probe(repo, accounts=PROBE_ACCOUNTS):
+    """Measures the git queries of repo-merge and account-checkpoint without changing the repository, returns {"merge": s, "checkpoint": s}.
+
+    merge: the diff between the remote and local frontier of every remote (verify-merge) and a dry run of the fetch that fast-forwards the
+    local frontier. checkpoint: reading all references and the first-parent log since the checkpoint of up to `accounts` accounts.
+    """
+    repo.refresh()
+    timings = {}
+
+    start = time.perf_counter()
+    verifier = MergeVerifier(repo)
+    local_refs = sorted(repo.refs_with_prefix("refs/heads/frontier/"))
+    remotes = sorted({name.split("/")[2] for name in repo.refs_with_prefix("refs/remotes/")})
+    for remote in remotes:
+        remote_refs = sorted(repo.refs_with_prefix(f"refs/remotes/{remote}/frontier/"))
+        if remote_refs:
+            verifier.commit_diff(remote_refs, local_refs)
+            repo.git("fetch", "--dry-run", "--no-auto-maintenance", "--no-auto-gc", ".", f"refs/remotes/{remote}/frontier/*:refs/heads/frontier/*", check=False)
+    timings["merge"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    repo.refresh()
+    for name, frontier in sorted(repo.refs_with_prefix("refs/heads/frontier/").items())[:accounts]:
+        token_type, author_id = name.split("/")[-2:]
+        checkpoint = repo.ref(f"refs/local/checkpoint/{token_type}/{author_id}")
+        revisions = f"{checkpoint}..{frontier}" if checkpoint is not None else frontier
+        repo.git("log", "--format=%H", "--first-parent", revisions)
+    timings["checkpoint"] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,111 @@
+import hashlib
+
+MAGIC = b"GOCMAP" # first bytes of every compact map blob
+VERSION = 1
+ENCODING_CONFIG = "goc.mapEncoding" # encoding of new giveTo/ackFrom maps: "compact", "sharded" or trees of counter blobs (default)
+COMPACT = "compact"
+SHARDED = "sharded"
+SHARD_LENGTH = 2 # number of hex digits of the shard names, 256 shards
+
+
+class MapFormatError(ValueError):
+    pass
+
+
+def encode_map(counters):
+    """Encodes the counters {id: counter} of a giveTo/ackFrom map as the content of a single blob.
+
+    Layout (version 1): MAGIC, version byte, varint number of entries, followed by the entries sorted by id. Every entry consists of the
+    varint length of the prefix shared with the previous id, the varint length and the bytes of the remaining suffix and the varint counter.
+    The author ids (encoded public keys) share long prefixes, which are stored only once. The encoding of a map is unique, so that
+    equal maps are stored in the same blob.
+    """
+    out = bytearray(MAGIC)
+    out.append(VERSION)
+    _write_varint(out, len(counters))
+    previous = b""
+    for key in sorted(name.encode() for name in counters):
+        value = counters[key.decode()]
+        if value < 0:
+            raise MapFormatError(f"Negative counter of '{key.decode()}'")
+        shared = _shared_prefix(previous, key)
+        _write_varint(out, shared)
+        _write_varint(out, len(key) - shared)
+        out += key[shared:]
+        _write_varint(out, value)
+        previous = key
+    return bytes(out)
+
+
+def decode_map(content):
+    """Decodes a blob written by encode_map() into {id: counter}"""
+    if not is_compact(content):
+        raise MapFormatError("Not a compact map")
+    if content[len(MAGIC)] != VERSION:
+        raise MapFormatError(f"Unsupported compact map version {content[len(MAGIC)]}")
+
+    pos = len(MAGIC) + 1
+    num_entries, pos = _read_varint(content, pos)
+    counters = {}
+    previous = b""
+    for _ in range(num_entries):
+        shared, pos = _read_varint(content, pos)
+        length, pos = _read_varint(content, pos)
+        if shared > len(previous) or pos + length > len(content):
+            raise MapFormatError("Truncated compact map")
+        key = previous[:shared] + content[pos:pos + length]
+        pos += length
+        if key <= previous and counters:
+            raise MapFormatError("Compact map entries are not sorted")
+        counters[key.decode()], pos = _read_varint(content, pos)
+        previous = key
+    if pos != len(content):
+        raise MapFormatError("Trailing bytes after the compact map")
+    return counters
+
+
+def shard(name):
+    """Returns the shard of an id in a sharded giveTo/ackFrom map, the first hex digits of the SHA-1 of the id (like the objects/xx/ fan-out).
+
+    The ids of the counterparties share long prefixes (the encoded key type), so the shards are not named by a prefix of the id itself.
+    """
+    return hashlib.sha1(name.encode()).hexdigest()[:SHARD_LENGTH]
+
+
+def is_compact(content):
+    return content.startswith(MAGIC) and len(content) > len(MAGIC)
+
+
+def _shared_prefix(a, b):
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+def _write_varint(out, value):
+    # unsigned LEB128, counters are not limited to 64 bit
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(content, pos):
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(content):
+            raise MapFormatError("Truncated compact map")
+        byte = content[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
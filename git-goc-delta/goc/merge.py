@@ -0,0 +1,177 @@
+import os
+import subprocess
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from . import trace
+from .aliases import TOKEN, AliasTable
+from .repo import Repository
+from .signers import AllowedSigners, decode_pubkey
+
+SIGNATURE_CHUNK_SIZE = 64 # commits verified by a single `git log` process
+
+CommitInfo = namedtuple("CommitInfo", ["sha", "author", "parents", "subject"])
+
+
+class MergeError(Exception):
+    pass
+
+
+class MergeVerifier():
+    """Verifies the commits of a remote frontier before they are merged into the local frontier.
+
+    Equivalent to verifying every commit with `git verify-commit`, comparing the signing key with the key of the author and checking
+    with `git rev-list --first-parent --max-parents=0` that its history leads to a single root, but the metadata of all commits is read
+    with a single `git log`, the signatures are checked in chunks by concurrent `git log --format=%G?` processes and the first-parent roots
+    are resolved once per log instead of once per commit.
+    """
+
+    def __init__(self, repo):
+        self.repo = repo if isinstance(repo, Repository) else Repository(repo)
+        self.signers = AllowedSigners(self.repo.git_dir)
+        self.aliases = AliasTable(self.repo.git_dir)
+        self._roots = {} # {commit: root of its first-parent history}
+
+    def commit_diff(self, include, exclude):
+        """Returns the commits reachable from `include` but not from `exclude`, in the order of `git log`"""
+        if not include:
+            return []
+        stdin = "".join([f"{ref}\n" for ref in include] + [f"^{ref}\n" for ref in exclude]).encode() # avoids the argument limit for many references
+        commits = []
+        for line in self.repo.git("log", "--stdin", "--format=%H%x00%an%x00%P%x00%s", input=stdin).stdout.decode().splitlines():
+            sha, author, parents, subject = line.split("\0", 3)
+            commits.append(CommitInfo(sha, author, tuple(parents.split()), subject))
+        return commits
+
+    def allow_signers(self, commits):
+        """Adds the keys of all authors to the allowed signers file (like utility/add-allowed-pubkey) and computes their fingerprints,
+        looking up every author once in the allowed signers index
+        """
+        pubkeys = list(dict.fromkeys(decode_pubkey(commit.author) for commit in commits))
+        self.signers.add(pubkeys)
+        for pubkey in pubkeys:
+            self.signers.fingerprint(pubkey)
+
+    def signatures(self, commits, jobs=1):
+        """Checks the signatures of the commits with up to `jobs` concurrent `git log --format=%G?` processes, each verifying a chunk of
+        consecutive commits. Returns {commit: (status, signing key fingerprint)}, where status is the %G? placeholder ("G" for a good signature).
+
+        Verification fails fast: once a commit with an invalid signature is found, all chunks after it are cancelled, while earlier chunks
+        are completed, since they could contain an invalid commit that comes first in the order of `git log`.
+        """
+        chunks = [commits[i:i + SIGNATURE_CHUNK_SIZE] for i in range(0, len(commits), SIGNATURE_CHUNK_SIZE)]
+        fingerprints = {commit.author: self.fingerprint(commit.author) for commit in commits} # resolved before the workers start, the index is bound to this thread
+        signatures = {}
+        lock = threading.Lock()
+        first_invalid = [len(chunks)] # index of the first chunk containing an invalid signature
+
+        def check_chunk(index, chunk):
+            with lock:
+                if index > first_invalid[0]:
+                    return # cancelled
+            authors = {commit.sha: commit.author for commit in chunk}
+            trace.count("git")
+            process = subprocess.Popen(["git", "log", "--no-walk=unsorted", "--stdin", "--format=%H %G? %GK"], cwd=self.repo.path,
+                                       stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            process.stdin.write("".join(f"{sha}\n" for sha in authors).encode())
+            process.stdin.close()
+            try:
+                for line in process.stdout:
+                    sha, status, fingerprint = (line.decode().rstrip("\n").split(" ", 2) + [""])[:3]
+                    with lock:
+                        signatures[sha] = (status, fingerprint)
+                        if status != "G" or fingerprint != fingerprints[authors[sha]]:
+                            first_invalid[0] = min(first_invalid[0], index)
+                            return
+                        if index > first_invalid[0]:
+                            return # an invalid commit was found in an earlier chunk
+            finally:
+                process.kill()
+                process.wait()
+                process.stdout.close()
+
+        with ThreadPoolExecutor(max(1, jobs)) as pool:
+            for future in [pool.submit(check_chunk, index, chunk) for index, chunk in enumerate(chunks)]:
+                future.result()
+        return signatures
+
+    def fingerprint(self, author):
+        return self.signers.fingerprint(decode_pubkey(author))
+
+    def first_parent_root(self, sha):
+        """Returns the root commit of the first-parent history of the given commit, or None if the history is incomplete"""
+        reader = self.repo.reader
+        chain = []
+        root = None
+        while sha is not None:
+            if sha in self._roots:
+                root = self._roots[sha]
+                break
+            chain.append(sha)
+            commit = reader.commit(sha)
+            if commit is None:
+                break # missing object, the history can't be verified
+            if not commit.parents:
+                root = sha
+                break
+            sha = commit.parents[0]
+        for commit in chain:
+            self._roots[commit] = root
+        return root
+
+    def verify(self, commits, signatures):
+        """Verifies the commits in the given order and raises a MergeError for the first invalid commit.
+        Yields the commits that passed the verification, so that the caller can process them before the next commit is verified.
+        """
+        for commit in commits:
+            status, fingerprint = signatures.get(commit.sha, ("N", ""))
+            sha256 = self.fingerprint(commit.author)
+            if status != "G" or sha256 is None or fingerprint != sha256:
+                raise MergeError(f"Error could not verify commit '{commit.sha}'.")
+            if commit.parents and self.first_parent_root(commit.sha) is None:
+                raise MergeError(f"The commit '{commit.sha}' points to multiple root commits.")
+            yield commit
+
+    def verify_refs(self, refs, commits):
+        """Verifies that every reference pointing to one of the new commits contains the token commit of its name"""
+        new_commits = {commit.sha for commit in commits}
+        for name, sha in sorted(refs.items()):
+            if sha not in new_commits:
+                continue
+            token_type = name.split("/")[-2]
+            if not self.repo.is_ancestor(token_type, sha):
+                short_name = name[len("refs/remotes/"):] if name.startswith("refs/remotes/") else name
+                raise MergeError(f"The reference '{short_name}' points to a different token ({token_type}), then specified in the name")
+
+    def verify_jobs(self):
+        """Number of concurrent signature verifications, configured by goc.merge.verifyJobs (defaults to the number of CPUs)"""
+        try:
+            return max(1, int(self.repo.config("goc.merge.verifyJobs")))
+        except ValueError:
+            return os.cpu_count() or 1
+
+    def verify_remote(self, remote, jobs=None):
+        """Verifies all commits of the frontier of the remote, that are not part of the local frontier. Registers the aliases of new
+        token types on the way and raises a MergeError if the remote frontier must not be merged. Returns the number of verified commits.
+        """
+        if jobs is None:
+            jobs = self.verify_jobs()
+        repo = self.repo
+        local_refs = list(repo.refs_with_prefix("refs/heads/frontier/"))
+        remote_refs = [name for name in repo.refs_with_prefix(f"refs/remotes/{remote}/frontier/") if name.count("/") >= 5]
+        commits = self.commit_diff(remote_refs, local_refs)
+
+        self.allow_signers(commits)
+        signatures = self.signatures(commits, jobs)
+        for commit in self.verify(commits, signatures):
+            if not commit.parents and commit.subject and not any(c.isspace() for c in commit.subject):
+                repo.update_ref(f"refs/local/token_alias/{commit.subject}", commit.sha) # add token alias lookup reference
+                self.aliases.add(TOKEN, commit.subject, commit.sha)
+
+        self.verify_refs(repo.refs_with_prefix("refs/remotes/"), commits)
+        return len(commits)
+
+    def close(self):
+        self.signers.close()
+        self.repo.close()
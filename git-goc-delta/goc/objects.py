@@ -0,0 +1,301 @@
+import hashlib
+import os
+import subprocess
+import tempfile
+import time
+import zlib
+from collections import namedtuple
+
+from . import trace
+from .maps import COMPACT, SHARDED, MapFormatError, decode_map, encode_map, shard
+
+EMPTY_TREE = "4b825dc642cb6eb9a060e54bf8d69288fbee4904"
+
+BLOB_OBJECTMODE = "100644"
+TREE_OBJECTMODE = "40000"
+
+Commit = namedtuple("Commit", ["tree", "parents", "author"])
+TreeEntry = namedtuple("TreeEntry", ["mode", "type", "sha"])
+
+
+class CheckpointError(Exception):
+    # invalid account state, also raised by the object reader for objects received from peers that are not valid ledger data
+    pass
+
+
+class ObjectReader():
+    """Reads objects through a single long-lived `git cat-file --batch` process.
+
+    Commits and trees are immutable, therefore parsed objects are cached for the lifetime of the reader.
+    """
+
+    def __init__(self, repo_path):
+        self.repo_path = repo_path
+        self._process = None
+        self._commits = {}
+        self._trees = {}
+        self._blobs = {}
+        self._maps = {}
+
+    def _batch(self):
+        if self._process is None:
+            trace.count("git")
+            self._process = subprocess.Popen(["git", "cat-file", "--batch"], cwd=self.repo_path,
+                                             stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return self._process
+
+    def read(self, sha):
+        """Returns (type, content) of the given object, or None if the object does not exist"""
+        process = self._batch()
+        process.stdin.write(sha.encode() + b"\n")
+        process.stdin.flush()
+        header = process.stdout.readline().split()
+        if len(header) != 3:
+            return None # "<sha> missing" or "<sha> ambiguous"
+        size = int(header[2])
+        content = process.stdout.read(size + 1)[:-1] # strip trailing LF
+        return header[1].decode(), content
+
+    def commit(self, sha):
+        commit = self._commits.get(sha)
+        if commit is not None:
+            return commit
+        obj = self.read(sha)
+        if obj is None or obj[0] != "commit":
+            return None
+
+        tree = None
+        parents = []
+        author = ""
+        for line in obj[1].split(b"\n"):
+            if not line:
+                break # end of header
+            if line.startswith(b"tree "):
+                tree = line[5:].decode()
+            elif line.startswith(b"parent "):
+                parents.append(line[7:].decode())
+            elif line.startswith(b"author "):
+                ident = line[7:].decode()
+                author = ident[:ident.rfind(">") + 1] # "name <email>", the part matched by `git log --author`
+
+        commit = Commit(tree, tuple(parents), author)
+        self._commits[sha] = commit
+        return commit
+
+    def tree(self, sha):
+        """Returns the entries of the given tree as dict {name: TreeEntry}"""
+        tree = self._trees.get(sha)
+        if tree is not None:
+            return tree
+        if sha == EMPTY_TREE:
+            tree = {}
+        else:
+            obj = self.read(sha)
+            if obj is None or obj[0] != "tree":
+                return None
+            tree = parse_tree(obj[1])
+        self._trees[sha] = tree
+        return tree
+
+    def blob_int(self, sha):
+        """Returns the counter value stored in the given blob"""
+        value = self._blobs.get(sha)
+        if value is None:
+            obj = self.read(sha)
+            if obj is None or obj[0] != "blob":
+                return None
+            try:
+                value = int(obj[1])
+            except ValueError:
+                raise CheckpointError(f"Invalid counter blob {sha}")
+            self._blobs[sha] = value
+        return value
+
+    def counter_map(self, entry):
+        """Returns the counters {id: counter} of a giveTo/ackFrom entry, which is a tree of counter blobs, a tree of shards (trees of
+        counter blobs, see goc.maps.shard) or a compact map blob"""
+        if entry.type == "blob":
+            counters = self._compact_map(entry.sha)
+            return dict(counters) if counters is not None else None
+        counters = {}
+        for name, sub_entry in self._map_tree(entry.sha).items():
+            if sub_entry.type == "tree":
+                counters.update(self._shard(sub_entry.sha))
+            else:
+                counters[name] = self.blob_int(sub_entry.sha)
+        return counters
+
+    def counter(self, entry, name):
+        """Returns the counter of `name` in a giveTo/ackFrom entry or None, only the shard of `name` is read from a sharded map"""
+        if entry.type == "blob":
+            counters = self._compact_map(entry.sha)
+            return counters.get(name) if counters is not None else None
+        tree = self._map_tree(entry.sha)
+        sub_entry = tree.get(shard(name))
+        if sub_entry is not None and sub_entry.type == "tree": # sharded map
+            sub_entry = self.tree(sub_entry.sha).get(name)
+        else:
+            sub_entry = tree.get(name)
+        return self.blob_int(sub_entry.sha) if sub_entry is not None else None
+
+    def is_sharded(self, entry):
+        # an empty tree is a valid map of every tree encoding
+        return entry.type == "tree" and all(sub_entry.type == "tree" for sub_entry in self.tree(entry.sha).values())
+
+    def _map_tree(self, sha):
+        # the entries of a map are either all counter blobs or all shards, maps mixing both are rejected
+        tree = self.tree(sha)
+        if len({sub_entry.type for sub_entry in tree.values()}) > 1:
+            raise CheckpointError(f"Invalid map {sha}, it mixes counter blobs and shards")
+        return tree
+
+    def _shard(self, sha):
+        # shards are immutable, so a shard shared by the maps of consecutive commits is only read once
+        counters = self._maps.get(sha)
+        if counters is None:
+            tree = self.tree(sha)
+            if any(sub_entry.type != "blob" for sub_entry in tree.values()):
+                raise CheckpointError(f"Invalid shard {sha}, it contains entries that are not counter blobs")
+            counters = {name: self.blob_int(sub_entry.sha) for name, sub_entry in tree.items()}
+            self._maps[sha] = counters
+        return counters
+
+    def _compact_map(self, sha):
+        counters = self._maps.get(sha)
+        if counters is None:
+            obj = self.read(sha)
+            if obj is None or obj[0] != "blob":
+                return None
+            try:
+                counters = decode_map(obj[1])
+            except MapFormatError as e:
+                raise CheckpointError(f"Invalid compact map {sha}: {e}")
+            self._maps[sha] = counters
+        return counters
+
+    def close(self):
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+
+class ObjectWriter():
+    """Writes loose objects directly to the object database of a repository.
+
+    The written objects are identical to those created by `git hash-object -w` and `git mktree`.
+    """
+
+    def __init__(self, git_dir):
+        self.objects_dir = os.path.join(git_dir, "objects")
+
+    def write(self, obj_type, content):
+        trace.count("objects")
+        data = f"{obj_type} {len(content)}\0".encode() + content
+        sha = hashlib.sha1(data).hexdigest()
+        obj_dir = os.path.join(self.objects_dir, sha[:2])
+        obj_path = os.path.join(obj_dir, sha[2:])
+        if os.path.exists(obj_path):
+            try:
+                os.utime(obj_path) # freshen the object like git does, so that a concurrent prune of old unreachable objects keeps it
+            except OSError:
+                pass
+            return sha
+
+        os.makedirs(obj_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=obj_dir, prefix="tmp_obj_")
+        with os.fdopen(fd, "wb") as f:
+            f.write(zlib.compress(data, 1))
+        os.chmod(tmp_path, 0o444)
+        os.replace(tmp_path, obj_path)
+        return sha
+
+    def blob_int(self, value):
+        # equivalent to `echo $value | git hash-object --stdin -w`
+        return self.write("blob", f"{value}\n".encode())
+
+    def counter_map(self, counters, encoding=None):
+        """Writes the counters {id: counter} of a giveTo/ackFrom map as tree of counter blobs, as tree of shards (SHARDED) or as compact
+        map blob (COMPACT), returns its TreeEntry"""
+        if encoding == COMPACT:
+            return blob_entry(self.write("blob", encode_map(counters)))
+        entries = {name: blob_entry(self.blob_int(value)) for name, value in counters.items()}
+        if encoding == SHARDED:
+            shards = {}
+            for name, sub_entry in entries.items():
+                shards.setdefault(shard(name), {})[name] = sub_entry
+            entries = {name: tree_entry(self.tree(shard_entries)) for name, shard_entries in shards.items()}
+        return tree_entry(self.tree(entries))
+
+    def tree(self, entries):
+        """Writes a tree consisting of the given entries {name: TreeEntry}"""
+        if not entries:
+            return EMPTY_TREE
+        return self.write("tree", format_tree(entries))
+
+    def commit(self, tree, parents, author_id, message):
+        """Writes an unsigned commit, equivalent to `git commit-tree` with GIT_{AUTHOR,COMMITTER}_NAME=<author_id> and an empty email"""
+        now = int(time.time())
+        offset = time.localtime(now).tm_gmtoff // 60
+        sign = "+" if offset >= 0 else "-"
+        ident = f"{author_id} <> {now} {sign}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+
+        lines = [f"tree {tree}"] + [f"parent {parent}" for parent in parents] + [f"author {ident}", f"committer {ident}", "", message]
+        return self.write("commit", "\n".join(lines).encode())
+
+
+def update_counter_map(reader, writer, entry, counters, encoding=None):
+    """Writes the giveTo/ackFrom map `entry` (None for an empty map) with the changed counters {id: counter}, returns its TreeEntry.
+
+    If both the given and the written map are sharded, only the shards of the changed ids are read and written, all other shards are
+    kept. Otherwise the entire map is read and written in the given encoding.
+    """
+    if encoding == SHARDED and (entry is None or reader.is_sharded(entry)):
+        shards = dict(reader.tree(entry.sha)) if entry is not None else {}
+        changed = {}
+        for name, value in counters.items():
+            changed.setdefault(shard(name), {})[name] = blob_entry(writer.blob_int(value))
+        for name, shard_entries in changed.items():
+            if name in shards:
+                shard_entries = {**reader.tree(shards[name].sha), **shard_entries}
+            shards[name] = tree_entry(writer.tree(shard_entries))
+        return tree_entry(writer.tree(shards))
+    merged = reader.counter_map(entry) if entry is not None else {}
+    merged.update(counters)
+    return writer.counter_map(merged, encoding)
+
+
+def parse_tree(content):
+    entries = {}
+    pos = 0
+    while pos < len(content):
+        space = content.index(b" ", pos)
+        nul = content.index(b"\0", space)
+        mode = content[pos:space].decode()
+        name = content[space + 1:nul].decode()
+        sha = content[nul + 1:nul + 21].hex()
+        entries[name] = TreeEntry(mode, "tree" if mode == TREE_OBJECTMODE else "blob", sha)
+        pos = nul + 21
+    return entries
+
+
+def format_tree(entries):
+    # git sorts tree entries by name, where the names of subtrees are compared as if they had a trailing slash
+    def sort_key(name):
+        key = name.encode()
+        return key + b"/" if entries[name].type == "tree" else key
+
+    content = b""
+    for name in sorted(entries, key=sort_key):
+        entry = entries[name]
+        content += f"{entry.mode} {name}\0".encode() + bytes.fromhex(entry.sha)
+    return content
+
+
+def blob_entry(sha):
+    return TreeEntry(BLOB_OBJECTMODE, "blob", sha)
+
+
+def tree_entry(sha):
+    return TreeEntry(TREE_OBJECTMODE, "tree", sha)
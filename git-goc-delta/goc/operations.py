@@ -0,0 +1,250 @@
+import os
+
+from . import trace
+from .aliases import AliasTable
+from .checkpoint import AccountState, CheckpointError
+from .objects import blob_entry, update_counter_map
+from .repo import ZERO_OID, GitError
+
+
+class OperationError(Exception):
+    """Failed ledger operation, `code` is the exit code of the equivalent Bash script"""
+
+    def __init__(self, message, code=1):
+        super().__init__(message)
+        self.code = code
+
+
+class Operations():
+    """In-process implementation of token-create, token-burn, token-giveTo and token-ackFrom.
+
+    The delta states are committed with the same tree layout, author and message as the Bash scripts and signed by `git commit-tree`.
+    If no author alias is given, the operations are performed by the author of the repository (goc.author.id, signed with user.signingkey);
+    otherwise the author and key are resolved from the alias, as in the single repository setup of the evaluation (.git/keys/<alias>.pub).
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.repo = ledger.repo
+        self.aliases = AliasTable(self.repo.git_dir)
+        self._debug = self.repo.git("config", "--bool", "goc.debug", check=False).stdout.decode().strip() == "true"
+        self._own_author_id = self.repo.config("goc.author.id")
+
+    # alias resolution
+
+    def author_id(self, alias):
+        author_id = self.aliases.author_id(alias)
+        if author_id is None: # not (yet) part of the alias table
+            try:
+                with open(os.path.join(self.repo.git_dir, "alias_lookup", alias)) as f:
+                    author_id = f.read().strip()
+            except OSError:
+                raise OperationError(f"There is no stored reference for alias '{alias}'.")
+        return author_id
+
+    def token_id(self, alias):
+        token_type = self.aliases.token_id(alias) or self.repo.ref(f"refs/local/token_alias/{alias}")
+        if token_type is None:
+            raise OperationError(f"The token alias '{alias}' is unknown")
+        return token_type
+
+    def _signer(self, author_alias):
+        # returns (author-id, arguments of `git commit-tree` for signing the commit)
+        if author_alias is None:
+            if not self._own_author_id:
+                raise OperationError("The repository misses goc.author.id")
+            return self._own_author_id, ["-S"]
+        return self.author_id(author_alias), [f"--gpg-sign=.git/keys/{author_alias}.pub"]
+
+    def _check_token(self, token_type):
+        commit = self.repo.reader.commit(token_type)
+        if commit is None or commit.parents:
+            raise OperationError(f"Token Type '{token_type}' unknown.")
+
+    @staticmethod
+    def _check_amount(amount):
+        amount = int(amount)
+        if amount <= 0:
+            raise OperationError("Amount is less equal 0")
+        return amount
+
+    def _checkpoint(self, token_type, author_id):
+        try:
+            return self.ledger.checkpoint(token_type, author_id)
+        except CheckpointError as e:
+            raise OperationError(f"error while creating checkpoint: {e}")
+
+    def _checkpoint_state(self, token_type, author_id):
+        try:
+            return self.ledger.checkpoint(token_type, author_id).state
+        except CheckpointError:
+            return AccountState() # like the scripts, a failed checkpoint computation is treated as an empty account
+
+    def _balance(self, token_type, author_id):
+        try:
+            return self.ledger.balance(token_type, author_id)
+        except CheckpointError:
+            return 0 # the scripts treat a failed balance computation like an empty account
+
+    # operations
+
+    def create(self, token_type, amount, author_alias=None):
+        author_id, sign_args = self._signer(author_alias)
+        amount = self._check_amount(amount)
+        self._check_token(token_type)
+
+        state = self._checkpoint(token_type, author_id).state
+        writer = self.repo.writer
+        tree = writer.tree({"created": blob_entry(writer.blob_int(state.created + amount))})
+
+        parent = self.repo.ref(f"refs/heads/frontier/{token_type}/{author_id}") or token_type
+        commit = self._commit(token_type, author_id, sign_args, tree, [parent], f"create({token_type}/{author_id}, {amount})")
+        return commit, f"Created {amount} tokens of type '{token_type}' for author '{author_id}'"
+
+    def burn(self, token_type, amount, author_alias=None):
+        author_id, sign_args = self._signer(author_alias)
+        amount = self._check_amount(amount)
+        self._check_token(token_type)
+
+        if self._balance(token_type, author_id) < amount:
+            raise OperationError("The account has an insufficient number of tokens to burn.")
+        state = self._checkpoint(token_type, author_id).state
+        writer = self.repo.writer
+        tree = writer.tree({"burned": blob_entry(writer.blob_int(state.burned + amount))})
+
+        parents = self._frontier_parents(token_type, author_id)
+        commit = self._commit(token_type, author_id, sign_args, tree, parents, f"burn({token_type}/{author_id}, {amount})")
+        return commit, f"Burned {amount} tokens of type '{token_type}' for author '{author_id}'"
+
+    def give_to(self, token_type, recipient_id, amount, author_alias=None):
+        commit, author_id, total = self.give_to_many(token_type, [(recipient_id, amount)], author_alias)
+        return commit, f"Transfered {total} tokens of type '{token_type}' from author '{author_id}' to '{recipient_id}'"
+
+    def give_to_many(self, token_type, transfers, author_alias=None):
+        """Transfers tokens to multiple recipients [(recipient-id, amount)] with a single delta commit, whose giveTo tree carries the
+        updated counters of all recipients. The total amount is checked against a single balance computation.
+        Returns (commit, author-id, total amount).
+        """
+        author_id, sign_args = self._signer(author_alias)
+        amounts = {} # {recipient-id: amount}, transfers to the same recipient are added up
+        for recipient_id, amount in transfers:
+            amounts[recipient_id] = amounts.get(recipient_id, 0) + self._check_amount(amount)
+        if not amounts:
+            raise OperationError("No transfers specified")
+        total = sum(amounts.values())
+        self._check_token(token_type)
+
+        if self._balance(token_type, author_id) < total:
+            raise OperationError("The account has an insufficient number of tokens to transfer.", code=2)
+        checkpoint = self._checkpoint(token_type, author_id)
+        state = checkpoint.state
+
+        # the new giveTo tree contains the full giveTo map of the checkpoint with the updated counters of the recipients
+        reader, writer = self.repo.reader, self.repo.writer
+        give_to = {recipient_id: state.give_to.get(recipient_id, 0) + amount for recipient_id, amount in amounts.items()}
+        give_to_entry = reader.tree(reader.commit(checkpoint.commit).tree).get("giveTo")
+        tree = writer.tree({"giveTo": update_counter_map(reader, writer, give_to_entry, give_to, self.ledger.map_encoding)})
+
+        parents = self._frontier_parents(token_type, author_id)
+        debug_message = "\n".join(f"giveTo({token_type}/{author_id}, {amount}, {recipient_id})" for recipient_id, amount in amounts.items())
+        commit = self._commit(token_type, author_id, sign_args, tree, parents, debug_message)
+        return commit, author_id, total
+
+    def ack_from(self, token_type, sender_id, author_alias=None):
+        author_id, sign_args = self._signer(author_alias)
+        self._check_token(token_type)
+
+        ack_from = self._checkpoint_state(token_type, author_id).ack_from.get(sender_id)
+        give_to = self._checkpoint_state(token_type, sender_id).give_to.get(author_id)
+
+        unacked = 0
+        if give_to is not None:
+            unacked = give_to - (ack_from or 0)
+        if unacked == 0:
+            raise OperationError(f"All received tokens from '{sender_id}' are currently acknowledged", code=2)
+
+        writer = self.repo.writer
+        new_ack_from = give_to if ack_from is None else max(give_to, ack_from)
+        tree = writer.tree({"ackFrom": writer.counter_map({sender_id: new_ack_from}, self.ledger.map_encoding)})
+
+        sender_frontier = self.repo.ref(f"refs/heads/frontier/{token_type}/{sender_id}")
+        if sender_frontier is None:
+            raise OperationError(f"Unknown frontier of the sender '{sender_id}'")
+        parents = [self.repo.ref(f"refs/heads/frontier/{token_type}/{author_id}") or token_type]
+        if sender_frontier not in parents: # git commit-tree ignores duplicate parents (acknowledgement of an own transfer)
+            parents.append(sender_frontier)
+        commit = self._commit(token_type, author_id, sign_args, tree, parents, f"ackFrom({token_type}/{author_id}, {token_type}/{sender_id})")
+        return commit, f"Acknowledged {unacked} tokens of type '{token_type}' received from '{sender_id}'"
+
+    def ack_from_all(self, token_type, author_alias=None):
+        """Acknowledges the unacknowledged tokens of all senders with a single delta commit, whose ackFrom tree carries the updated counters
+        of all senders and whose parents are the own frontier and the frontiers of all senders (octopus commit).
+        Returns (commit, author-id, total amount, number of senders).
+        """
+        author_id, sign_args = self._signer(author_alias)
+        self._check_token(token_type)
+        own_ack_from = self._checkpoint_state(token_type, author_id).ack_from
+
+        acks = {} # {sender-id: (new ackFrom counter, unacknowledged amount)}
+        sender_frontiers = []
+        with trace.span("pending"):
+            self.ledger.recipient_index.update()
+            pending = self.ledger.recipient_index.pending(author_id, token_type)
+        for transfer in pending:
+            sender_id = transfer.sender_id
+            sender_frontier = self.repo.ref(f"refs/heads/frontier/{token_type}/{sender_id}")
+            ack_from = own_ack_from.get(sender_id, 0)
+            # the recipient index is only used to find the senders, the amount is taken from the verified checkpoint of the sender (as in ack_from)
+            give_to = self._checkpoint_state(token_type, sender_id).give_to.get(author_id)
+            if give_to is None or give_to <= ack_from:
+                continue
+            acks[sender_id] = (give_to, give_to - ack_from)
+            sender_frontiers.append(sender_frontier)
+        if not acks:
+            raise OperationError(f"All received tokens of type '{token_type}' are currently acknowledged", code=2)
+
+        writer = self.repo.writer
+        ack_from = {sender_id: value for sender_id, (value, _) in acks.items()}
+        tree = writer.tree({"ackFrom": writer.counter_map(ack_from, self.ledger.map_encoding)})
+
+        parents = [self.repo.ref(f"refs/heads/frontier/{token_type}/{author_id}") or token_type]
+        for sender_frontier in sender_frontiers:
+            if sender_frontier not in parents: # git commit-tree ignores duplicate parents (acknowledgement of an own transfer)
+                parents.append(sender_frontier)
+        debug_message = "\n".join(f"ackFrom({token_type}/{author_id}, {token_type}/{sender_id})" for sender_id in acks)
+        commit = self._commit(token_type, author_id, sign_args, tree, parents, debug_message)
+        return commit, author_id, sum(unacked for _, unacked in acks.values()), len(acks)
+
+    def balance(self, token_type, author_alias=None, author_id=None):
+        if author_id is None:
+            author_id = self._signer(author_alias)[0]
+        try:
+            return self.ledger.balance(token_type, author_id)
+        except CheckpointError as e:
+            raise OperationError(f"Error while creating checkpoint: {e}")
+
+    def _frontier_parents(self, token_type, author_id):
+        frontier = self.repo.ref(f"refs/heads/frontier/{token_type}/{author_id}")
+        if frontier is None:
+            raise OperationError(f"The account '{author_id}' has no frontier for token '{token_type}'")
+        return [frontier]
+
+    def _commit(self, token_type, author_id, sign_args, tree, parents, debug_message):
+        message = debug_message if self._debug else ""
+        args = ["commit-tree", tree, *sign_args]
+        for parent in parents:
+            args += ["-p", parent]
+        env = {"GIT_COMMITTER_NAME": author_id, "GIT_AUTHOR_NAME": author_id, "GIT_COMMITTER_EMAIL": "", "GIT_AUTHOR_EMAIL": ""}
+        with trace.span("sign"):
+            try:
+                commit = self.repo.git(*args, input=f"{message}\n".encode(), env=env).stdout.decode().strip()
+            except GitError as e:
+                raise OperationError(str(e))
+            trace.count("objects")
+
+        # the frontier is only advanced if it wasn't changed concurrently
+        frontier_ref = f"refs/heads/frontier/{token_type}/{author_id}"
+        with trace.span("update-ref"):
+            if not self.repo.update_ref(frontier_ref, commit, old=self.repo.ref(frontier_ref) or ZERO_OID):
+                raise OperationError(f"The frontier '{frontier_ref}' was updated concurrently")
+        return commit
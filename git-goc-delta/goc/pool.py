@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import time
+
+from .checkpoint import CheckpointError, Ledger
+from .repo import GitError
+
+# ledger of the current worker process, every worker uses its own `git cat-file --batch` reader
+_worker_ledger = None
+
+
+class CheckpointTiming():
+
+    def __init__(self, token_type, author_id, commit, seconds, error=None):
+        self.token_type = token_type
+        self.author_id = author_id
+        self.commit = commit
+        self.seconds = seconds
+        self.error = error
+
+
+def _init_worker(repo_path):
+    global _worker_ledger
+    _worker_ledger = Ledger(repo_path)
+    _worker_ledger.repo.begin_ref_transaction() # the checkpoint references are updated by the parent process
+
+
+def _timed_checkpoint(ledger, token_type, author_id):
+    start = time.perf_counter()
+    commit = None
+    error = None
+    try:
+        commit = ledger.checkpoint(token_type, author_id).commit
+    except (CheckpointError, GitError) as e:
+        error = str(e)
+    return CheckpointTiming(token_type, author_id, commit, time.perf_counter() - start, error)
+
+
+def _checkpoint_task(account):
+    timing = _timed_checkpoint(_worker_ledger, *account)
+    return timing, _worker_ledger.repo.take_ref_updates()
+
+
+def checkpoint_all(repo_path, accounts=None, token_type=None, jobs=None):
+    """Computes the checkpoints of multiple accounts in parallel and returns a CheckpointTiming for every account (in order of completion).
+
+    Checkpoints of different accounts are independent, they only share read-only lookups in the logs of the senders.
+    The workers only write objects, the checkpoint references are collected and updated by this process in a single transaction.
+    Each update is conditional on the checkpoint the worker started from, an account whose checkpoint was updated concurrently keeps the other checkpoint.
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    ledger = Ledger(repo_path)
+    try:
+        if accounts is None:
+            accounts = ledger.accounts(token_type)
+        accounts = list(accounts)
+
+        if jobs <= 1 or len(accounts) <= 1:
+            with ledger.repo.ref_transaction():
+                return [_timed_checkpoint(ledger, *account) for account in accounts]
+
+        timings = []
+        updates = []
+        with multiprocessing.Pool(min(jobs, len(accounts)), initializer=_init_worker, initargs=(repo_path,)) as pool:
+            for timing, ref_updates in pool.imap_unordered(_checkpoint_task, accounts):
+                timings.append(timing)
+                updates.extend(ref_updates)
+        ledger.repo.apply_ref_updates(updates)
+        return timings
+    finally:
+        ledger.close()
@@ -0,0 +1,109 @@
+import os
+import sqlite3
+
+
+class IncomingTransfer():
+
+    def __init__(self, token_type, sender_id, give_to, ack_from, commit):
+        self.token_type = token_type
+        self.sender_id = sender_id
+        self.give_to = give_to # latest giveTo counter of the sender for the recipient
+        self.ack_from = ack_from # latest ackFrom counter of the recipient for the sender
+        self.commit = commit # commit of the sender that set the giveTo counter
+
+    @property
+    def pending(self):
+        return self.give_to - self.ack_from
+
+
+class RecipientIndex():
+    """Reverse index of the giveTo counters in .git/recipient_index.sqlite, keyed by (token type, recipient, sender).
+
+    For every indexed account, the index stores the frontier tip up to which its log was read. When a frontier advances (e.g. after a
+    fast-forward of repo-merge or a local operation), only the new commits of its first-parent log are read: their giveTo entries update the
+    incoming counters of the recipients, their ackFrom entries the acknowledged counters of the author. The counters are stored as text,
+    because token amounts may exceed 64 bit integers.
+    """
+
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.repo = ledger.repo
+        self.path = os.path.join(self.repo.git_dir, "recipient_index.sqlite")
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS incoming (token TEXT, recipient TEXT, sender TEXT, give_to TEXT, give_to_commit TEXT, "
+                                   "ack_from TEXT, PRIMARY KEY (token, recipient, sender))")
+                self._conn.execute("CREATE TABLE IF NOT EXISTS tips (token TEXT, author TEXT, tip TEXT, PRIMARY KEY (token, author))")
+        return self._conn
+
+    def update(self):
+        """Reads the new commits of all frontier references that advanced since the last update. Returns the number of updated accounts"""
+        tips = {(token_type, author_id): tip for token_type, author_id, tip in self.conn.execute("SELECT token, author, tip FROM tips")}
+        updated = 0
+        with self.conn:
+            for ref, frontier in self.repo.refs_with_prefix("refs/heads/frontier/").items():
+                token_type, author_id = ref.split("/")[-2:]
+                tip = tips.get((token_type, author_id))
+                if tip == frontier:
+                    continue
+                new_commits = self.repo.first_parent_log(frontier, stop=tip) if tip is not None else None
+                if new_commits is None: # new account, or the indexed log is not part of the frontier anymore
+                    self._reset(token_type, author_id)
+                    new_commits = self.repo.first_parent_log(frontier)
+                for commit in reversed(new_commits):
+                    self._index_commit(token_type, author_id, commit)
+                self.conn.execute("INSERT OR REPLACE INTO tips VALUES (?, ?, ?)", (token_type, author_id, frontier))
+                updated += 1
+        return updated
+
+    def _reset(self, token_type, author_id):
+        # removes all counters read from the log of the account
+        self.conn.execute("UPDATE incoming SET give_to = '0', give_to_commit = NULL WHERE token = ? AND sender = ?", (token_type, author_id))
+        self.conn.execute("UPDATE incoming SET ack_from = '0' WHERE token = ? AND recipient = ?", (token_type, author_id))
+
+    def _index_commit(self, token_type, author_id, commit):
+        if not self.repo.reader.commit(commit).parents:
+            return # the root commit of the token type
+        state = self.ledger.read_state(commit)
+        for recipient_id, amount in state.give_to.items():
+            row = self._row(token_type, recipient_id, author_id)
+            if row is None:
+                self.conn.execute("INSERT INTO incoming VALUES (?, ?, ?, ?, ?, '0')", (token_type, recipient_id, author_id, str(amount), commit))
+            elif amount > int(row[0]):
+                self.conn.execute("UPDATE incoming SET give_to = ?, give_to_commit = ? WHERE token = ? AND recipient = ? AND sender = ?",
+                                  (str(amount), commit, token_type, recipient_id, author_id))
+        for sender_id, amount in state.ack_from.items():
+            row = self._row(token_type, author_id, sender_id)
+            if row is None:
+                self.conn.execute("INSERT INTO incoming VALUES (?, ?, ?, '0', NULL, ?)", (token_type, author_id, sender_id, str(amount)))
+            elif amount > int(row[1]):
+                self.conn.execute("UPDATE incoming SET ack_from = ? WHERE token = ? AND recipient = ? AND sender = ?",
+                                  (str(amount), token_type, author_id, sender_id))
+
+    def _row(self, token_type, recipient_id, sender_id):
+        return self.conn.execute("SELECT give_to, ack_from FROM incoming WHERE token = ? AND recipient = ? AND sender = ?",
+                                 (token_type, recipient_id, sender_id)).fetchone()
+
+    def pending(self, recipient_id, token_type=None):
+        """Returns the IncomingTransfer of every sender with unacknowledged tokens for the recipient, optionally restricted to a single token type"""
+        query = "SELECT token, sender, give_to, ack_from, give_to_commit FROM incoming WHERE recipient = ?"
+        params = (recipient_id,)
+        if token_type is not None:
+            query += " AND token = ?"
+            params += (token_type,)
+        transfers = []
+        for token, sender_id, give_to, ack_from, commit in self.conn.execute(query + " ORDER BY token, sender", params):
+            transfer = IncomingTransfer(token, sender_id, int(give_to), int(ack_from), commit)
+            if transfer.pending > 0:
+                transfers.append(transfer)
+        return transfers
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,137 @@
+import os
+import subprocess
+from contextlib import contextmanager
+
+from . import trace
+from .objects import ObjectReader, ObjectWriter
+
+ZERO_OID = "0" * 40
+
+
+class GitError(Exception):
+    pass
+
+
+class Repository():
+    """Author repository of the Delta-GOC-Ledger, bundling the object reader/writer and a snapshot of the references"""
+
+    def __init__(self, repo_path):
+        if not os.path.isdir(repo_path):
+            raise GitError(f"Invalid repo path '{repo_path}'")
+        self.path = repo_path
+        self.git_dir = os.path.join(repo_path, ".git")
+        self.reader = ObjectReader(repo_path)
+        self.writer = ObjectWriter(self.git_dir)
+        self._refs = None
+        self._pending_ref_updates = None
+
+    def git(self, *args, input=None, env=None, check=True):
+        cmd_env = None
+        if env:
+            cmd_env = dict(os.environ, **env)
+        trace.count("git")
+        process = subprocess.run(["git", *args], cwd=self.path, input=input, env=cmd_env,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if check and process.returncode != 0:
+            raise GitError(process.stderr.decode().strip())
+        return process
+
+    def config(self, name):
+        process = self.git("config", name, check=False)
+        return process.stdout.decode().strip()
+
+    # references
+
+    @property
+    def refs(self):
+        # all references are read with a single `git for-each-ref` and kept until refresh() is called
+        if self._refs is None:
+            output = self.git("for-each-ref", "--format=%(objectname) %(refname)").stdout.decode()
+            self._refs = {}
+            for line in output.splitlines():
+                sha, name = line.split(" ", 1)
+                self._refs[name] = sha
+        return self._refs
+
+    def ref(self, name):
+        return self.refs.get(name)
+
+    def refs_with_prefix(self, prefix):
+        return {name: sha for name, sha in self.refs.items() if name.startswith(prefix)}
+
+    def update_ref(self, name, sha, old=None):
+        """Updates the reference. If `old` is given (ZERO_OID for a new reference), the reference is only updated if it still points to `old`.
+        Returns False if a concurrent update of the reference won the race.
+        """
+        if self._pending_ref_updates is not None:
+            self._pending_ref_updates.append((name, sha, old))
+            if self._refs is not None:
+                self._refs[name] = sha
+            return True
+        return self._update_ref_now(name, sha, old)
+
+    def _update_ref_now(self, name, sha, old):
+        args = [name, sha] if old is None else [name, sha, old]
+        if self.git("update-ref", *args, check=False).returncode != 0:
+            self._refs = None # re-read the references, since they were changed concurrently
+            return False
+        if self._refs is not None:
+            self._refs[name] = sha
+        return True
+
+    def apply_ref_updates(self, updates):
+        """Applies the given updates [(name, sha, old)] with a single `git update-ref --stdin` transaction.
+        If the transaction fails because of a concurrent update, the updates are applied one by one and updates that lost the race are skipped.
+        Returns the number of applied updates.
+        """
+        if not updates:
+            return 0
+        stdin = "".join(f"update {name} {sha} {old or ''}\n" for name, sha, old in updates).encode()
+        if self.git("update-ref", "--stdin", input=stdin, check=False).returncode == 0:
+            return len(updates)
+        return sum(self._update_ref_now(name, sha, old) for name, sha, old in updates)
+
+    def begin_ref_transaction(self):
+        self._pending_ref_updates = []
+
+    def take_ref_updates(self):
+        """Returns and clears the reference updates collected since begin_ref_transaction()"""
+        updates, self._pending_ref_updates = self._pending_ref_updates, []
+        return updates
+
+    @contextmanager
+    def ref_transaction(self):
+        """Collects all reference updates and applies them with a single `git update-ref --stdin`"""
+        if self._pending_ref_updates is not None:
+            yield # already part of a transaction
+            return
+        self.begin_ref_transaction()
+        try:
+            yield
+        finally:
+            updates, self._pending_ref_updates = self._pending_ref_updates, None
+            self.apply_ref_updates(updates)
+
+    def refresh(self):
+        self._refs = None
+
+    # commit graph
+
+    def first_parent_log(self, sha, stop=None):
+        """Returns the first-parent history of the given commit (newest first), excluding `stop` and its ancestors.
+        Returns None if `stop` is not part of the first-parent history.
+        """
+        log = []
+        while sha is not None:
+            if sha == stop:
+                return log
+            log.append(sha)
+            parents = self.reader.commit(sha).parents
+            sha = parents[0] if parents else None
+        return None if stop is not None else log
+
+    def is_ancestor(self, ancestor, descendant):
+        return self.git("merge-base", "--is-ancestor", ancestor, descendant, check=False).returncode == 0
+
+    def close(self):
+        self.reader.close()
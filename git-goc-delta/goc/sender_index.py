@@ -0,0 +1,94 @@
+import bisect
+import json
+import os
+import tempfile
+
+
+class SenderLog():
+    """Index of the first-parent log of a single account (token type + sender).
+
+    For every recipient, the index stores the monotone sequence of (position, giveTo amount) pairs of the commits that increased the
+    giveTo counter of this recipient. Since the log is linear, whether a commit of the log includes a giveTo amount larger or equal
+    to an acknowledged amount reduces to a binary search and a comparison of log positions.
+    """
+
+    def __init__(self, chain=None, give_to=None):
+        self.chain = chain if chain is not None else [] # commits of the first-parent log, oldest first
+        self.give_to = give_to if give_to is not None else {} # {recipient: [[position, amount], ...]}, strictly increasing amounts
+        self.positions = {commit: pos for pos, commit in enumerate(self.chain)}
+
+    @property
+    def tip(self):
+        return self.chain[-1] if self.chain else None
+
+    def append(self, commit, give_to):
+        pos = len(self.chain)
+        self.chain.append(commit)
+        self.positions[commit] = pos
+        for recipient, amount in give_to.items():
+            entries = self.give_to.setdefault(recipient, [])
+            if not entries or amount > entries[-1][1]:
+                entries.append([pos, amount])
+
+    def position(self, commit):
+        return self.positions.get(commit)
+
+    def includes_give_to(self, recipient, amount, position):
+        """Whether a commit at or before the given log position has a giveTo counter for the recipient of at least the given amount"""
+        entries = self.give_to.get(recipient)
+        if not entries:
+            return False
+        i = bisect.bisect_left(entries, amount, key=lambda entry: entry[1]) # first state that gave at least the amount
+        return i < len(entries) and entries[i][0] <= position
+
+
+class SenderIndex():
+    """Persistent SenderLog store in .git/sender_index/<token type>/<sender-id>, updated incrementally when the frontier of the sender advances"""
+
+    def __init__(self, repo):
+        self.repo = repo
+        self.index_dir = os.path.join(repo.git_dir, "sender_index")
+        self._logs = {}
+
+    def _path(self, token_type, sender_id):
+        return os.path.join(self.index_dir, token_type, sender_id)
+
+    def _load(self, token_type, sender_id):
+        try:
+            with open(self._path(token_type, sender_id)) as f:
+                data = json.load(f)
+            return SenderLog(data["chain"], data["giveTo"])
+        except (OSError, ValueError, KeyError):
+            return SenderLog()
+
+    def _save(self, token_type, sender_id, log):
+        path = self._path(token_type, sender_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix="tmp_")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"chain": log.chain, "giveTo": log.give_to}, f, separators=(",", ":"))
+        os.replace(tmp_path, path) # atomic, concurrent writers can only replace the index with another valid index
+
+    def get(self, token_type, sender_id, frontier):
+        """Returns the index of the sender's log, updated to the given frontier commit"""
+        key = (token_type, sender_id)
+        log = self._logs.get(key)
+        if log is None:
+            log = self._load(token_type, sender_id)
+        if frontier not in log.positions: # the sender's frontier advanced since the last update
+            new_commits = self.repo.first_parent_log(frontier, stop=log.tip)
+            if new_commits is None: # the indexed log is not part of the frontier anymore, rebuild the index
+                log = SenderLog()
+                new_commits = self.repo.first_parent_log(frontier)
+            for commit in reversed(new_commits):
+                log.append(commit, self._give_to(commit))
+            self._save(token_type, sender_id, log)
+        self._logs[key] = log
+        return log
+
+    def _give_to(self, commit):
+        reader = self.repo.reader
+        tree = reader.tree(reader.commit(commit).tree)
+        if "giveTo" not in tree:
+            return {}
+        return reader.counter_map(tree["giveTo"])
@@ -0,0 +1,135 @@
+import base64
+import binascii
+import hashlib
+import os
+import sqlite3
+import struct
+
+KEY_TYPE = "ssh-ed25519"
+
+
+def decode_pubkey(author_id):
+    return author_id.replace("%2F", "/")
+
+
+def key_fingerprint(pubkey, key_type=KEY_TYPE):
+    """Returns the SHA256 fingerprint of the public key (as printed by `ssh-keygen -l`), or None if it is not a valid key of the given type"""
+    try:
+        blob = base64.b64decode(pubkey, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+
+    # the key blob starts with the key type, an ed25519 key is followed by the 32 byte public key
+    fields = []
+    pos = 0
+    while pos < len(blob):
+        if pos + 4 > len(blob):
+            return None
+        (length,) = struct.unpack(">I", blob[pos:pos + 4])
+        fields.append(blob[pos + 4:pos + 4 + length])
+        pos += 4 + length
+    if pos != len(blob) or not fields or fields[0].decode(errors="replace") != key_type:
+        return None
+    if key_type == KEY_TYPE and (len(fields) != 2 or len(fields[1]) != 32):
+        return None
+    return "SHA256:" + base64.b64encode(hashlib.sha256(blob).digest()).decode().rstrip("=")
+
+
+class AllowedSigners():
+    """Index of the allowed signers file and of the SHA256 fingerprints of public keys, stored in .git/signers.sqlite.
+
+    .git/allowed_signers stays the file used by `git verify-commit`, the index only answers whether a key is already allowed without
+    scanning the file. It records the size and modification time of the file it was built from and is rebuilt if another program
+    changed the file. Fingerprints are computed once per key and kept for the lifetime of the repository.
+    """
+
+    def __init__(self, git_dir):
+        self.path = os.path.join(git_dir, "signers.sqlite")
+        self.allowed_signers_path = os.path.join(git_dir, "allowed_signers")
+        self._conn = None
+        self._fingerprints = {} # {pubkey: fingerprint}, in-memory cache of the fingerprints table
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None) # transactions are started explicitly
+            self._conn.execute("CREATE TABLE IF NOT EXISTS allowed (pubkey TEXT PRIMARY KEY)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS fingerprints (pubkey TEXT PRIMARY KEY, fingerprint TEXT)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        return self._conn
+
+    def _file_version(self):
+        try:
+            stat = os.stat(self.allowed_signers_path)
+        except FileNotFoundError:
+            return "0:0"
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _sync(self):
+        # rebuilds the index, if the allowed signers file was changed since the index was updated the last time (must be called within a transaction)
+        version = self._file_version()
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'allowed_signers'").fetchone()
+        if row is not None and row[0] == version:
+            return
+
+        keys = set()
+        try:
+            with open(self.allowed_signers_path) as f:
+                for line in f:
+                    fields = line.split()
+                    if fields and not fields[0].startswith("#"):
+                        keys.add(fields[-1]) # "<principal> [options] <key type> <key>"
+        except FileNotFoundError:
+            pass
+        self.conn.execute("DELETE FROM allowed")
+        self.conn.executemany("INSERT OR IGNORE INTO allowed VALUES (?)", ((key,) for key in keys))
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('allowed_signers', ?)", (version,))
+
+    def is_allowed(self, pubkey):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._sync()
+            return self.conn.execute("SELECT 1 FROM allowed WHERE pubkey = ?", (pubkey,)).fetchone() is not None
+        finally:
+            self.conn.execute("COMMIT")
+
+    def add(self, pubkeys, key_type=KEY_TYPE):
+        """Adds the keys that are not yet allowed to the allowed signers file. Returns the number of added keys"""
+        self.conn.execute("BEGIN IMMEDIATE") # serializes concurrent updates of the file, e.g. by repo-merge and the pre-receive hook
+        try:
+            self._sync()
+            new_keys = []
+            for pubkey in pubkeys:
+                if pubkey and pubkey not in new_keys and self.conn.execute("SELECT 1 FROM allowed WHERE pubkey = ?", (pubkey,)).fetchone() is None:
+                    new_keys.append(pubkey)
+            if new_keys:
+                with open(self.allowed_signers_path, "a") as f:
+                    f.writelines(f'{pubkey}@goc namespaces="git" {key_type} {pubkey}\n' for pubkey in new_keys)
+                self.conn.executemany("INSERT INTO allowed VALUES (?)", ((pubkey,) for pubkey in new_keys))
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('allowed_signers', ?)", (self._file_version(),))
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return len(new_keys)
+
+    def fingerprint(self, pubkey, key_type=KEY_TYPE):
+        """Returns the SHA256 fingerprint of the public key, or None if the key is invalid"""
+        fingerprint = self._fingerprints.get(pubkey)
+        if fingerprint is not None:
+            return fingerprint
+        row = self.conn.execute("SELECT fingerprint FROM fingerprints WHERE pubkey = ?", (pubkey,)).fetchone()
+        if row is not None:
+            fingerprint = row[0]
+        else:
+            fingerprint = key_fingerprint(pubkey, key_type)
+            if fingerprint is None:
+                return None
+            self.conn.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?)", (pubkey, fingerprint))
+        self._fingerprints[pubkey] = fingerprint
+        return fingerprint
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
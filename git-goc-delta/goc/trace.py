@@ -0,0 +1,48 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+TRACE_FILE = os.environ.get("GOC_TRACE") # event file of the span events, tracing is disabled if unset
+DEPTH = os.environ.get("GOC_TRACE_DEPTH") # set by utility/trace of the script that started this process
+SPAWN_EVENTS = {"git": "g", "python3": "p", "objects": "o"} # characters of the events in <GOC_TRACE>.spawns
+
+_counters = {kind: 0 for kind in SPAWN_EVENTS}
+_spans = [] # [(script, phase)] of the open spans
+
+
+def count(kind, n=1):
+    """Records started processes ("git") or written objects ("objects") for the spans of this process and of the calling script"""
+    if not TRACE_FILE:
+        return
+    _counters[kind] += n
+    if DEPTH is not None: # the calling script reads the events of its children from the spawns file (see utility/trace)
+        with open(f"{TRACE_FILE}.spawns", "a") as f:
+            f.write(SPAWN_EVENTS[kind] * n)
+
+
+@contextmanager
+def span(phase, script=None):
+    """Appends a span event of the enclosed code to GOC_TRACE, in the format of utility/trace.
+
+    Nested spans inherit the script of the enclosing span and are named by their path (e.g. "checkpoint/merge/verify").
+    """
+    if not TRACE_FILE:
+        yield
+        return
+    if _spans:
+        script = script or _spans[-1][0]
+        phase = f"{_spans[-1][1]}/{phase}" if _spans[-1][1] != "total" else phase
+    script = script or "goc"
+
+    _spans.append((script, phase))
+    start = time.perf_counter()
+    counters = dict(_counters)
+    try:
+        yield
+    finally:
+        _spans.pop()
+        event = {"script": script, "phase": phase, "depth": int(DEPTH or 0), "pid": os.getpid(), "seconds": round(time.perf_counter() - start, 6),
+                 **{kind: _counters[kind] - counters[kind] for kind in SPAWN_EVENTS}}
+        with open(TRACE_FILE, "a") as f:
+            f.write(json.dumps(event) + "\n")
@@ -0,0 +1,89 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from goc import Ledger, Operations
+from goc.repo import ZERO_OID
+
+
+class LedgerTestCase(unittest.TestCase):
+    """Single repository with the accounts of several authors, whose keys are stored in .git/keys/<alias> (as in the evaluation).
+
+    Operations are performed in-process and signed by `git commit-tree`; forge() writes unsigned commits, which the checkpoint
+    computation accepts like signed ones, to build histories that the operations refuse to create.
+    """
+
+    AUTHORS = ("alice", "bob", "carol")
+    MAP_ENCODING = None # goc.mapEncoding of the repository
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.repo_path = tmp_dir.name
+        self.git("init", "-q")
+        self.git("config", "gpg.format", "ssh")
+        if self.MAP_ENCODING is not None:
+            self.git("config", "goc.mapEncoding", self.MAP_ENCODING)
+
+        git_dir = os.path.join(self.repo_path, ".git")
+        os.makedirs(os.path.join(git_dir, "keys"))
+        os.makedirs(os.path.join(git_dir, "alias_lookup"))
+        self.ids = {}
+        for alias in self.AUTHORS:
+            key_path = os.path.join(git_dir, "keys", alias)
+            subprocess.run(["ssh-keygen", "-t", "ed25519", "-q", "-f", key_path, "-N", "", "-C", alias], check=True)
+            with open(f"{key_path}.pub") as f:
+                author_id = f.read().split()[1].replace("/", "%2F")
+            with open(os.path.join(git_dir, "alias_lookup", alias), "w") as f:
+                f.write(f"{author_id}\n")
+            self.ids[alias] = author_id
+
+        self.ledger = self.open_ledger()
+        self.ops = Operations(self.ledger)
+        self.token = self.init_token("alice", "test-token")
+
+    def git(self, *args):
+        return subprocess.run(["git", *args], cwd=self.repo_path, check=True, capture_output=True).stdout.decode().strip()
+
+    def open_ledger(self):
+        ledger = Ledger(self.repo_path)
+        self.addCleanup(ledger.close)
+        return ledger
+
+    @property
+    def repo(self):
+        return self.ledger.repo
+
+    def init_token(self, alias, token_alias):
+        writer = self.repo.writer
+        token = writer.commit(writer.tree({}), [], self.ids[alias], token_alias)
+        self.repo.update_ref(f"refs/heads/frontier/{token}/{self.ids[alias]}", token, old=ZERO_OID)
+        return token
+
+    def frontier(self, alias):
+        return self.repo.ref(f"refs/heads/frontier/{self.token}/{self.ids[alias]}")
+
+    def create(self, alias, amount):
+        return self.ops.create(self.token, amount, alias)[0]
+
+    def give_to(self, alias, recipient, amount):
+        return self.ops.give_to(self.token, self.ids[recipient], amount, alias)[0]
+
+    def ack_from(self, alias, sender):
+        return self.ops.ack_from(self.token, self.ids[sender], alias)[0]
+
+    def balance(self, alias):
+        return self.ledger.balance(self.token, self.ids[alias])
+
+    def forge(self, alias, maps, parents):
+        """Writes an unsigned delta commit of the given account, whose tree contains the given maps {"giveTo"|"ackFrom": {alias: counter}}
+        (or any other TreeEntry), and advances its frontier to it
+        """
+        writer = self.repo.writer
+        tree = writer.tree({name: writer.counter_map({self.ids[a]: value for a, value in counters.items()}) if isinstance(counters, dict) else counters
+                            for name, counters in maps.items()})
+        commit = writer.commit(tree, parents, self.ids[alias], "")
+        self.repo.update_ref(f"refs/heads/frontier/{self.token}/{self.ids[alias]}", commit)
+        return commit
+
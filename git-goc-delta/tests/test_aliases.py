@@ -0,0 +1,44 @@
+import unittest
+
+from goc.aliases import AUTHOR, TOKEN, AliasTable
+
+from .helpers import LedgerTestCase
+
+
+class AliasTableTest(LedgerTestCase):
+    """The alias table is rebuilt from the alias lookup files and token alias references, appended lines override earlier aliases"""
+
+    def setUp(self):
+        super().setUp()
+        self.git("update-ref", "refs/local/token_alias/test-token", self.token)
+        self.table = AliasTable(self.repo.git_dir)
+
+    def test_rebuild(self):
+        self.assertIsNone(self.table.author_id("alice"))
+        self.assertEqual(self.table.rebuild(self.repo), len(self.AUTHORS) + 1)
+        for alias in self.AUTHORS:
+            self.assertEqual(self.table.author_id(alias), self.ids[alias])
+            self.assertEqual(self.table.author_alias(self.ids[alias]), alias)
+        self.assertEqual(self.table.token_id("test-token"), self.token)
+        self.assertEqual(self.table.token_alias(self.token), "test-token")
+
+    def test_appended_alias(self):
+        self.table.rebuild(self.repo)
+        self.assertEqual(self.table.author_id("alice"), self.ids["alice"])
+
+        other = AliasTable(self.repo.git_dir) # e.g. another process registering an alias
+        other.add(AUTHOR, "alice", self.ids["bob"])
+        other.add(TOKEN, "other-token", "0" * 40)
+        self.assertEqual(self.table.author_id("alice"), self.ids["bob"])
+        self.assertIsNone(self.table.author_alias(self.ids["alice"]))
+        self.assertEqual(self.table.token_id("other-token"), "0" * 40)
+
+    def test_incomplete_line(self):
+        with open(self.table.path, "w") as f:
+            f.write(f"{AUTHOR}\tcarol\t{self.ids['carol']}\n{AUTHOR}\tdave")
+        self.assertEqual(self.table.author_id("carol"), self.ids["carol"])
+        self.assertIsNone(self.table.author_id("dave"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import sqlite3
+import unittest
+
+from .helpers import LedgerTestCase
+
+
+class BalanceCacheTest(LedgerTestCase):
+    """Cached balances are keyed by the frontier tip of the account and are only answered as long as the frontier does not change"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+
+    def cached(self, alias):
+        return self.ledger.balance_cache.get(self.token, self.ids[alias], self.frontier(alias))
+
+    def test_balance_is_cached_by_frontier(self):
+        self.assertEqual(self.balance("alice"), 100)
+        self.assertEqual(self.cached("alice"), 100)
+        old_tip = self.frontier("alice")
+
+        self.give_to("alice", "bob", 30)
+        self.assertIsNone(self.cached("alice"))
+        self.assertEqual(self.balance("alice"), 70)
+        self.assertEqual(self.cached("alice"), 70)
+        self.assertIsNone(self.ledger.balance_cache.get(self.token, self.ids["alice"], old_tip))
+
+    def test_invalidate(self):
+        self.create("bob", 5)
+        self.assertEqual(self.balance("alice"), 100)
+        self.assertEqual(self.balance("bob"), 5)
+
+        # the frontier changes behind the back of the ledger, e.g. by the fast-forward of repo-merge
+        self.forge("alice", {"giveTo": {"bob": 1}}, [self.frontier("alice")])
+        self.assertEqual(self.ledger.balance_cache.invalidate(self.repo.refs_with_prefix("refs/heads/frontier/")), 1)
+        self.assertIsNone(self.cached("alice"))
+        self.assertEqual(self.cached("bob"), 5)
+
+        ledger = self.open_ledger()
+        self.assertEqual(ledger.balance(self.token, self.ids["alice"]), 99)
+
+    def test_schema_of_earlier_versions(self):
+        self.ledger.balance_cache.close()
+        conn = sqlite3.connect(self.ledger.balance_cache.path)
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS balances")
+            conn.execute("CREATE TABLE balances (token TEXT, author TEXT, tip TEXT, checkpoint TEXT, balance TEXT, PRIMARY KEY (token, author))")
+        conn.close()
+
+        ledger = self.open_ledger()
+        self.assertEqual(ledger.balance(self.token, self.ids["alice"]), 100)
+        self.assertEqual(ledger.balance_cache.get(self.token, self.ids["alice"], self.frontier("alice")), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
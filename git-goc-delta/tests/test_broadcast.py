@@ -0,0 +1,50 @@
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from goc import broadcast
+
+
+class BroadcastTest(unittest.TestCase):
+    """Failed pushes are retried with exponential backoff, every remote gets its own result (repo-push itself is replaced by a mock)"""
+
+    def setUp(self):
+        patcher = mock.patch.object(broadcast.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bytes_sent(self):
+        stderr = b"Enumerating objects: 5, done.\nWriting objects:  50% (1/2)\rWriting objects: 100% (2/2), 1.50 KiB | 1.50 MiB/s, done.\n"
+        self.assertEqual(broadcast._bytes_sent(stderr), 1536)
+        self.assertEqual(broadcast._bytes_sent(b"Writing objects: 100% (1/1), 212 bytes | 212.00 KiB/s, done.\n"), 212)
+        self.assertEqual(broadcast._bytes_sent(b"Everything up-to-date\n"), 0)
+
+    def test_retries(self):
+        attempts = [(False, 0, "fatal: unreachable"), (False, 0, "Timeout after 1s"), (True, 100, None)]
+        with mock.patch.object(broadcast, "_push_once", side_effect=attempts) as push_once:
+            result = broadcast.push("/repo", "peer", timeout=1, retries=2, retry_delay=0.5, delta=True)
+        self.assertEqual((result.ok, result.attempts, result.bytes_sent, result.error), (True, 3, 100, None))
+        self.assertEqual([c.args for c in self.sleep.call_args_list], [(0.5,), (1.0,)])
+        push_once.assert_called_with("/repo", "peer", 1, True)
+
+    def test_give_up(self):
+        with mock.patch.object(broadcast, "_push_once", return_value=(False, 0, "fatal: unreachable")):
+            result = broadcast.push("/repo", "peer", retries=1, retry_delay=0)
+        self.assertEqual((result.ok, result.attempts, result.error), (False, 2, "fatal: unreachable"))
+
+    def test_broadcast(self):
+        with tempfile.TemporaryDirectory() as repo_path:
+            for args in (["init", "-q"], ["remote", "add", "up", "../up"], ["remote", "add", "down", "../down"], ["config", "goc.broadcast.retries", "1"]):
+                subprocess.run(["git", *args], cwd=repo_path, check=True)
+
+            def push_once(repo_path, remote, timeout, delta):
+                return (True, 10, None) if remote == "up" else (False, 0, "fatal: unreachable")
+            with mock.patch.object(broadcast, "_push_once", side_effect=push_once):
+                results = broadcast.broadcast(repo_path, jobs=2, retry_delay=0)
+        results = {result.remote: (result.ok, result.attempts) for result in results}
+        self.assertEqual(results, {"up": (True, 1), "down": (False, 2)})
+
+
+if __name__ == "__main__":
+    unittest.main()
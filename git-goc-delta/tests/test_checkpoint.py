@@ -0,0 +1,85 @@
+import unittest
+
+from goc import CheckpointError
+from goc.objects import blob_entry, tree_entry
+
+from .helpers import LedgerTestCase
+
+
+class AcknowledgementVerificationTest(LedgerTestCase):
+    """Acknowledged counters are verified against the giveTo counters in the log of the respective sender"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+        self.create("bob", 100)
+        self.create("carol", 100)
+
+    def test_ack_from_single_sender(self):
+        self.give_to("bob", "alice", 10)
+        self.ack_from("alice", "bob")
+        self.assertEqual(len(self.repo.reader.commit(self.frontier("alice")).parents), 2)
+        self.assertEqual(self.balance("alice"), 110)
+
+    def test_self_ack(self):
+        self.give_to("alice", "alice", 5)
+        self.ack_from("alice", "alice")
+        self.assertEqual(len(self.repo.reader.commit(self.frontier("alice")).parents), 1) # git commit-tree drops the duplicate parent
+        self.assertEqual(self.balance("alice"), 100)
+
+    def test_self_ack_with_one_other_sender(self):
+        # the own frontier is referenced once, so the acknowledgement of an own transfer and of a single other sender has two parents
+        self.give_to("alice", "alice", 5)
+        self.give_to("bob", "alice", 1)
+        self.ops.ack_from_all(self.token, "alice")
+        self.assertEqual(len(self.repo.reader.commit(self.frontier("alice")).parents), 2)
+        self.assertEqual(self.balance("alice"), 101)
+        self.assertEqual(self.ledger.checkpoint(self.token, self.ids["alice"]).state.ack_from, {self.ids["alice"]: 5, self.ids["bob"]: 1})
+
+    def test_self_ack_in_octopus_commit(self):
+        self.give_to("alice", "alice", 5)
+        self.give_to("bob", "alice", 7)
+        self.give_to("carol", "alice", 3)
+        self.ops.ack_from_all(self.token, "alice")
+        self.assertEqual(len(self.repo.reader.commit(self.frontier("alice")).parents), 3)
+        self.assertEqual(self.balance("alice"), 110)
+
+    def test_self_ack_is_not_verified_against_other_senders(self):
+        # bob gave alice enough tokens to cover the acknowledged counter, but alice only gave herself 5
+        self.give_to("alice", "alice", 5)
+        self.give_to("bob", "alice", 10)
+        self.forge("alice", {"ackFrom": {"alice": 8}}, [self.frontier("alice"), self.frontier("bob")])
+        with self.assertRaises(CheckpointError):
+            self.balance("alice")
+
+    def test_ack_from_is_not_verified_against_other_senders(self):
+        self.give_to("bob", "alice", 2)
+        self.give_to("carol", "alice", 10)
+        self.forge("alice", {"ackFrom": {"bob": 8}}, [self.frontier("alice"), self.frontier("bob"), self.frontier("carol")])
+        with self.assertRaises(CheckpointError):
+            self.balance("alice")
+
+    def test_ack_exceeding_give_to(self):
+        self.give_to("bob", "alice", 10)
+        self.forge("alice", {"ackFrom": {"bob": 11}}, [self.frontier("alice"), self.frontier("bob")])
+        with self.assertRaises(CheckpointError):
+            self.balance("alice")
+
+
+class InvalidObjectsTest(LedgerTestCase):
+    """Objects received from peers that are not valid ledger data are rejected with a CheckpointError"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+
+    def test_invalid_counter_blob(self):
+        writer = self.repo.writer
+        give_to = tree_entry(writer.tree({self.ids["bob"]: blob_entry(writer.write("blob", b"abc\n"))}))
+        self.forge("alice", {"giveTo": give_to}, [self.frontier("alice")])
+        with self.assertRaises(CheckpointError):
+            self.balance("alice")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import unittest
+
+from goc.checkpoint import STALE_CHECKPOINTS
+from goc.compaction import CheckpointPolicy, compact, prune_checkpoints
+
+from .helpers import LedgerTestCase
+
+
+class CompactTest(LedgerTestCase):
+    """A checkpoint is only updated once the policy says it is due"""
+
+    def test_interval(self):
+        self.create("alice", 100)
+        self.give_to("alice", "bob", 10) # the balance check of the giveTo updates the checkpoint to the create
+        self.forge("alice", {"giveTo": {"bob": 15}}, [self.frontier("alice")])
+        account = (self.token, self.ids["alice"])
+
+        results = list(compact(self.ledger, CheckpointPolicy(interval=3), [account]))
+        self.assertEqual([(result.pending_commits, result.commit) for result in results], [(2, None)])
+
+        self.forge("alice", {"giveTo": {"bob": 20}}, [self.frontier("alice")])
+        results = list(compact(self.ledger, CheckpointPolicy(interval=3), [account]))
+        self.assertEqual(results[0].pending_commits, 3)
+        self.assertEqual(results[0].commit, self.repo.ref(f"refs/local/checkpoint/{self.token}/{self.ids['alice']}"))
+        self.assertEqual(self.balance("alice"), 80)
+
+        results = list(compact(self.ledger, CheckpointPolicy(interval=1), [account]))
+        self.assertEqual([(result.pending_commits, result.commit) for result in results], [(0, None)])
+
+
+class PruneCheckpointsTest(LedgerTestCase):
+    """Only the unreachable objects of superseded checkpoints are removed, objects shared with reachable commits are kept"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+        self.give_to("alice", "bob", 10) # the balance check of every giveTo updates the checkpoint
+        self.latest = self.ledger.checkpoint(self.token, self.ids["alice"]).commit
+        self.stale_path = os.path.join(self.repo.git_dir, STALE_CHECKPOINTS)
+        self.stale = self.stale_checkpoints()
+
+    def exists(self, sha):
+        return subprocess.run(["git", "cat-file", "-e", sha], cwd=self.repo_path).returncode == 0
+
+    def stale_checkpoints(self):
+        with open(self.stale_path) as f:
+            return f.read().split()
+
+    def assert_connected(self):
+        missing = [line for line in self.git("rev-list", "--objects", "--all", "--missing=print").splitlines() if line.startswith("?")]
+        self.assertEqual(missing, [])
+        self.assertEqual(self.open_ledger().balance(self.token, self.ids["alice"]), 90)
+
+    def test_prune(self):
+        self.assertTrue(self.stale)
+        self.assertNotIn(self.latest, self.stale)
+        report = prune_checkpoints(self.repo, expire=0)
+        self.assertEqual(report.checkpoints, len(self.stale))
+        self.assertGreater(report.objects, 0)
+        self.assertFalse(any(self.exists(commit) for commit in self.stale))
+        self.assertTrue(self.exists(self.latest))
+        self.assertFalse(os.path.exists(self.stale_path))
+        self.assert_connected()
+
+    def test_expire(self):
+        report = prune_checkpoints(self.repo)
+        self.assertEqual((report.objects, report.checkpoints), (0, len(self.stale)))
+        self.assertGreater(report.kept, 0)
+        self.assertTrue(all(self.exists(commit) for commit in self.stale))
+        self.assertEqual(self.stale_checkpoints(), self.stale) # inspected again by the next prune
+
+    def test_dry_run(self):
+        report = prune_checkpoints(self.repo, expire=0, dry_run=True)
+        self.assertGreater(report.objects, 0)
+        self.assertTrue(all(self.exists(commit) for commit in self.stale))
+        self.assertEqual(self.stale_checkpoints(), self.stale)
+        self.assertEqual(prune_checkpoints(self.repo, expire=0).objects, report.objects)
+        self.assertFalse(any(self.exists(commit) for commit in self.stale))
+
+    def test_referenced_checkpoint(self):
+        kept, *pruned = self.stale
+        self.git("update-ref", "refs/local/kept", kept)
+        report = prune_checkpoints(self.repo, expire=0)
+        self.assertEqual(report.checkpoints, len(pruned))
+        self.assertTrue(self.exists(kept))
+        self.assertFalse(any(self.exists(commit) for commit in pruned))
+        self.assert_connected()
+
+
+if __name__ == "__main__":
+    unittest.main()
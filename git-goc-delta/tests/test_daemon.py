@@ -0,0 +1,87 @@
+import os
+import threading
+import unittest
+
+from goc.daemon import DaemonClient, LedgerServer
+
+from .helpers import LedgerTestCase
+
+
+class DaemonTest(LedgerTestCase):
+    """The daemon dispatches the JSON requests of a client to the ledger operations and answers every request with a single JSON line"""
+
+    def setUp(self):
+        super().setUp()
+        self.socket_path = os.path.join(self.repo.git_dir, "goc.sock")
+        server = LedgerServer(self.repo_path, self.socket_path)
+        thread = threading.Thread(target=self.serve, args=(server,))
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.shutdown) # the client is closed first, as the connection is handled by the serving thread
+
+        self.client = DaemonClient(self.socket_path)
+        self.addCleanup(self.client.close)
+
+    def serve(self, server):
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close() # the balance cache can only be closed by the thread that used it
+
+    def request(self, op, **fields):
+        return self.client.request(op, token=self.token, **fields)
+
+    def test_operations(self):
+        response = self.request("create", amount=100, author_alias="alice")
+        self.assertTrue(response["ok"])
+        self.assertEqual(response["commit"], self.frontier("alice"))
+
+        self.assertTrue(self.request("giveTo", recipient_alias="bob", amount=30, author_alias="alice")["ok"])
+        self.assertTrue(self.request("giveTo", recipient=self.ids["carol"], amount=20, author_alias="alice")["ok"])
+        response = self.request("giveToMany", transfers=[{"recipient_alias": "bob", "amount": 5}, {"recipient_alias": "carol", "amount": 5}],
+                                author_alias="alice")
+        self.assertTrue(response["ok"])
+        self.assertIn("to 2 recipients", response["message"])
+        self.assertTrue(self.request("ackFrom", sender_alias="alice", author_alias="bob")["ok"])
+        response = self.request("ackFromAll", author_alias="carol")
+        self.assertTrue(response["ok"])
+        self.assertIn("from 1 senders", response["message"])
+        self.assertTrue(self.request("burn", amount=10, author_alias="bob")["ok"])
+
+        self.assertEqual(self.request("balance", author_alias="alice"), {"ok": True, "balance": 40})
+        self.assertEqual(self.request("balance", author_alias="alice", author=self.ids["bob"]), {"ok": True, "balance": 25})
+        self.assertEqual(self.request("balance", author_alias="carol")["balance"], 25)
+
+    def test_failed_operation(self):
+        self.request("create", amount=10, author_alias="alice")
+        response = self.request("giveTo", recipient_alias="bob", amount=11, author_alias="alice")
+        self.assertFalse(response["ok"])
+        self.assertNotEqual(response["code"], 0)
+        self.assertEqual(self.request("balance", author_alias="alice")["balance"], 10)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.request("mint", author_alias="alice")["error"], "Unknown operation 'mint'")
+        response = self.request("create", author_alias="alice") # missing amount
+        self.assertFalse(response["ok"])
+        self.assertTrue(response["error"].startswith("Invalid request"))
+
+        self.client.file.write(b"not json\n")
+        self.client.file.flush()
+        self.assertTrue(self.client.file.readline().startswith(b'{"ok": false'))
+        self.assertTrue(self.request("refresh")["ok"]) # the connection is still usable
+
+    def test_refresh(self):
+        self.request("create", amount=10, author_alias="bob")
+        self.forge("bob", {"giveTo": {"alice": 4}}, [self.frontier("bob")]) # by another process
+        self.assertEqual(self.request("balance", author_alias="bob")["balance"], 10) # the references are read once per connection
+        self.assertEqual(self.request("balance", author_alias="bob", refresh=True)["balance"], 6)
+
+        self.forge("bob", {"giveTo": {"alice": 5}}, [self.frontier("bob")])
+        self.client.close() # connections are handled one after another
+        self.client = DaemonClient(self.socket_path)
+        self.addCleanup(self.client.close)
+        self.assertEqual(self.request("balance", author_alias="bob")["balance"], 5) # the references are re-read at the start of every connection
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from goc.maintenance import MaintenancePolicy, RepositoryStats, maintain, probe
+
+from .helpers import LedgerTestCase
+
+
+class MaintenanceTest(LedgerTestCase):
+    """Maintenance packs references and reachable objects and writes the indexes, while the ledger keeps answering the same balances"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+        self.give_to("alice", "bob", 10)
+        self.ack_from("bob", "alice")
+        self.balance("bob")
+        self.repo.refresh()
+
+    def test_policy(self):
+        stats = RepositoryStats.read(self.repo)
+        self.assertGreater(stats.loose_objects, 0)
+        self.assertGreater(stats.loose_refs, 0)
+        self.assertEqual((stats.packs, stats.commit_graph, stats.multi_pack_index), (0, False, False))
+
+        self.assertFalse(MaintenancePolicy().enabled)
+        self.assertTrue(MaintenancePolicy(loose_objects=stats.loose_objects).due(stats))
+        self.assertFalse(MaintenancePolicy(loose_objects=stats.loose_objects + 1, packs=1).due(stats))
+        self.git("config", "goc.maintenance.looseRefs", str(stats.loose_refs))
+        self.assertTrue(MaintenancePolicy.from_config(self.repo).due(stats))
+
+    def test_maintain(self):
+        refs = self.git("for-each-ref")
+        self.assertEqual([step for step, _ in maintain(self.repo)], ["pack-refs", "repack", "multi-pack-index", "commit-graph"])
+
+        stats = RepositoryStats.read(self.repo)
+        self.assertEqual((stats.loose_refs, stats.packs, stats.commit_graph, stats.multi_pack_index), (0, 1, True, True))
+        self.assertEqual(self.git("for-each-ref"), refs)
+        ledger = self.open_ledger()
+        self.assertEqual(ledger.balance(self.token, self.ids["alice"]), 90)
+        self.assertEqual(ledger.balance(self.token, self.ids["bob"]), 10)
+
+    def test_probe(self):
+        # the remote frontier of alice is ahead of the local frontier
+        self.git("update-ref", f"refs/remotes/peer/frontier/{self.token}/{self.ids['alice']}", self.frontier("alice"))
+        self.git("update-ref", f"refs/heads/frontier/{self.token}/{self.ids['alice']}", self.token)
+        refs = self.git("for-each-ref")
+        self.assertEqual(set(probe(self.repo)), {"merge", "checkpoint"})
+        self.assertEqual(self.git("for-each-ref"), refs) # the fetch is a dry run
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+
+from goc import CheckpointError
+from goc.maps import MAGIC, VERSION, MapFormatError, decode_map, encode_map, shard
+from goc.objects import blob_entry, tree_entry, update_counter_map
+
+from .helpers import LedgerTestCase
+
+AUTHOR_PREFIX = "AAAAC3NzaC1lZDI1NTE5AAAAI" # shared prefix of the ids of ed25519 keys
+
+
+class CompactMapTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        counters = {f"{AUTHOR_PREFIX}{i:04d}": i * 1000 for i in range(100)}
+        counters[f"{AUTHOR_PREFIX}big"] = 2 ** 100 # counters are not limited to 64 bit
+        self.assertEqual(decode_map(encode_map(counters)), counters)
+        self.assertEqual(decode_map(encode_map({})), {})
+
+    def test_encoding_is_unique(self):
+        counters = {"b": 2, "a": 1, "ab": 3}
+        self.assertEqual(encode_map(counters), encode_map(dict(reversed(list(counters.items())))))
+
+    def test_shared_prefixes_are_stored_once(self):
+        counters = {f"{AUTHOR_PREFIX}{i:04d}": 1 for i in range(100)}
+        self.assertLess(len(encode_map(counters)), sum(len(name) for name in counters) // 4)
+
+    def test_negative_counter(self):
+        with self.assertRaises(MapFormatError):
+            encode_map({"a": -1})
+
+    def test_truncated(self):
+        content = encode_map({"alice": 5, "bob": 300})
+        for length in range(len(MAGIC) + 2, len(content)):
+            with self.assertRaises(MapFormatError):
+                decode_map(content[:length])
+
+    def test_unsorted(self):
+        # two entries "b" and "a" (no shared prefix, suffix of length 1, counter 1)
+        content = MAGIC + bytes([VERSION, 2, 0, 1]) + b"b" + bytes([1, 0, 1]) + b"a" + bytes([1])
+        with self.assertRaises(MapFormatError):
+            decode_map(content)
+
+    def test_duplicate(self):
+        content = MAGIC + bytes([VERSION, 2, 0, 1]) + b"a" + bytes([1, 1, 0, 2])
+        with self.assertRaises(MapFormatError):
+            decode_map(content)
+
+    def test_invalid_header(self):
+        content = encode_map({"a": 1})
+        for invalid in (b"", content[len(MAGIC):], MAGIC + bytes([VERSION + 1]) + content[len(MAGIC) + 1:], content + b"\0"):
+            with self.assertRaises(MapFormatError):
+                decode_map(invalid)
+
+
+class InvalidMapsTest(LedgerTestCase):
+    """Maps received from peers that can't be decoded are rejected with a CheckpointError"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+        self.reader, self.writer = self.repo.reader, self.repo.writer
+
+    def test_corrupt_compact_map(self):
+        entry = blob_entry(self.writer.write("blob", b"GOCMAP garbage"))
+        with self.assertRaises(CheckpointError):
+            self.reader.counter_map(entry)
+        with self.assertRaises(CheckpointError):
+            self.reader.counter(entry, self.ids["bob"])
+
+        self.forge("alice", {"giveTo": entry}, [self.frontier("alice")])
+        with self.assertRaises(CheckpointError):
+            self.balance("alice")
+
+    def test_mixed_map(self):
+        # a counter blob next to the shard of the same id, the counter of the shard must not be hidden by the top-level blob
+        name = self.ids["bob"]
+        sharded = self.writer.counter_map({name: 7}, "sharded")
+        entries = dict(self.reader.tree(sharded.sha))
+        entries[name] = blob_entry(self.writer.blob_int(1))
+        entry = tree_entry(self.writer.tree(entries))
+        with self.assertRaises(CheckpointError):
+            self.reader.counter_map(entry)
+        with self.assertRaises(CheckpointError):
+            self.reader.counter(entry, name)
+
+    def test_counter_of_flat_map(self):
+        entry = self.writer.counter_map({self.ids["bob"]: 3, self.ids["carol"]: 4})
+        self.assertEqual(self.reader.counter(entry, self.ids["bob"]), 3)
+        self.assertIsNone(self.reader.counter(entry, self.ids["alice"]))
+
+
+class ShardedMapTest(LedgerTestCase):
+    MAP_ENCODING = "sharded"
+
+    def setUp(self):
+        super().setUp()
+        self.reader, self.writer = self.repo.reader, self.repo.writer
+        self.counters = {f"{AUTHOR_PREFIX}{i:04d}": i for i in range(200)}
+        self.entry = self.writer.counter_map(self.counters, "sharded")
+
+    def shards(self, entry):
+        return dict(self.reader.tree(entry.sha))
+
+    def test_layout(self):
+        shards = self.shards(self.entry)
+        self.assertEqual(set(shards), {shard(name) for name in self.counters})
+        for name, value in self.counters.items():
+            self.assertEqual(self.reader.counter(self.entry, name), value)
+        self.assertEqual(self.reader.counter_map(self.entry), self.counters)
+
+    def test_update_rewrites_only_the_changed_shard(self):
+        changed = f"{AUTHOR_PREFIX}0042"
+        new_author = "new-author"
+        entry = update_counter_map(self.reader, self.writer, self.entry, {changed: 1000, new_author: 1}, "sharded")
+
+        old_shards, new_shards = self.shards(self.entry), self.shards(entry)
+        changed_shards = {name for name in new_shards if old_shards.get(name) != new_shards[name]}
+        self.assertEqual(changed_shards, {shard(changed), shard(new_author)})
+        self.assertEqual(self.reader.counter_map(entry), {**self.counters, changed: 1000, new_author: 1})
+
+    def test_update_of_other_encodings(self):
+        tree = self.writer.counter_map(self.counters)
+        entry = update_counter_map(self.reader, self.writer, tree, {"new-author": 1}, "sharded")
+        self.assertTrue(self.reader.is_sharded(entry))
+        self.assertEqual(self.reader.counter_map(entry), {**self.counters, "new-author": 1})
+
+    def test_give_to(self):
+        self.create("alice", 100)
+        self.give_to("alice", "bob", 10)
+        before = self.repo.reader.tree(self.repo.reader.commit(self.frontier("alice")).tree)["giveTo"]
+        self.give_to("alice", "carol", 5)
+        after = self.repo.reader.tree(self.repo.reader.commit(self.frontier("alice")).tree)["giveTo"]
+        unchanged = {name: sha for name, sha in self.shards(before).items() if name != shard(self.ids["carol"])}
+        self.assertEqual({name: self.shards(after)[name] for name in unchanged}, unchanged)
+        self.assertEqual(self.reader.counter_map(after), {self.ids["bob"]: 10, self.ids["carol"]: 5})
+        self.assertEqual(self.balance("alice"), 85)
+
+
+if __name__ == "__main__":
+    unittest.main()
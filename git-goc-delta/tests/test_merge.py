@@ -0,0 +1,81 @@
+import os
+import subprocess
+import unittest
+from unittest import mock
+
+from goc import merge
+from goc.merge import MergeError, MergeVerifier
+from goc.signers import AllowedSigners, decode_pubkey
+
+from .helpers import LedgerTestCase
+
+
+class MergeVerifierTest(LedgerTestCase):
+    """The commits of a remote frontier are verified before the merge: signatures, signing keys and the token of the references"""
+
+    def setUp(self):
+        super().setUp()
+        self.git("config", "gpg.ssh.allowedSignersFile", os.path.join(self.repo.git_dir, "allowed_signers"))
+        self.create("alice", 100)
+
+    def receive(self, alias, token=None):
+        """Moves the frontier of the account to refs/remotes/peer/ and resets the local frontier to the token commit, as if its log was received"""
+        token = token or self.token
+        ref = f"frontier/{token}/{self.ids[alias]}"
+        self.git("update-ref", f"refs/remotes/peer/{ref}", f"refs/heads/{ref}")
+        self.git("update-ref", f"refs/heads/{ref}", token)
+
+    def verify(self, jobs=1):
+        verifier = MergeVerifier(self.repo_path)
+        self.addCleanup(verifier.close)
+        return verifier, verifier.verify_remote("peer", jobs)
+
+    def test_valid_log(self):
+        self.give_to("alice", "bob", 10)
+        self.receive("alice")
+        verifier, verified = self.verify()
+        self.assertEqual(verified, 2)
+        self.assertTrue(verifier.signers.is_allowed(decode_pubkey(self.ids["alice"])))
+
+    def test_unsigned_commit(self):
+        forged = self.forge("alice", {"giveTo": {"bob": 10}}, [self.frontier("alice")])
+        self.receive("alice")
+        with self.assertRaisesRegex(MergeError, forged):
+            self.verify()
+
+    def test_signed_by_other_author(self):
+        # the delta commit of alice, but signed with the (allowed) key of bob
+        env = dict(os.environ, GIT_AUTHOR_NAME=self.ids["alice"], GIT_COMMITTER_NAME=self.ids["alice"], GIT_AUTHOR_EMAIL="", GIT_COMMITTER_EMAIL="")
+        tree = self.git("rev-parse", f"{self.frontier('alice')}^{{tree}}")
+        commit = subprocess.run(["git", "commit-tree", tree, "-p", self.token, "--gpg-sign=.git/keys/bob.pub"],
+                                cwd=self.repo_path, env=env, input=b"\n", check=True, capture_output=True).stdout.decode().strip()
+        self.git("update-ref", f"refs/heads/frontier/{self.token}/{self.ids['alice']}", commit)
+        signers = AllowedSigners(self.repo.git_dir)
+        self.addCleanup(signers.close)
+        signers.add([decode_pubkey(self.ids["bob"])])
+
+        self.receive("alice")
+        with self.assertRaisesRegex(MergeError, commit):
+            self.verify()
+
+    def test_first_invalid_commit(self):
+        for amount in range(1, 5):
+            self.give_to("alice", "bob", amount)
+        for amount in range(20, 25):
+            self.forge("alice", {"giveTo": {"bob": amount}}, [self.frontier("alice")])
+        tip = self.frontier("alice")
+        self.receive("alice")
+        with mock.patch.object(merge, "SIGNATURE_CHUNK_SIZE", 2), self.assertRaisesRegex(MergeError, tip): # git log lists the newest commit first
+            self.verify(jobs=4)
+
+    def test_reference_of_other_token(self):
+        other_token = self.init_token("alice", "other-token")
+        commit = self.ops.create(other_token, 5, "alice")[0]
+        self.git("update-ref", f"refs/remotes/peer/frontier/{self.token}/{self.ids['alice']}", commit)
+        self.git("update-ref", f"refs/heads/frontier/{other_token}/{self.ids['alice']}", other_token)
+        with self.assertRaisesRegex(MergeError, "points to a different token"):
+            self.verify()
+
+
+if __name__ == "__main__":
+    unittest.main()
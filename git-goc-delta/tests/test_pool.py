@@ -0,0 +1,42 @@
+import unittest
+
+from goc.compaction import CheckpointPolicy, compact
+from goc.objects import blob_entry
+from goc.pool import checkpoint_all
+
+from .helpers import LedgerTestCase
+
+
+class CheckpointErrorsTest(LedgerTestCase):
+    """An account with invalid data is reported with its error, while the checkpoints of all other accounts are computed"""
+
+    def setUp(self):
+        super().setUp()
+        for alias in self.AUTHORS:
+            self.create(alias, 10)
+        invalid_map = blob_entry(self.repo.writer.write("blob", b"GOCMAP garbage"))
+        self.forge("bob", {"giveTo": invalid_map}, [self.frontier("bob")])
+        self.accounts = [(self.token, self.ids[alias]) for alias in self.AUTHORS]
+
+    def assert_checkpoints(self, results):
+        errors = {result.author_id: result.error for result in results}
+        self.assertEqual(set(errors), set(self.ids.values()))
+        self.assertIsNotNone(errors.pop(self.ids["bob"]))
+        self.assertEqual(list(errors.values()), [None, None])
+
+        self.repo.refresh()
+        for alias in ("alice", "carol"):
+            self.assertIsNotNone(self.repo.ref(f"refs/local/checkpoint/{self.token}/{self.ids[alias]}"))
+
+    def test_checkpoint_all(self):
+        self.assert_checkpoints(checkpoint_all(self.repo_path, self.accounts, jobs=2))
+
+    def test_checkpoint_all_sequential(self):
+        self.assert_checkpoints(checkpoint_all(self.repo_path, self.accounts, jobs=1))
+
+    def test_compact(self):
+        self.assert_checkpoints(list(compact(self.ledger, CheckpointPolicy(interval=1), self.accounts)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from .helpers import LedgerTestCase
+
+REPO_PUSH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "repo-push")
+
+
+class DeltaPushTest(LedgerTestCase):
+    """repo-push --delta only pushes the references that differ from the values last accepted by the remote, tracked in refs/local/sync/<remote>/*"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+        self.create("bob", 50)
+
+        remote_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(remote_dir.cleanup)
+        self.remote_path = remote_dir.name
+        self.remote_git("init", "-q")
+        self.remote_git("config", "receive.advertisePushOptions", "true")
+        self.remote_git("config", "receive.certNonceSeed", "seed")
+        self.remote_git("config", "receive.denyNonFastforwards", "true")
+
+        self.git("config", "goc.author.id", self.ids["alice"])
+        self.git("config", "user.name", self.ids["alice"])
+        self.git("config", "user.email", "")
+        self.git("config", "user.signingkey", os.path.join(self.repo.git_dir, "keys", "alice"))
+        self.git("remote", "add", "peer", self.remote_path)
+
+    def remote_git(self, *args):
+        return subprocess.run(["git", *args], cwd=self.remote_path, check=True, capture_output=True).stdout.decode().strip()
+
+    def push(self):
+        process = subprocess.run(["bash", REPO_PUSH, "--delta", self.repo_path, "peer"], capture_output=True)
+        self.repo.refresh()
+        return process.returncode, process.stdout.decode()
+
+    def refs(self, git, prefix):
+        output = git("for-each-ref", "--format=%(refname) %(objectname)", prefix)
+        return {ref[len(prefix):]: sha for ref, sha in (line.split() for line in output.splitlines())}
+
+    def heads(self):
+        return self.refs(self.git, "refs/heads/")
+
+    def tracked(self):
+        return self.refs(self.git, "refs/local/sync/peer/")
+
+    def pushed(self):
+        return self.refs(self.remote_git, f"refs/remotes/{self.ids['alice']}/")
+
+    def pushed_refs(self, output):
+        return [line.split("\t")[1].split(":")[1] for line in output.splitlines() if line.count("\t") >= 2]
+
+    def test_push_changed_refs(self):
+        self.assertEqual(self.push()[0], 0)
+        self.assertEqual(self.tracked(), self.heads())
+        self.assertEqual(self.pushed(), self.heads())
+
+        status, output = self.push()
+        self.assertEqual(status, 0)
+        self.assertEqual(output.strip(), "Everything up-to-date")
+
+        self.give_to("alice", "bob", 10)
+        status, output = self.push()
+        self.assertEqual(status, 0)
+        self.assertEqual(self.pushed_refs(output), [f"refs/remotes/{self.ids['alice']}/frontier/{self.token}/{self.ids['alice']}"])
+        self.assertEqual(self.tracked(), self.heads())
+        self.assertEqual(self.pushed(), self.heads())
+
+    def test_rejected_ref_is_not_tracked(self):
+        self.push()
+        bob_ref = f"frontier/{self.token}/{self.ids['bob']}"
+        old_bob = self.heads()[bob_ref]
+
+        self.forge("bob", {"giveTo": {"carol": 1}}, [self.token]) # rewrites the frontier of bob, the remote denies non-fast-forwards
+        self.give_to("alice", "bob", 10)
+        status, _ = self.push()
+        self.assertNotEqual(status, 0)
+        tracked = self.tracked()
+        self.assertEqual(tracked[bob_ref], old_bob)
+        self.assertEqual(self.pushed()[bob_ref], old_bob)
+        alice_ref = f"frontier/{self.token}/{self.ids['alice']}"
+        self.assertEqual(tracked[alice_ref], self.heads()[alice_ref])
+        self.assertEqual(self.pushed()[alice_ref], self.heads()[alice_ref])
+
+        status, output = self.push() # only the rejected reference changed, git rejects it without sending it
+        self.assertNotEqual(status, 0)
+        self.assertIn(f"refs/remotes/{self.ids['alice']}/{bob_ref}", self.pushed_refs(output))
+        self.assertEqual(self.tracked()[bob_ref], old_bob)
+
+
+class PushTest(DeltaPushTest):
+    """Without --delta, all references are pushed"""
+
+    def push(self):
+        process = subprocess.run(["bash", REPO_PUSH, self.repo_path, "peer"], capture_output=True)
+        return process.returncode, process.stdout.decode() + process.stderr.decode()
+
+    def test_push_changed_refs(self):
+        self.assertEqual(self.push()[0], 0)
+        self.assertEqual(self.pushed(), self.heads())
+        self.assertEqual(self.push(), (0, "Everything up-to-date\n"))
+
+    def test_rejected_ref_is_not_tracked(self):
+        self.push()
+        self.forge("bob", {"giveTo": {"carol": 1}}, [self.token])
+        status, output = self.push() # git rejects the only changed reference without sending it
+        self.assertNotEqual(status, 0)
+        self.assertIn("rejected", output)
+        self.assertEqual(self.tracked(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
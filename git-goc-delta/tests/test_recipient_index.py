@@ -0,0 +1,47 @@
+import unittest
+
+from .helpers import LedgerTestCase
+
+
+class RecipientIndexTest(LedgerTestCase):
+    """The recipient index reads the new commits of advanced frontiers and is reset for frontiers that were rewritten"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("alice", 100)
+        self.create("carol", 100)
+        self.give_to("alice", "bob", 10)
+        self.give_to("carol", "bob", 3)
+
+    def pending(self, alias):
+        self.ledger.recipient_index.update()
+        return {transfer.sender_id: (transfer.give_to, transfer.ack_from) for transfer in self.ledger.recipient_index.pending(self.ids[alias], self.token)}
+
+    def test_pending(self):
+        self.assertEqual(self.pending("bob"), {self.ids["alice"]: (10, 0), self.ids["carol"]: (3, 0)})
+        self.assertEqual(self.pending("alice"), {})
+
+        self.ack_from("bob", "alice")
+        self.give_to("carol", "bob", 2)
+        self.assertEqual(self.pending("bob"), {self.ids["carol"]: (5, 0)})
+        self.assertEqual(self.ledger.recipient_index.update(), 0) # no frontier advanced
+
+    def test_give_to_commit(self):
+        self.ledger.recipient_index.update()
+        transfers = self.ledger.recipient_index.pending(self.ids["bob"], self.token)
+        commits = {transfer.sender_id: transfer.commit for transfer in transfers}
+        self.assertEqual(commits, {self.ids["alice"]: self.frontier("alice"), self.ids["carol"]: self.frontier("carol")})
+
+    def test_frontier_rewritten(self):
+        self.pending("bob")
+        self.forge("alice", {"giveTo": {"bob": 4}}, [self.token])
+        self.assertEqual(self.pending("bob"), {self.ids["alice"]: (4, 0), self.ids["carol"]: (3, 0)})
+
+        self.ack_from("bob", "carol")
+        self.pending("bob")
+        self.forge("bob", {"giveTo": {"alice": 1}}, [self.token]) # the rewritten log of bob no longer acknowledges carol
+        self.assertEqual(self.pending("bob"), {self.ids["alice"]: (4, 0), self.ids["carol"]: (3, 0)})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+
+from goc.sender_index import SenderIndex
+
+from .helpers import LedgerTestCase
+
+
+class SenderIndexTest(LedgerTestCase):
+    """The sender index follows the frontier of the sender, incrementally or by rebuilding the index if the frontier was rewritten"""
+
+    def setUp(self):
+        super().setUp()
+        self.create("bob", 100)
+        self.give_to("bob", "alice", 10)
+
+    def sender_log(self, index=None):
+        index = index or SenderIndex(self.repo)
+        return index.get(self.token, self.ids["bob"], self.frontier("bob"))
+
+    def test_includes_give_to(self):
+        log = self.sender_log()
+        tip = log.position(self.frontier("bob"))
+        self.assertTrue(log.includes_give_to(self.ids["alice"], 10, tip))
+        self.assertFalse(log.includes_give_to(self.ids["alice"], 11, tip))
+        self.assertFalse(log.includes_give_to(self.ids["alice"], 10, tip - 1)) # the state before the transfer
+        self.assertFalse(log.includes_give_to(self.ids["carol"], 1, tip))
+
+    def test_frontier_advances(self):
+        log = self.sender_log()
+        old_tip = log.tip
+        self.give_to("bob", "alice", 5)
+        for index in (SenderIndex(self.repo), None): # the persisted index and a new index read from disk
+            log = self.sender_log(index)
+            self.assertEqual(log.chain[-2], old_tip) # only the new commit was appended
+            self.assertEqual(log.tip, self.frontier("bob"))
+            self.assertTrue(log.includes_give_to(self.ids["alice"], 15, log.position(log.tip)))
+
+    def test_frontier_rewritten(self):
+        self.sender_log()
+        rewritten = self.forge("bob", {"giveTo": {"carol": 3}}, [self.token])
+        log = self.sender_log()
+        self.assertEqual(log.chain, [self.token, rewritten])
+        self.assertFalse(log.includes_give_to(self.ids["alice"], 10, log.position(rewritten)))
+        self.assertTrue(log.includes_give_to(self.ids["carol"], 3, log.position(rewritten)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import unittest
+
+from goc.signers import AllowedSigners, decode_pubkey, key_fingerprint
+
+from .helpers import LedgerTestCase
+
+
+class AllowedSignersTest(LedgerTestCase):
+    """The index answers whether a key is allowed like the allowed signers file and is rebuilt if another program changes the file"""
+
+    def setUp(self):
+        super().setUp()
+        self.signers = AllowedSigners(self.repo.git_dir)
+        self.addCleanup(self.signers.close)
+        self.keys = {alias: decode_pubkey(author_id) for alias, author_id in self.ids.items()}
+
+    def test_fingerprint(self):
+        for alias, pubkey in self.keys.items():
+            output = subprocess.run(["ssh-keygen", "-l", "-f", os.path.join(self.repo.git_dir, "keys", f"{alias}.pub")],
+                                    check=True, capture_output=True).stdout.decode()
+            self.assertEqual(self.signers.fingerprint(pubkey), output.split()[1])
+        self.assertIsNone(key_fingerprint("not base64!"))
+        self.assertIsNone(key_fingerprint(self.keys["alice"][:-8])) # truncated key
+        self.assertIsNone(key_fingerprint(self.keys["alice"], key_type="ssh-rsa"))
+
+    def test_add(self):
+        self.assertFalse(self.signers.is_allowed(self.keys["alice"]))
+        self.assertEqual(self.signers.add([self.keys["alice"], self.keys["bob"], self.keys["alice"]]), 2)
+        self.assertEqual(self.signers.add([self.keys["bob"]]), 0)
+        self.assertTrue(self.signers.is_allowed(self.keys["bob"]))
+        self.assertFalse(self.signers.is_allowed(self.keys["carol"]))
+        with open(self.signers.allowed_signers_path) as f:
+            self.assertEqual([line.split()[-1] for line in f], [self.keys["alice"], self.keys["bob"]])
+
+    def test_file_changed(self):
+        self.signers.add([self.keys["alice"]])
+        with open(self.signers.allowed_signers_path, "w") as f: # e.g. edited by hand
+            f.write(f'# comment\ncarol@goc namespaces="git" ssh-ed25519 {self.keys["carol"]}\n')
+        self.assertTrue(self.signers.is_allowed(self.keys["carol"]))
+        self.assertFalse(self.signers.is_allowed(self.keys["alice"]))
+        self.assertEqual(self.signers.add([self.keys["alice"]]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from goc import trace
+
+SCRIPTDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TraceTest(unittest.TestCase):
+    """Spans of the engine and of the scripts are appended to GOC_TRACE, including the processes and objects counted within the span"""
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_path = tmp_dir.name
+        self.trace_file = os.path.join(self.tmp_path, "trace.events")
+
+    def events(self):
+        with open(self.trace_file) as f:
+            return [json.loads(line) for line in f]
+
+    def test_disabled(self):
+        with mock.patch.object(trace, "TRACE_FILE", None), trace.span("total"):
+            trace.count("git")
+        self.assertFalse(os.path.exists(self.trace_file))
+
+    def test_nested_spans(self):
+        with mock.patch.object(trace, "TRACE_FILE", self.trace_file), mock.patch.object(trace, "DEPTH", None), \
+                mock.patch.dict(trace._counters, {kind: 0 for kind in trace.SPAWN_EVENTS}):
+            with trace.span("total", script="goc serve"):
+                trace.count("git")
+                with trace.span("balance"):
+                    with trace.span("checkpoint"):
+                        trace.count("git", 2)
+                        trace.count("objects")
+        events = [(e["script"], e["phase"], e["git"], e["objects"]) for e in self.events()]
+        self.assertEqual(events, [("goc serve", "balance/checkpoint", 2, 1), ("goc serve", "balance", 2, 1), ("goc serve", "total", 3, 1)])
+        self.assertFalse(os.path.exists(f"{self.trace_file}.spawns")) # only reported to a calling script
+
+    def test_script(self):
+        script = os.path.join(self.tmp_path, "operation")
+        with open(script, "w") as f:
+            f.write(f'source "{SCRIPTDIR}/utility/trace"\n'
+                    'trace_phase build\n'
+                    'echo x | git hash-object -w --stdin > /dev/null\n'
+                    'git --version > /dev/null\n'
+                    'trace_phase engine\n'
+                    'python3 -c "from goc import trace; trace.count(\'git\', 2); trace.count(\'objects\')"\n')
+        env = dict(os.environ, GOC_TRACE=self.trace_file, PYTHONPATH=SCRIPTDIR, PATH=os.path.dirname(sys.executable) + os.pathsep + os.environ["PATH"])
+        env.pop("GOC_TRACE_DEPTH", None)
+        subprocess.run(["git", "init", "-q"], cwd=self.tmp_path, check=True)
+        process = subprocess.run(["bash", script], cwd=self.tmp_path, env=env, check=True, capture_output=True)
+        self.assertEqual(process.stderr, b"")
+
+        events = {e["phase"]: (e["script"], e["depth"], e["git"], e["python3"], e["objects"]) for e in self.events()}
+        self.assertEqual(events, {"build": ("operation", 0, 2, 0, 1), "engine": ("operation", 0, 2, 1, 1), "total": ("operation", 0, 4, 1, 2)})
+
+
+if __name__ == "__main__":
+    unittest.main()